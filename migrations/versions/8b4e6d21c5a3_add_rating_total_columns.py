@@ -0,0 +1,42 @@
+"""add rating_total for incremental rating aggregates
+
+Revision ID: 8b4e6d21c5a3
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-17 11:00:00.000000
+
+现有数据的 rating_total 需运行 src/repair_rating_aggregates.py 回填。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e6d21c5a3'
+down_revision = '3f1c2a9d7b10'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['products', 'ru_porcelains']
+
+
+def _columns(inspector, table):
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table in TABLES:
+        if table in tables and 'rating_total' not in _columns(inspector, table):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.add_column(sa.Column('rating_total', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table in TABLES:
+        if table in tables and 'rating_total' in _columns(inspector, table):
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_column('rating_total')
@@ -0,0 +1,46 @@
+"""add webhook_events queue for asynchronous webhook processing
+
+Revision ID: d4b8f1a6e207
+Revises: c7a5e0f3d912
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8f1a6e207'
+down_revision = 'c7a5e0f3d912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'webhook_events' in inspector.get_table_names():
+        return
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.String(length=255), nullable=False),
+        sa.Column('gateway', sa.String(length=50), nullable=False),
+        sa.Column('type', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_webhook_events_status_available_at', 'webhook_events', ['status', 'available_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'webhook_events' not in inspector.get_table_names():
+        return
+    op.drop_index('ix_webhook_events_status_available_at', table_name='webhook_events')
+    op.drop_table('webhook_events')
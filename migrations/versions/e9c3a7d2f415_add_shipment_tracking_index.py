@@ -0,0 +1,29 @@
+"""add (shipment_id, timestamp) index for tracking ingestion dedupe
+
+Revision ID: e9c3a7d2f415
+Revises: d4b8f1a6e207
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c3a7d2f415'
+down_revision = 'd4b8f1a6e207'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'shipment_tracking' in sa.inspect(op.get_bind()).get_table_names():
+        op.create_index(
+            'ix_shipment_tracking_shipment_id_timestamp', 'shipment_tracking', ['shipment_id', 'timestamp'],
+            unique=False, if_not_exists=True
+        )
+
+
+def downgrade():
+    if 'shipment_tracking' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_shipment_tracking_shipment_id_timestamp', table_name='shipment_tracking', if_exists=True)
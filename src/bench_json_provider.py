@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+JSON 序列化性能对比脚本
+构造 1000 个商品（每个 3 张图片）和 500 个订单（每个 4 个订单项）的响应数据，对比：
+    Flask 默认    to_dict 中预先 float()/isoformat() 后用 Flask 默认 provider 序列化（原实现）
+    标准库回退    FastJSONProvider 未安装 orjson 时的实现
+    orjson        FastJSONProvider 使用 orjson
+并校验三种方式输出的 JSON 解析后完全一致。
+
+用法: python src/bench_json_provider.py [重复次数]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.models.models_fixed import Product, ProductImage, Order, OrderItem
+from src.utils import json_provider
+from src.utils.json_provider import FastJSONProvider
+
+
+def build_payloads():
+    now = datetime(2026, 10, 17, 12, 30, 15, 123456)
+    products = []
+    for i in range(1, 1001):
+        product = Product(
+            id=i, name=f'汝窑天青釉洗{i}', description='釉色温润如玉，蟹爪纹开片。' * 4,
+            price=Decimal('1288.00') + i, original_price=Decimal('1588.00'), stock=i % 50,
+            sku=f'RU-{i:05d}', material='瓷', craft='手工拉坯', origin='河南汝州',
+            weight=Decimal('0.85'), is_active=True, is_featured=i % 7 == 0, is_new=i % 5 == 0,
+            sales_count=i * 3, view_count=i * 11, rating_avg=Decimal('4.60'), review_count=i % 40,
+            category_id=i % 12, created_at=now - timedelta(days=i)
+        )
+        product.images = [
+            ProductImage(id=i * 10 + n, image_url=f'/static/images/{i}_{n}.jpg', alt_text=product.name,
+                         sort_order=n, is_primary=n == 0, image_type='product')
+            for n in range(3)
+        ]
+        products.append(product)
+
+    orders = []
+    for i in range(1, 501):
+        order = Order(
+            id=i, order_number=f'PO{i:012d}', user_id=i % 97, subtotal=Decimal('3864.00'),
+            shipping_fee=Decimal('20.00'), discount_amount=Decimal('0.00'), total_amount=Decimal('3884.00'),
+            status='confirmed', payment_status='paid', payment_method='stripe',
+            shipping_address=json.dumps({'name': '张三', 'city': '汝州', 'detail': '人民路 1 号'}, ensure_ascii=False),
+            created_at=now - timedelta(hours=i), paid_at=now - timedelta(hours=i, minutes=-5)
+        )
+        order.items = [
+            OrderItem(id=i * 10 + n, product_id=n + 1, product_name=f'汝窑天青釉洗{n + 1}',
+                      product_sku=f'RU-{n + 1:05d}', quantity=1, unit_price=Decimal('966.00'),
+                      total_price=Decimal('966.00'))
+            for n in range(4)
+        ]
+        orders.append(order)
+    return products, orders
+
+
+def legacy_convert(value):
+    """原实现中 to_dict 在 Python 里做的 float()/isoformat() 转换"""
+    if isinstance(value, dict):
+        return {key: legacy_convert(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [legacy_convert(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    app = Flask(__name__)
+    flask_default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+
+    products, orders = build_payloads()
+    cases = [
+        ('1000 个商品', lambda: {'products': [p.to_dict() for p in products], 'total': len(products)}),
+        ('500 个订单', lambda: {'orders': [o.to_dict() for o in orders], 'total': len(orders)}),
+    ]
+
+    print(f"{'数据':<12}{'to_dict(ms)':>14}{'Flask默认(ms)':>16}{'标准库回退(ms)':>18}{'orjson(ms)':>14}{'大小(KB)':>12}")
+    for label, build in cases:
+        to_dict_ms = timed(build, repeat)
+        payload = build()
+        legacy_payload = legacy_convert(payload)
+
+        outputs = {}
+        flask_ms = timed(lambda: flask_default.dumps(legacy_payload), repeat)
+        outputs['flask'] = flask_default.dumps(legacy_payload)
+
+        orjson_module = json_provider.orjson
+        json_provider.orjson = None
+        try:
+            fallback_ms = timed(lambda: fast.dumps(payload), repeat)
+            outputs['fallback'] = fast.dumps(payload)
+        finally:
+            json_provider.orjson = orjson_module
+
+        if orjson_module is not None:
+            orjson_ms = timed(lambda: fast.response(payload), repeat)
+            outputs['orjson'] = fast.response(payload).get_data(as_text=True)
+        else:
+            orjson_ms = float('nan')
+
+        parsed = [json.loads(text) for text in outputs.values()]
+        if any(item != parsed[0] for item in parsed[1:]):
+            print(f"❌ {label}: 输出不一致")
+            sys.exit(1)
+
+        size_kb = len(outputs['flask'].encode('utf-8')) / 1024
+        print(f"{label:<12}{to_dict_ms:>14.2f}{flask_ms:>16.2f}{fallback_ms:>18.2f}{orjson_ms:>14.2f}{size_kb:>12.0f}")
+
+    print("\n✅ 三种方式输出一致")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+汝瓷搜索性能对比脚本
+生成合成商品目录（默认 10 万条），对比 LIKE 四字段模糊查询与 FTS5 检索的耗时。
+
+用法: python src/bench_porcelain_search.py [商品数量] [每个关键词重复次数]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.utils.text_search import segment_text, build_match_query
+
+GLAZES = ['天青', '天蓝', '豆绿', '粉青', '月白', '卵白']
+VESSELS = ['盘', '碗', '洗', '瓶', '炉', '枕', '尊', '盏']
+CRACKLES = ['蟹爪纹', '鱼鳞纹', '冰裂纹', '无开片']
+ARTISTS = ['王氏窑', '李师傅', '朱文立', '孟玉松', '杨云超', 'Studio Ru']
+PLACES = ['宝丰清凉寺', '汝州张公巷', '私人藏家', '海外回流', '拍卖会', '故宫旧藏']
+RARE_PROVENANCE = '南宋官窑窖藏出土'
+# 常见词、组合词与低频词（每千件约一件）
+QUERIES = ['天青', '冰裂纹 洗', '清凉寺', 'studio', '粉青 盏', '官窑窖藏', '4217号']
+
+WEIGHTS = '10.0, 1.0, 3.0, 2.0'
+
+
+def build_catalog(conn, size):
+    rng = random.Random(42)
+    conn.execute("""
+        CREATE TABLE ru_porcelains (
+            id INTEGER PRIMARY KEY, name TEXT, description TEXT,
+            artist_info TEXT, provenance TEXT, is_active BOOLEAN
+        )
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE ru_porcelains_fts USING fts5(
+            name, description, artist_info, provenance, tokenize = 'unicode61'
+        )
+    """)
+    rows = []
+    for i in range(1, size + 1):
+        glaze, vessel = rng.choice(GLAZES), rng.choice(VESSELS)
+        rows.append((
+            i,
+            f'{glaze}釉{vessel}{i}号',
+            f'{glaze}釉色温润如玉，{rng.choice(CRACKLES)}，器型端庄，' * 3,
+            rng.choice(ARTISTS),
+            RARE_PROVENANCE if rng.random() < 0.001 else f'{rng.choice(PLACES)}，{rng.randint(1950, 2024)}年入藏',
+            1
+        ))
+    conn.executemany("INSERT INTO ru_porcelains VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany(
+        "INSERT INTO ru_porcelains_fts (rowid, name, description, artist_info, provenance) VALUES (?, ?, ?, ?, ?)",
+        [(r[0], segment_text(r[1]), segment_text(r[2]), segment_text(r[3]), segment_text(r[4])) for r in rows]
+    )
+    conn.commit()
+
+
+# 两种方式都与 get_porcelains 一致：先 COUNT 总数，再取第一页
+def like_search(conn, search, limit=12):
+    clauses, params = [], []
+    for term in search.split():
+        clauses.append("(name LIKE ? OR description LIKE ? OR artist_info LIKE ? OR provenance LIKE ?)")
+        params.extend([f'%{term}%'] * 4)
+    where = f"is_active = 1 AND {' AND '.join(clauses)}"
+    total = conn.execute(f"SELECT count(*) FROM ru_porcelains WHERE {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT id FROM ru_porcelains WHERE {where} ORDER BY id DESC LIMIT {limit}", params
+    ).fetchall()
+    return total, rows
+
+
+def fts_search(conn, search, limit=12):
+    source = (
+        "FROM ru_porcelains p JOIN ("
+        f"  SELECT rowid AS porcelain_id, bm25(ru_porcelains_fts, {WEIGHTS}) AS rank"
+        "   FROM ru_porcelains_fts WHERE ru_porcelains_fts MATCH ?"
+        ") f ON f.porcelain_id = p.id WHERE p.is_active = 1"
+    )
+    params = (build_match_query(search),)
+    total = conn.execute(f"SELECT count(*) {source}", params).fetchone()[0]
+    rows = conn.execute(f"SELECT p.id {source} ORDER BY f.rank, p.id DESC LIMIT {limit}", params).fetchall()
+    return total, rows
+
+
+def timed(fn, conn, search, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(conn, search)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    conn = sqlite3.connect(':memory:')
+    start = time.perf_counter()
+    build_catalog(conn, size)
+    print(f"生成 {size} 条合成商品及索引耗时 {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'关键词':<12}{'命中数':>8}{'LIKE(ms)':>12}{'FTS5(ms)':>12}{'加速比':>10}")
+    for search in QUERIES:
+        hits = fts_search(conn, search)[0]
+        like_ms = timed(like_search, conn, search, repeat)
+        fts_ms = timed(fts_search, conn, search, repeat)
+        print(f"{search:<12}{hits:>8}{like_ms:>12.2f}{fts_ms:>12.2f}{like_ms / fts_ms:>10.1f}x")
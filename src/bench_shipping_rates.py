@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+运费报价性能测试脚本
+随机生成报价请求（快递服务、重量、目的地），对比：
+    原实现      按地址文本做子串判断并逐项乘系数
+    费率引擎    区划代码 / 地址文本 -> 分区，查预先计算的价格数组
+并校验 0.5kg 整数倍重量下顺丰各服务的报价与原实现一致（以分为单位取整，半分时可能相差 1 分）。目标：单进程每秒 10 万次以上报价。
+
+用法: python src/bench_shipping_rates.py [报价次数]
+"""
+
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.services.shipping_rates import CITIES, PROVINCES, RateEngine, rate_engine
+
+TARGET_QUOTES_PER_SECOND = 100000
+
+
+def legacy_cost(weight, destination, service):
+    """原 calculate_shipping_cost 的计算逻辑"""
+    base_cost = 10.0
+    if weight > 1:
+        base_cost += (weight - 1) * 5
+    if service == '次日达':
+        base_cost *= 1.5
+    elif service == '当日达' or service == '即日达':
+        base_cost *= 2.0
+    if '西藏' in destination or '新疆' in destination:
+        base_cost *= 1.8
+    elif '内蒙古' in destination or '青海' in destination:
+        base_cost *= 1.3
+    return round(base_cost, 2)
+
+
+def build_requests(count):
+    rng = random.Random(42)
+    services = [(carrier, service) for carrier, service in rate_engine.service_index]
+    codes = list(PROVINCES) + list(CITIES)
+    names = {code: name for code, (name, _) in list(PROVINCES.items()) + list(CITIES.items())}
+    requests = []
+    for _ in range(count):
+        carrier, service = rng.choice(services)
+        code = rng.choice(codes) + ''.join(rng.choice('0123456789') for _ in range(2))
+        weight = round(rng.uniform(0.1, 40), 2)
+        destination = f"{names[code[:4]] if code[:4] in names else names[code[:2]]}某区某街道{rng.randint(1, 999)}号"
+        requests.append((carrier, service, weight, code, destination))
+    return requests
+
+
+def rate(label, count, seconds):
+    per_second = count / seconds
+    print(f"{label:<28}{seconds * 1000:>10.1f} ms{per_second:>14,.0f} 次/秒{seconds / count * 1e6:>10.2f} μs/次")
+    return per_second
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    start = time.perf_counter()
+    RateEngine()
+    print(f"构建费率表: {(time.perf_counter() - start) * 1000:.2f} ms，价格数组 {len(rate_engine.prices)} 项\n")
+
+    requests = build_requests(count)
+    engine = rate_engine
+
+    start = time.perf_counter()
+    for carrier, service, weight, code, destination in requests:
+        legacy_cost(weight, destination, service)
+    rate('原实现（地址子串）', count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for carrier, service, weight, code, destination in requests:
+        engine.quote_cents(carrier, service, weight, engine.resolve_zone(code))
+    code_rate = rate('费率引擎（区划代码）', count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for carrier, service, weight, code, destination in requests:
+        engine.quote_cents(carrier, service, weight, engine.resolve_zone(None, destination))
+    text_rate = rate('费率引擎（地址文本）', count, time.perf_counter() - start)
+
+    carts = count // 12
+    start = time.perf_counter()
+    for carrier, service, weight, code, destination in requests[:carts]:
+        engine.quote_all(weight, engine.resolve_zone(code))
+    rate('整车报价（12 个服务/次）', carts * 12, time.perf_counter() - start)
+
+    # 与原实现对比（原实现不区分快递公司，对应顺丰的费率）
+    mismatches = 0
+    for carrier, service, weight, code, destination in requests[:20000]:
+        if carrier != 'sf':
+            continue
+        weight = max(0.5, round(weight * 2) / 2)
+        cost = engine.quote_cents(carrier, service, weight, engine.resolve_zone(None, destination)) / 100
+        if abs(cost - legacy_cost(weight, destination, service)) > 0.011:
+            mismatches += 1
+    if mismatches:
+        print(f"\n❌ {mismatches} 个报价与原实现不一致")
+        sys.exit(1)
+
+    if min(code_rate, text_rate) < TARGET_QUOTES_PER_SECOND:
+        print(f"\n❌ 未达到每秒 {TARGET_QUOTES_PER_SECOND:,} 次报价")
+        sys.exit(1)
+    print(f"\n✅ 报价与原实现一致，每秒报价超过 {TARGET_QUOTES_PER_SECOND:,} 次")
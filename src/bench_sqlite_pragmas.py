@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+SQLite 连接参数性能对比脚本
+用多个进程模拟 gunicorn worker，对同一个临时数据库文件执行读多写少的混合负载
+（商品列表查询、浏览量更新、下单写入），对比默认设置与 sqlite_pragmas 调优后的吞吐量
+和 database is locked 错误数。
+
+用法: python src/bench_sqlite_pragmas.py [进程数] [每轮秒数] [写操作比例]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.utils.sqlite_pragmas import pragma_settings, register_sqlite_pragmas
+
+PRODUCTS = 5000
+
+
+def build_database(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, category_id INTEGER, name TEXT, "
+            "price NUMERIC, stock INTEGER, view_count INTEGER DEFAULT 0)"
+        ))
+        conn.execute(text("CREATE INDEX ix_products_category_id ON products (category_id)"))
+        conn.execute(text(
+            "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total_amount NUMERIC, "
+            "status TEXT, created_at TEXT)"
+        ))
+        conn.execute(
+            text("INSERT INTO products (id, category_id, name, price, stock) VALUES (:id, :category_id, :name, :price, 100)"),
+            [
+                {'id': i, 'category_id': i % 20, 'name': f'商品{i}', 'price': 10 + i % 500}
+                for i in range(1, PRODUCTS + 1)
+            ]
+        )
+    engine.dispose()
+
+
+def worker(path, settings, duration, write_ratio, seed, results):
+    engine = create_engine(f"sqlite:///{path}")
+    register_sqlite_pragmas(engine, settings)
+    rng = random.Random(seed)
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    if rng.random() < 0.5:
+                        conn.execute(
+                            text("UPDATE products SET view_count = view_count + 1 WHERE id = :id"),
+                            {'id': rng.randint(1, PRODUCTS)}
+                        )
+                    else:
+                        conn.execute(
+                            text("INSERT INTO orders (user_id, total_amount, status, created_at) "
+                                 "VALUES (:user_id, :amount, 'pending', datetime('now'))"),
+                            {'user_id': rng.randint(1, 1000), 'amount': rng.randint(10, 1000)}
+                        )
+                        conn.execute(
+                            text("UPDATE products SET stock = stock - 1 WHERE id = :id AND stock >= 1"),
+                            {'id': rng.randint(1, PRODUCTS)}
+                        )
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT id, name, price FROM products WHERE category_id = :category_id "
+                             "ORDER BY id DESC LIMIT 20"),
+                        {'category_id': rng.randint(0, 19)}
+                    ).fetchall()
+                    conn.execute(text("SELECT count(*) FROM orders")).scalar()
+                reads += 1
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+
+    engine.dispose()
+    results.put((reads, writes, locked))
+
+
+def run_profile(label, settings, processes, duration, write_ratio):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        build_database(path)
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=worker, args=(path, settings, duration, write_ratio, seed, results))
+            for seed in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        totals = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    reads = sum(t[0] for t in totals)
+    writes = sum(t[1] for t in totals)
+    locked = sum(t[2] for t in totals)
+    print(f"{label:<10}{reads / duration:>12.0f}{writes / duration:>12.0f}{(reads + writes) / duration:>12.0f}{locked:>10}")
+
+
+if __name__ == '__main__':
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    write_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+    tuned = pragma_settings()
+    print(f"进程数: {processes}, 每轮 {duration:.0f}s, 写操作比例 {write_ratio:.0%}")
+    print("调优参数: " + ', '.join(f"{pragma}={value}" for pragma, value in tuned) + "\n")
+    print(f"{'设置':<10}{'读/s':>12}{'写/s':>12}{'合计/s':>12}{'锁错误':>10}")
+    run_profile('默认', [], processes, duration, write_ratio)
+    run_profile('调优', tuned, processes, duration, write_ratio)
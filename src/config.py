@@ -0,0 +1,95 @@
+"""
+数据库配置
+应用和各初始化脚本共用同一份配置，均从环境变量读取：
+    DATABASE_URL          数据库地址，默认 src/database/app.db（SQLite）
+    DATABASE_REPLICA_URL  只读副本地址，可选，配置后 GET 请求的查询走副本
+    DB_POOL_SIZE          连接池大小，默认 5
+    DB_MAX_OVERFLOW       连接池满时允许额外创建的连接数，默认 10
+    DB_POOL_TIMEOUT       等待空闲连接的秒数，默认 30
+    DB_POOL_RECYCLE       连接最长复用秒数，默认 1800
+    DB_POOL_PRE_PING      取出连接前先探活，默认 true
+连接池参数只对 PostgreSQL 等服务端数据库生效，SQLite 使用 SQLAlchemy 默认连接池。
+"""
+
+import os
+
+from sqlalchemy.engine import make_url
+
+DATABASE_DIR = os.path.join(os.path.dirname(__file__), 'database')
+DEFAULT_SQLITE_PATH = os.path.join(DATABASE_DIR, 'app.db')
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value is None or value == '':
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+class DatabaseConfig:
+    """数据库连接地址与连接池设置"""
+
+    def __init__(self, uri=None, pool_size=5, max_overflow=10, pool_timeout=30,
+                 pool_recycle=1800, pool_pre_ping=True, replica_uri=None):
+        self.uri = normalize_database_uri(uri or f"sqlite:///{DEFAULT_SQLITE_PATH}")
+        self.replica_uri = normalize_database_uri(replica_uri) if replica_uri else None
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(
+            uri=environ.get('DATABASE_URL'),
+            pool_size=int(environ.get('DB_POOL_SIZE', 5)),
+            max_overflow=int(environ.get('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=int(environ.get('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(environ.get('DB_POOL_RECYCLE', 1800)),
+            pool_pre_ping=_env_bool(environ, 'DB_POOL_PRE_PING', True),
+            replica_uri=environ.get('DATABASE_REPLICA_URL')
+        )
+
+    @property
+    def is_sqlite(self):
+        return self.uri.startswith('sqlite')
+
+    def engine_options(self):
+        """传给 create_engine / SQLALCHEMY_ENGINE_OPTIONS 的参数"""
+        if self.is_sqlite:
+            return {}
+        return {
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'pool_timeout': self.pool_timeout,
+            'pool_recycle': self.pool_recycle,
+            'pool_pre_ping': self.pool_pre_ping
+        }
+
+    def apply_to(self, app):
+        """写入 Flask 配置，需在 db.init_app 之前调用"""
+        if self.uri == f"sqlite:///{DEFAULT_SQLITE_PATH}":
+            os.makedirs(DATABASE_DIR, exist_ok=True)
+        app.config['SQLALCHEMY_DATABASE_URI'] = self.uri
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = self.engine_options()
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        if self.replica_uri:
+            app.config.setdefault('SQLALCHEMY_BINDS', {})['replica'] = dict(
+                self.engine_options(), url=self.replica_uri
+            )
+
+    def describe(self):
+        """用于日志输出，隐藏密码"""
+        return make_url(self.uri).render_as_string(hide_password=True)
+
+
+def normalize_database_uri(uri):
+    """Heroku/Railway/Render 提供的 postgres:// 地址需改为 SQLAlchemy 识别的 postgresql://"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+database_config = DatabaseConfig.from_env()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+热点查询执行计划对比脚本
+在数据库副本上分别记录 无索引 / 有索引 时各路由查询的 EXPLAIN QUERY PLAN，
+用于验证 migrations/versions/3f1c2a9d7b10_add_hot_path_indexes.py 中的索引是否生效。
+
+用法: python src/explain_query_plans.py [数据库路径] [输出文件]
+"""
+
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
+
+# 与迁移脚本中的索引保持一致: (索引名, 表名, 列)
+INDEXES = [
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at']),
+    ('ix_orders_status', 'orders', ['status']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_notifications_user_id_is_read_created_at', 'notifications', ['user_id', 'is_read', 'created_at']),
+    ('ix_shipments_order_id', 'shipments', ['order_id']),
+]
+
+# 各路由的代表性查询: (路由, 依赖的表, SQL)
+ROUTE_QUERIES = [
+    ('admin.get_user_detail / 最近订单', ['orders'],
+     "SELECT * FROM orders WHERE user_id = 1 ORDER BY created_at DESC LIMIT 5"),
+    ('admin.get_users / 订单统计', ['orders'],
+     "SELECT user_id, count(id), sum(total_amount) FROM orders WHERE user_id IN (1, 2, 3) GROUP BY user_id"),
+    ('admin.get_admin_orders / 按状态筛选', ['orders'],
+     "SELECT * FROM orders WHERE status = 'pending' ORDER BY created_at DESC LIMIT 20"),
+    ('Order.items 批量加载', ['order_items'],
+     "SELECT * FROM order_items WHERE order_id IN (1, 2, 3)"),
+    ('profile.get_user_notifications / 列表', ['notifications'],
+     "SELECT * FROM notifications WHERE user_id = 1 ORDER BY created_at DESC LIMIT 20"),
+    ('profile.get_user_notifications / 未读数', ['notifications'],
+     "SELECT count(*) FROM notifications WHERE user_id = 1 AND is_read = 0"),
+    ('profile.get_user_wishlist', ['wishlists'],
+     "SELECT * FROM wishlists WHERE user_id = 1 ORDER BY created_at DESC"),
+    ('shipping.get_order_tracking', ['shipments'],
+     "SELECT * FROM shipments WHERE order_id = 1 LIMIT 1"),
+]
+
+
+def _tables(conn):
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return {row[0] for row in rows}
+
+
+def _explain(conn, sql):
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def collect_plans(conn):
+    tables = _tables(conn)
+    plans = {}
+    for route, required, sql in ROUTE_QUERIES:
+        if not set(required) <= tables:
+            plans[route] = ['(表不存在，跳过)']
+            continue
+        plans[route] = _explain(conn, sql)
+    return plans
+
+
+def compare_query_plans(db_path):
+    """返回 {路由: (无索引计划, 有索引计划)}"""
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(':memory:')
+    source.backup(conn)
+    source.close()
+
+    tables = _tables(conn)
+    for name, table, columns in INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("ANALYZE")
+    before = collect_plans(conn)
+
+    for name, table, columns in INDEXES:
+        if table in tables:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    conn.execute("ANALYZE")
+    after = collect_plans(conn)
+
+    conn.close()
+    return {route: (before[route], after[route]) for route, _, _ in ROUTE_QUERIES}
+
+
+def format_report(results):
+    lines = []
+    for route, (before, after) in results.items():
+        lines.append(f"== {route}")
+        lines.append("  无索引:")
+        lines.extend(f"    {step}" for step in before)
+        lines.append("  有索引:")
+        lines.extend(f"    {step}" for step in after)
+        lines.append("")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    report = format_report(compare_query_plans(db_path))
+    print(report)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w', encoding='utf-8') as f:
+            f.write(report)
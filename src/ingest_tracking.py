@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+快递扫描记录导入脚本
+从文件或标准输入流式导入 NDJSON / CSV 扫描记录，与 /api/shipping/tracking/ingest 使用相同的处理逻辑。
+
+用法: python src/ingest_tracking.py <文件|-> [--format ndjson|csv] [--chunk-size 1000]
+"""
+
+import argparse
+import io
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.services.tracking_ingest import FORMATS, CHUNK_SIZE, detect_format, iter_records, ingest_tracking_events
+
+def ingest_file(path, fmt, chunk_size):
+    """导入一个文件"""
+    with app.app_context():
+        try:
+            if path == '-':
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+            else:
+                stream = open(path, encoding='utf-8', newline='')
+            with stream:
+                result = ingest_tracking_events(iter_records(stream, fmt), chunk_size=chunk_size)
+
+            summary = result.to_dict()
+            print(f"✓ 读取 {summary['received']} 条，新增 {summary['inserted']} 条，重复 {summary['duplicates']} 条")
+            print(f"✓ 未知单号 {summary['unknown_tracking_numbers']} 条，无效 {summary['invalid']} 条")
+            print(f"✓ 更新物流单 {summary['shipments_updated']} 个，订单送达 {summary['orders_delivered']} 个")
+            for error in summary['errors'][:20]:
+                print(f"  第 {error['line']} 行: {error['error']}")
+            return True
+        except Exception as e:
+            print(f"❌ 导入失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='导入快递扫描记录')
+    parser.add_argument('path', help='NDJSON / CSV 文件，- 表示标准输入')
+    parser.add_argument('--format', choices=FORMATS, help='默认按扩展名判断')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(filename=args.path)
+    if fmt is None:
+        print("❌ 无法判断文件格式，请使用 --format 指定")
+        sys.exit(1)
+
+    print(f"开始导入扫描记录（{fmt}）...")
+    success = ingest_file(args.path, fmt, args.chunk_size)
+    if success:
+        print("\n✅ 扫描记录导入完成！")
+    else:
+        print("\n❌ 扫描记录导入失败！")
@@ -9,6 +9,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.models import db, User, Role, UserRole
 from flask import Flask
+from src.config import database_config
 
 def init_admin_user():
     """初始化admin用户和角色"""
@@ -16,12 +17,8 @@ def init_admin_user():
     # 创建Flask应用实例
     app = Flask(__name__)
     
-    # 配置数据库
-    DATABASE_DIR = os.path.join(os.path.dirname(__file__), 'database')
-    os.makedirs(DATABASE_DIR, exist_ok=True)
-    DB_PATH = os.path.join(DATABASE_DIR, 'app.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 配置数据库（与应用共用 src/config.py 中的配置）
+    database_config.apply_to(app)
     app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
     
     # 初始化数据库
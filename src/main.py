@@ -12,6 +12,17 @@ from src.routes.profile import profile_bp
 from src.routes.payment import payment_bp
 from src.routes.shipping import shipping_bp
 from src.routes.admin import admin_bp
+from src.services import dashboard_metrics  # 注册订单统计的 flush 监听
+from src.services import rating_aggregates  # 注册评分聚合的 flush 监听
+from src.services.view_counter import view_counter
+from src.services.stock_reservations import reservation_sweeper
+from src.services.webhook_queue import webhook_workers
+from src.utils import sqlite_pragmas
+from src.config import database_config
+from src.utils.db_routing import read_replica_router
+from src.utils.json_provider import FastJSONProvider
+from src.utils.compression import Compressor
+from src.utils.static_index import static_index
 # from flask_bcrypt import Bcrypt # Removed as bcrypt is handled in models.models
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -25,6 +36,8 @@ try:
     print("--- Creating Flask app instance ---")
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
     app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    # orjson 优先的 JSON 序列化，直接处理 Decimal / datetime
+    app.json = FastJSONProvider(app)
     print("--- Flask app instance created and basic config set ---")
 
     print("--- Initializing CORS ---")
@@ -35,21 +48,40 @@ try:
     print("--- CORS initialized ---")
 
     print("--- Configuring Database ---")
-    DATABASE_DIR = os.path.join(os.path.dirname(__file__), 'database')
-    os.makedirs(DATABASE_DIR, exist_ok=True)
-    DB_PATH = os.path.join(DATABASE_DIR, 'app.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
-    print(f"--- Using database at: {os.path.abspath(DB_PATH)} ---")
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # 数据库地址与连接池参数来自 src/config.py（DATABASE_URL、DB_POOL_* 环境变量）
+    database_config.apply_to(app)
+    print(f"--- Using database at: {database_config.describe()} ---")
     print("--- Database configured ---")
 
     print("--- Initializing Flask extensions (SQLAlchemy, Migrate) ---")
     db.init_app(app) # db instance from src.models.models
     print("--- SQLAlchemy (db) initialized ---")
     
-    migrate.init_app(app, db) # migrate instance created above
+    # SQLite 连接参数（WAL、busy_timeout 等），可通过 SQLITE_* 环境变量调整
+    sqlite_pragmas.init_app(app, db)
+    print("--- SQLite pragmas registered ---")
+    
+    # 读写分离：配置 DATABASE_REPLICA_URL 后生效
+    read_replica_router.init_app(app, db)
+    print("--- Read replica routing initialized ---")
+    
+    # migrations 目录位于仓库根目录，与启动时的工作目录无关
+    MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR) # migrate instance created above
     print("--- Migrate initialized ---")
     
+    # 详情页浏览量写回缓冲，退出时自动写回剩余计数
+    view_counter.init_app(app, db)
+    print("--- View counter buffer initialized ---")
+    
+    # 支付会话库存预留的过期清理线程
+    reservation_sweeper.init_app(app)
+    print("--- Stock reservation sweeper initialized ---")
+    
+    # Stripe webhook 事件队列的后台 worker 线程池
+    webhook_workers.init_app(app)
+    print("--- Webhook worker pool initialized ---")
+    
     # Bcrypt is already initialized in src.models.models and available via 'db' or directly if User model uses models.bcrypt
     # No need for bcrypt.init_app(app) here if models.bcrypt is used by User methods and flask_bcrypt auto-registers with app if bcrypt = Bcrypt() is global in models
     # The User model in models.py uses the bcrypt instance defined in models.py.
@@ -65,6 +97,14 @@ try:
     app.register_blueprint(shipping_bp, url_prefix='/api/shipping')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
     print("--- Blueprints registered ---")
+    
+    # 响应压缩（COMPRESS_MIN_SIZE 等配置见 src/utils/compression.py）
+    Compressor().init_app(app)
+    print("--- Response compression initialized ---")
+
+    # 静态文件索引：启动时扫描并预压缩，SIGHUP 重新加载（见 src/utils/static_index.py）
+    static_index.init_app(app)
+    print(f"--- Static index built ({len(static_index.files)} files) ---")
 
     print("--- Attempting to create database tables ---")
     with app.app_context():
@@ -82,18 +122,15 @@ except Exception as e:
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    entry = static_index.lookup(path) if path != "" else None
+    if entry is None:
+        entry = static_index.spa_index()
+        if entry is None:
             return "index.html not found", 404
+    return static_index.send(entry)
 
 @app.route('/health')
 def health_check():
@@ -3,6 +3,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from datetime import datetime
+from src.utils.db_dialect import JSONType
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -161,7 +162,7 @@ class Payment(db.Model):
     status = db.Column(db.String(50), default='pending')
     gateway = db.Column(db.String(50))
     transaction_id = db.Column(db.String(255))
-    gateway_response = db.Column(db.JSON)
+    gateway_response = db.Column(JSONType)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
@@ -211,7 +212,7 @@ class Shipment(db.Model):
     __tablename__ = 'shipments'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     tracking_number = db.Column(db.String(100), unique=True)
     carrier = db.Column(db.String(50))
     carrier_service = db.Column(db.String(50))
@@ -269,7 +270,7 @@ class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.String(200))
-    permissions = db.Column(db.JSON)
+    permissions = db.Column(JSONType)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     # 关系
@@ -313,7 +314,7 @@ class Review(db.Model):
     rating = db.Column(db.Integer, nullable=False)
     title = db.Column(db.String(200))
     content = db.Column(db.Text)
-    images = db.Column(db.JSON)
+    images = db.Column(JSONType)
     is_verified = db.Column(db.Boolean, default=False)
     helpful_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -407,10 +408,13 @@ class Notification(db.Model):
     type = db.Column(db.String(50), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    data = db.Column(db.JSON)
+    data = db.Column(JSONType)
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
+    # 通知列表与未读数都按 (user_id, is_read) 过滤、按时间倒序
+    __table_args__ = (db.Index('ix_notifications_user_id_is_read_created_at', 'user_id', 'is_read', 'created_at'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -482,8 +486,8 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     total_amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default='pending')
-    shipping_address = db.Column(db.JSON)
+    status = db.Column(db.String(50), default='pending', index=True)
+    shipping_address = db.Column(JSONType)
     payment_method = db.Column(db.String(50))
     payment_status = db.Column(db.String(50), default='pending')
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -495,6 +499,8 @@ class Order(db.Model):
     shipment = db.relationship('Shipment', backref='order', uselist=False, cascade='all, delete-orphan')
     coupon_usage = db.relationship('CouponUsage', backref='order', uselist=False, cascade='all, delete-orphan')
     
+    __table_args__ = (db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -513,7 +519,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
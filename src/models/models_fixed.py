@@ -4,8 +4,11 @@ import json
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 from decimal import Decimal
+from src.utils.db_dialect import JSONType
+from src.utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession：配置只读副本时，GET 请求的查询走副本
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # ========== 用户表模型 ==========
 class User(db.Model):
@@ -122,6 +125,7 @@ class Product(db.Model):
     view_count = db.Column(db.Integer, default=0)       # 浏览量
     rating_avg = db.Column(db.Numeric(3, 2), default=0) # 平均评分
     review_count = db.Column(db.Integer, default=0)     # 评价数量
+    rating_total = db.Column(db.Integer, default=0)     # 评分总和，用于增量计算平均分
     
     # 关系
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
@@ -133,13 +137,20 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # 列表页 view=card 返回的字段（image 为主图地址）
+    CARD_FIELDS = (
+        'id', 'name', 'price', 'original_price', 'stock', 'category_id', 'is_featured', 'is_new',
+        'sales_count', 'rating_avg', 'review_count', 'image'
+    )
+    
+    # Decimal / datetime 字段由应用的 JSON provider 序列化（src/utils/json_provider.py）
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
-            'price': float(self.price),
-            'original_price': float(self.original_price) if self.original_price else None,
+            'price': self.price,
+            'original_price': self.original_price or None,
             'stock': self.stock,
             'sku': self.sku,
             'material': self.material,
@@ -149,18 +160,18 @@ class Product(db.Model):
             'artist': self.artist,
             'collection_value': self.collection_value,
             'dimensions': self.dimensions,
-            'weight': float(self.weight) if self.weight else None,
+            'weight': self.weight or None,
             'capacity': self.capacity,
             'is_active': self.is_active,
             'is_featured': self.is_featured,
             'is_new': self.is_new,
             'sales_count': self.sales_count,
             'view_count': self.view_count,
-            'rating_avg': float(self.rating_avg) if self.rating_avg else 0,
+            'rating_avg': self.rating_avg or 0,
             'review_count': self.review_count,
             'category_id': self.category_id,
             'images': [img.to_dict() for img in self.images],
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
         }
 
 # ========== 商品图片表 ==========
@@ -199,10 +210,16 @@ class Order(db.Model):
     subtotal = db.Column(db.Numeric(10, 2), nullable=False)      # 商品小计
     shipping_fee = db.Column(db.Numeric(10, 2), default=0)       # 运费
     discount_amount = db.Column(db.Numeric(10, 2), default=0)    # 优惠金额
-    total_amount = db.Column(db.Numeric(10, 2), nullable=False)  # 总金额
+    
+    # 总金额和订单状态修改时先加载数据库中的原值（active_history），
+    # 订单提交后属性已过期时，仪表板统计的 flush 监听也能拿到旧值计算增量
+    total_amount = db.column_property(db.Column(db.Numeric(10, 2), nullable=False), active_history=True)  # 总金额
     
     # 订单状态
-    status = db.Column(db.String(20), default='pending')  # pending, paid, shipped, delivered, cancelled, refunded
+    status = db.column_property(
+        db.Column(db.String(20), default='pending', index=True),  # pending, paid, shipped, delivered, cancelled, refunded
+        active_history=True
+    )
     payment_status = db.Column(db.String(20), default='unpaid')  # unpaid, paid, refunded
     payment_method = db.Column(db.String(50))
     
@@ -225,6 +242,9 @@ class Order(db.Model):
     # 关系
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # 用户订单列表按 user_id 过滤并按时间排序
+    __table_args__ = (db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),)
+    
     def __init__(self, **kwargs):
         super(Order, self).__init__(**kwargs)
         if not self.order_number:
@@ -238,15 +258,16 @@ class Order(db.Model):
         random_str = str(uuid.uuid4()).replace('-', '')[:8]
         return f"PO{timestamp}{random_str}".upper()
     
+    # Decimal / datetime 字段由应用的 JSON provider 序列化（src/utils/json_provider.py）
     def to_dict(self):
         return {
             'id': self.id,
             'order_number': self.order_number,
             'user_id': self.user_id,
-            'subtotal': float(self.subtotal),
-            'shipping_fee': float(self.shipping_fee),
-            'discount_amount': float(self.discount_amount),
-            'total_amount': float(self.total_amount),
+            'subtotal': self.subtotal,
+            'shipping_fee': self.shipping_fee,
+            'discount_amount': self.discount_amount,
+            'total_amount': self.total_amount,
             'status': self.status,
             'payment_status': self.payment_status,
             'payment_method': self.payment_method,
@@ -254,10 +275,10 @@ class Order(db.Model):
             'shipping_method': self.shipping_method,
             'tracking_number': self.tracking_number,
             'customer_notes': self.customer_notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'paid_at': self.paid_at.isoformat() if self.paid_at else None,
-            'shipped_at': self.shipped_at.isoformat() if self.shipped_at else None,
-            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
+            'created_at': self.created_at,
+            'paid_at': self.paid_at,
+            'shipped_at': self.shipped_at,
+            'delivered_at': self.delivered_at,
             'items': [item.to_dict() for item in self.items]
         }
 
@@ -267,7 +288,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     
     # 商品信息快照（防止商品信息变更影响历史订单）
@@ -275,7 +296,7 @@ class OrderItem(db.Model):
     product_sku = db.Column(db.String(50))
     product_image = db.Column(db.String(500))
     
-    quantity = db.Column(db.Integer, nullable=False)
+    quantity = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # 修改时加载原值，用于商品销量统计
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
     
@@ -287,8 +308,8 @@ class OrderItem(db.Model):
             'product_sku': self.product_sku,
             'product_image': self.product_image,
             'quantity': self.quantity,
-            'unit_price': float(self.unit_price),
-            'total_price': float(self.total_price)
+            'unit_price': self.unit_price,
+            'total_price': self.total_price
         }
 
 # ========== 地址表 ==========
@@ -334,7 +355,7 @@ class Review(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
     
-    rating = db.Column(db.Integer, nullable=False)  # 1-5星评分
+    rating = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # 1-5星评分，修改时加载原值用于评分聚合
     title = db.Column(db.String(200))
     content = db.Column(db.Text)
     images = db.Column(db.Text)  # JSON格式存储评价图片
@@ -419,3 +440,291 @@ class Admin(db.Model):
             'last_login': self.last_login.isoformat() if self.last_login else None
         }
 
+
+# ========== 仪表板统计表 ==========
+class DailyOrderMetric(db.Model):
+    """每日订单统计表：按日期和订单状态累计订单数与销售额"""
+    __tablename__ = 'daily_order_metrics'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    metric_date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    order_count = db.Column(db.Integer, default=0, nullable=False)
+    revenue = db.Column(db.Numeric(14, 2), default=0, nullable=False)
+    
+    __table_args__ = (db.UniqueConstraint('metric_date', 'status', name='unique_metric_date_status'),)
+    
+    def to_dict(self):
+        return {
+            'date': self.metric_date.isoformat() if self.metric_date else None,
+            'status': self.status,
+            'order_count': self.order_count,
+            'revenue': float(self.revenue) if self.revenue else 0
+        }
+
+class ProductSalesMetric(db.Model):
+    """商品销量统计表"""
+    __tablename__ = 'product_sales_metrics'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units_sold = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'units_sold': self.units_sold
+        }
+
+
+# ========== 库存预留表 ==========
+class StockReservation(db.Model):
+    """库存预留表：创建支付会话时预扣库存，支付完成后确认，过期未支付时释放"""
+    __tablename__ = 'stock_reservations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='held', nullable=False)  # held, committed, released
+    expires_at = db.Column(db.DateTime, nullable=False)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 清理任务按 (status, expires_at) 查找过期预留
+    __table_args__ = (db.Index('ix_stock_reservations_status_expires_at', 'status', 'expires_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'status': self.status,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+# ========== Webhook 事件队列表 ==========
+class WebhookEvent(db.Model):
+    """Webhook 事件队列表：webhook 验签后只保存原始事件，由后台 worker 异步处理；事件 ID 为主键，重复投递直接丢弃"""
+    __tablename__ = 'webhook_events'
+    
+    id = db.Column(db.String(255), primary_key=True)  # Stripe 事件 ID（evt_...）
+    gateway = db.Column(db.String(50), default='stripe', nullable=False)
+    type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # 原始请求体
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processing, processed, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # 失败重试的最早时间
+    locked_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # worker 按 (status, available_at) 取待处理事件
+    __table_args__ = (db.Index('ix_webhook_events_status_available_at', 'status', 'available_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'gateway': self.gateway,
+            'type': self.type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'available_at': self.available_at.isoformat() if self.available_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+# ========== 物流表 ==========
+class Shipment(db.Model):
+    """物流单表：每个订单的快递信息，状态随订单批量更新和快递扫描同步"""
+    __tablename__ = 'shipments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    tracking_number = db.Column(db.String(100), unique=True)
+    carrier = db.Column(db.String(50))
+    carrier_service = db.Column(db.String(50))
+    status = db.Column(db.String(50), default='pending')
+    
+    # 时间字段
+    shipped_at = db.Column(db.DateTime)
+    estimated_delivery = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    tracking_records = db.relationship(
+        'ShipmentTracking', backref='shipment', lazy=True, cascade='all, delete-orphan',
+        order_by='ShipmentTracking.timestamp'
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'tracking_number': self.tracking_number,
+            'carrier': self.carrier,
+            'carrier_service': self.carrier_service,
+            'status': self.status,
+            'shipped_at': self.shipped_at.isoformat() if self.shipped_at else None,
+            'estimated_delivery': self.estimated_delivery.isoformat() if self.estimated_delivery else None,
+            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'tracking_records': [record.to_dict() for record in self.tracking_records]
+        }
+
+class ShipmentTracking(db.Model):
+    """物流扫描记录表"""
+    __tablename__ = 'shipment_tracking'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    shipment_id = db.Column(db.Integer, db.ForeignKey('shipments.id'), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    location = db.Column(db.String(200))
+    description = db.Column(db.String(500))
+    timestamp = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 批量导入时按 (shipment_id, timestamp) 查找已有扫描记录去重
+    __table_args__ = (db.Index('ix_shipment_tracking_shipment_id_timestamp', 'shipment_id', 'timestamp'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'shipment_id': self.shipment_id,
+            'status': self.status,
+            'location': self.location,
+            'description': self.description,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+# ========== 通知表 ==========
+class Notification(db.Model):
+    """用户通知表"""
+    __tablename__ = 'notifications'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    data = db.Column(JSONType)
+    is_read = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # 通知列表与未读数都按 (user_id, is_read) 过滤、按时间倒序
+    __table_args__ = (db.Index('ix_notifications_user_id_is_read_created_at', 'user_id', 'is_read', 'created_at'),)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'type': self.type,
+            'title': self.title,
+            'content': self.content,
+            'data': self.data,
+            'is_read': self.is_read,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+# ========== 支付表 ==========
+class PaymentMethod(db.Model):
+    """用户保存的支付方式"""
+    __tablename__ = 'payment_methods'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    type = db.Column(db.String(50), nullable=False)  # credit_card, alipay, wechat_pay, paypal
+    provider = db.Column(db.String(50))
+    last_four = db.Column(db.String(4))
+    expiry_month = db.Column(db.Integer)
+    expiry_year = db.Column(db.Integer)
+    is_default = db.Column(db.Boolean, default=False)
+    token = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'type': self.type,
+            'provider': self.provider,
+            'last_four': self.last_four,
+            'expiry_month': self.expiry_month,
+            'expiry_year': self.expiry_year,
+            'is_default': self.is_default,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class Payment(db.Model):
+    """支付记录表：每次创建支付会话生成一条，由 webhook 事件更新状态"""
+    __tablename__ = 'payments'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    payment_method_id = db.Column(db.Integer, db.ForeignKey('payment_methods.id'))
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    currency = db.Column(db.String(3), default='CNY')
+    status = db.Column(db.String(50), default='pending')  # pending, completed, failed, refunded, partially_refunded
+    gateway = db.Column(db.String(50))
+    transaction_id = db.Column(db.String(255))  # Stripe 会话 / PaymentIntent ID
+    gateway_response = db.Column(JSONType)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关系
+    payment_method = db.relationship('PaymentMethod', backref='payments')
+    refunds = db.relationship('Refund', backref='payment', lazy=True, cascade='all, delete-orphan')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'payment_method_id': self.payment_method_id,
+            'amount': self.amount,
+            'currency': self.currency,
+            'status': self.status,
+            'gateway': self.gateway,
+            'transaction_id': self.transaction_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class Refund(db.Model):
+    """退款记录表"""
+    __tablename__ = 'refunds'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    payment_id = db.Column(db.Integer, db.ForeignKey('payments.id'), nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    reason = db.Column(db.String(500))
+    status = db.Column(db.String(50), default='pending')
+    refund_id = db.Column(db.String(255))  # Stripe 退款 ID
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'payment_id': self.payment_id,
+            'amount': self.amount,
+            'reason': self.reason,
+            'status': self.status,
+            'refund_id': self.refund_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
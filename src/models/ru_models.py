@@ -1,10 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 
-db = SQLAlchemy()
+# 与主模型共用同一个 db：评价关联 users 表，评分聚合的 flush 监听和 create_all 也要覆盖汝瓷表
+from src.models.models_fixed import db
 
 # ========== 汝瓷商品表 ==========
 class RuPorcelain(db.Model):
@@ -14,8 +14,8 @@ class RuPorcelain(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    price = db.Column(db.Decimal(10, 2), nullable=False)
-    original_price = db.Column(db.Decimal(10, 2))
+    price = db.Column(db.Numeric(10, 2), nullable=False)
+    original_price = db.Column(db.Numeric(10, 2))
     stock = db.Column(db.Integer, default=0)
     sku = db.Column(db.String(50), unique=True)
     
@@ -47,11 +47,11 @@ class RuPorcelain(db.Model):
     authenticity = db.Column(db.String(30))    # 真伪：真品、高仿、工艺品
     
     # 物理属性
-    height = db.Column(db.Decimal(8, 2))       # 高度(cm)
-    diameter = db.Column(db.Decimal(8, 2))     # 直径(cm)
-    bottom_diameter = db.Column(db.Decimal(8, 2))  # 底径(cm)
-    weight = db.Column(db.Decimal(8, 2))       # 重量(g)
-    thickness = db.Column(db.Decimal(6, 2))    # 胎体厚度(mm)
+    height = db.Column(db.Numeric(8, 2))       # 高度(cm)
+    diameter = db.Column(db.Numeric(8, 2))     # 直径(cm)
+    bottom_diameter = db.Column(db.Numeric(8, 2))  # 底径(cm)
+    weight = db.Column(db.Numeric(8, 2))       # 重量(g)
+    thickness = db.Column(db.Numeric(6, 2))    # 胎体厚度(mm)
     
     # 品相描述
     condition = db.Column(db.String(50))       # 品相：完美、良好、一般、有瑕疵
@@ -78,8 +78,9 @@ class RuPorcelain(db.Model):
     # 销售数据
     view_count = db.Column(db.Integer, default=0)
     inquiry_count = db.Column(db.Integer, default=0)    # 询价次数
-    rating_avg = db.Column(db.Decimal(3, 2), default=0)
+    rating_avg = db.Column(db.Numeric(3, 2), default=0)
     review_count = db.Column(db.Integer, default=0)
+    rating_total = db.Column(db.Integer, default=0)     # 评分总和，用于增量计算平均分
     
     # 关系
     category_id = db.Column(db.Integer, db.ForeignKey('ru_categories.id'))
@@ -90,6 +91,13 @@ class RuPorcelain(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # 列表页 view=card 返回的字段（image 为主图地址）
+    CARD_FIELDS = (
+        'id', 'name', 'price', 'original_price', 'category_id', 'glaze_color', 'vessel_type',
+        'dynasty_period', 'collection_level', 'is_featured', 'is_rare', 'rating_avg', 'review_count',
+        'view_count', 'image'
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -225,7 +233,7 @@ class RuPorcelainReview(db.Model):
     porcelain_id = db.Column(db.Integer, db.ForeignKey('ru_porcelains.id'), nullable=False)
     
     # 评分维度（针对汝瓷特点）
-    overall_rating = db.Column(db.Integer, nullable=False)  # 总体评分 1-5
+    overall_rating = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # 总体评分 1-5，修改时加载原值用于评分聚合
     glaze_rating = db.Column(db.Integer)     # 釉色评分
     craft_rating = db.Column(db.Integer)     # 工艺评分
     condition_rating = db.Column(db.Integer) # 品相评分
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+仪表板统计重建脚本
+根据现有订单和订单项数据回填每日订单统计与商品销量统计
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.services.dashboard_metrics import rebuild_metrics
+
+def rebuild_dashboard_metrics():
+    """重建仪表板统计"""
+    with app.app_context():
+        try:
+            daily_count, product_count = rebuild_metrics()
+            print(f"✓ 写入每日订单统计 {daily_count} 条")
+            print(f"✓ 写入商品销量统计 {product_count} 条")
+            return True
+        except Exception as e:
+            print(f"❌ 重建失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    print("开始重建仪表板统计...")
+    success = rebuild_dashboard_metrics()
+    if success:
+        print("\n✅ 仪表板统计重建成功！")
+    else:
+        print("\n❌ 仪表板统计重建失败！")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+汝瓷全文检索索引重建脚本
+创建 ru_porcelains_fts 并从 ru_porcelains 表回填
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.models.models_fixed import db
+from src.services.porcelain_search import rebuild_search_index as rebuild_index
+
+def rebuild_search_index():
+    """重建汝瓷检索索引"""
+    with app.app_context():
+        try:
+            porcelains = db.Table('ru_porcelains', db.MetaData(), autoload_with=db.engine)
+            with db.engine.begin() as connection:
+                total = rebuild_index(connection, porcelains)
+            print(f"✓ 已索引 {total} 件汝瓷商品")
+            return True
+        except Exception as e:
+            print(f"❌ 重建失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    print("开始重建汝瓷检索索引...")
+    success = rebuild_search_index()
+    if success:
+        print("\n✅ 检索索引重建成功！")
+    else:
+        print("\n❌ 检索索引重建失败！")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+过期库存预留清理脚本
+按批释放已过期的支付会话库存预留、归还库存并取消对应的待支付订单。
+应用内已有后台清理线程，此脚本用于手动执行或配置为定时任务。
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.services.stock_reservations import release_expired
+
+def release_expired_reservations():
+    """释放过期预留"""
+    with app.app_context():
+        try:
+            released = release_expired()
+            print(f"✓ 释放过期预留 {released} 条")
+            return True
+        except Exception as e:
+            print(f"❌ 清理失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    print("开始清理过期库存预留...")
+    success = release_expired_reservations()
+    if success:
+        print("\n✅ 过期库存预留清理完成！")
+    else:
+        print("\n❌ 过期库存预留清理失败！")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+评分聚合修复脚本
+按评价表一次 GROUP BY 重新计算商品的 review_count / rating_total / rating_avg
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.services.rating_aggregates import recompute_rating_aggregates
+
+def repair_rating_aggregates():
+    """修复评分聚合"""
+    with app.app_context():
+        try:
+            results = recompute_rating_aggregates()
+            for table, count in results.items():
+                print(f"✓ {table}: 更新 {count} 条评分统计")
+            return True
+        except Exception as e:
+            print(f"❌ 修复失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    print("开始修复评分统计...")
+    success = repair_rating_aggregates()
+    if success:
+        print("\n✅ 评分统计修复成功！")
+    else:
+        print("\n❌ 评分统计修复失败！")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Webhook 事件回放脚本
+用本地签名密钥（STRIPE_WEBHOOK_SECRET）为录制的 Stripe 事件 JSON 重新签名，
+通过应用的测试客户端投递到 /api/payment/webhook，然后同步处理队列中的事件。
+同一文件投递两次可以验证重复事件被丢弃。
+
+用法: STRIPE_WEBHOOK_SECRET=whsec_test python src/replay_webhook_events.py event1.json [event2.json ...] [--twice]
+"""
+
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.models.models_fixed import WebhookEvent
+from src.services.webhook_queue import process_pending, webhook_workers
+
+def sign_payload(payload, secret, timestamp=None):
+    """生成 Stripe-Signature 请求头（与 stripe.Webhook.construct_event 的校验方式一致）"""
+    timestamp = int(timestamp or time.time())
+    signed = f"{timestamp}.".encode('utf-8') + payload
+    signature = hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+def replay_events(paths, repeat=1):
+    """投递并处理录制的事件"""
+    secret = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    if not secret:
+        print("❌ 未设置 STRIPE_WEBHOOK_SECRET")
+        return False
+
+    # 回放时同步处理，不启动后台线程。init_app 已读取过 WEBHOOK_WORKERS 配置，
+    # 需直接修改线程池（在第一个请求触发 ensure_running 之前）
+    webhook_workers.workers = 0
+    running = [thread.name for thread in threading.enumerate() if thread.name.startswith('webhook-worker-')]
+    if running:
+        print(f"❌ webhook worker 线程已在运行，会与回放争抢事件: {', '.join(running)}")
+        return False
+    client = app.test_client()
+    with app.app_context():
+        try:
+            for path in paths:
+                with open(path, 'rb') as f:
+                    payload = f.read()
+                for _ in range(repeat):
+                    response = client.post(
+                        '/api/payment/webhook',
+                        data=payload,
+                        content_type='application/json',
+                        headers={'Stripe-Signature': sign_payload(payload, secret)}
+                    )
+                    print(f"✓ {path}: {response.status_code} {response.get_json()}")
+
+            processed = process_pending()
+            print(f"✓ 处理事件 {processed} 个")
+            for event in WebhookEvent.query.order_by(WebhookEvent.created_at).all():
+                print(f"  {event.id} {event.type} {event.status} attempts={event.attempts} {event.last_error or ''}")
+            return True
+        except Exception as e:
+            print(f"❌ 回放失败: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--twice']
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    print("开始回放 webhook 事件...")
+    success = replay_events(args, repeat=2 if '--twice' in sys.argv else 1)
+    if success:
+        print("\n✅ webhook 事件回放完成！")
+    else:
+        print("\n❌ webhook 事件回放失败！")
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
-from src.models.models_fixed import db, User, Product, Order, OrderItem, Category, UserRole, Role, Notification
+from src.models.models_fixed import db, User, Product, ProductImage, Order, OrderItem, Category, UserRole, Role, Notification, DailyOrderMetric, ProductSalesMetric
 from datetime import datetime, timedelta
 from sqlalchemy import func, desc
+from sqlalchemy.orm import selectinload
+from src.utils.pagination import paginate, keyset_order, wants_total, InvalidCursorError
+from src.utils.cache import catalog_cache
+from src.utils.projection import parse_fields, project_query, project_rows, ProjectionError
 import json
 
 admin_bp = Blueprint('admin', __name__)
@@ -17,6 +21,33 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# 用户订单统计：一次 GROUP BY 查询计算多个用户的订单数和消费总额
+def get_user_order_stats(user_ids):
+    """返回 {user_id: {'order_count', 'total_spent', 'avg_order_value'}}"""
+    stats = {
+        user_id: {'order_count': 0, 'total_spent': 0, 'avg_order_value': 0}
+        for user_id in user_ids
+    }
+    if not user_ids:
+        return stats
+    
+    rows = db.session.query(
+        Order.user_id,
+        func.count(Order.id).label('order_count'),
+        func.coalesce(func.sum(Order.total_amount), 0).label('total_spent')
+    ).filter(
+        Order.user_id.in_(user_ids)
+    ).group_by(Order.user_id).all()
+    
+    for row in rows:
+        total_spent = float(row.total_spent)
+        stats[row.user_id] = {
+            'order_count': row.order_count,
+            'total_spent': total_spent,
+            'avg_order_value': total_spent / row.order_count if row.order_count > 0 else 0
+        }
+    return stats
+
 # 管理员登录
 @admin_bp.route('/login', methods=['POST'])
 @cross_origin()
@@ -65,44 +96,51 @@ def get_dashboard_data():
         # 统计数据
         total_users = User.query.count()
         total_products = Product.query.count()
-        total_orders = Order.query.count()
         
-        # 今日订单
+        # 订单相关统计均读取预聚合的每日统计表
         today = datetime.utcnow().date()
-        today_orders = Order.query.filter(
-            func.date(Order.created_at) == today
-        ).count()
+        current_month = today.replace(day=1)
+        seven_days_ago = today - timedelta(days=7)
+        
+        total_orders = db.session.query(
+            func.coalesce(func.sum(DailyOrderMetric.order_count), 0)
+        ).scalar()
+        
+        # 今日订单
+        today_orders = db.session.query(
+            func.coalesce(func.sum(DailyOrderMetric.order_count), 0)
+        ).filter(DailyOrderMetric.metric_date == today).scalar()
         
         # 本月销售额
-        current_month = datetime.utcnow().replace(day=1)
-        monthly_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.created_at >= current_month,
-            Order.status.in_(['confirmed', 'delivered'])
+        monthly_revenue = db.session.query(func.sum(DailyOrderMetric.revenue)).filter(
+            DailyOrderMetric.metric_date >= current_month,
+            DailyOrderMetric.status.in_(['confirmed', 'delivered'])
         ).scalar() or 0
         
         # 最近7天的订单统计
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
         daily_orders = db.session.query(
-            func.date(Order.created_at).label('date'),
-            func.count(Order.id).label('count'),
-            func.sum(Order.total_amount).label('revenue')
+            DailyOrderMetric.metric_date.label('date'),
+            func.sum(DailyOrderMetric.order_count).label('count'),
+            func.sum(DailyOrderMetric.revenue).label('revenue')
         ).filter(
-            Order.created_at >= seven_days_ago
-        ).group_by(func.date(Order.created_at)).all()
+            DailyOrderMetric.metric_date >= seven_days_ago
+        ).group_by(DailyOrderMetric.metric_date).order_by(DailyOrderMetric.metric_date).all()
         
         # 热销商品
         popular_products = db.session.query(
             Product.id,
             Product.name,
             Product.image,
-            func.sum(OrderItem.quantity).label('total_sold')
-        ).join(OrderItem).group_by(Product.id).order_by(desc('total_sold')).limit(5).all()
+            ProductSalesMetric.units_sold.label('total_sold')
+        ).join(ProductSalesMetric, ProductSalesMetric.product_id == Product.id).order_by(
+            desc(ProductSalesMetric.units_sold)
+        ).limit(5).all()
         
         # 订单状态分布
         order_status_stats = db.session.query(
-            Order.status,
-            func.count(Order.id).label('count')
-        ).group_by(Order.status).all()
+            DailyOrderMetric.status,
+            func.sum(DailyOrderMetric.order_count).label('count')
+        ).group_by(DailyOrderMetric.status).having(func.sum(DailyOrderMetric.order_count) > 0).all()
         
         return jsonify({
             'stats': {
@@ -149,6 +187,8 @@ def get_admin_products():
         search = request.args.get('search', '')
         category = request.args.get('category', '')
         
+        fields = parse_fields(request.args, Product, Product.CARD_FIELDS)
+        
         query = Product.query
         
         if search:
@@ -157,15 +197,24 @@ def get_admin_products():
         if category:
             query = query.filter(Product.category == category)
         
-        products = query.paginate(page=page, per_page=per_page, error_out=False)
+        if fields is None:
+            # 一次批量加载本页所有商品图片，避免逐个商品查询
+            products = query.options(selectinload(Product.images)).paginate(page=page, per_page=per_page, error_out=False)
+            items = [product.to_dict() for product in products.items]
+        else:
+            # 只查询请求的列，不创建 ORM 对象
+            products = project_query(query, Product, fields).paginate(page=page, per_page=per_page, error_out=False)
+            items = project_rows(db.session, products.items, fields, ProductImage, ProductImage.product_id)
         
         return jsonify({
-            'products': [product.to_dict() for product in products.items],
+            'products': items,
             'total': products.total,
             'pages': products.pages,
             'current_page': page
         })
         
+    except ProjectionError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,6 +239,7 @@ def create_product():
         
         db.session.add(product)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Product created successfully',
@@ -213,6 +263,7 @@ def update_product(product_id):
                 setattr(product, field, data[field])
         
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -231,6 +282,7 @@ def delete_product(product_id):
         product = Product.query.get_or_404(product_id)
         db.session.delete(product)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Product deleted successfully'})
         
@@ -247,21 +299,34 @@ def get_admin_orders():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', '')
+        cursor = request.args.get('cursor')
+        with_total = wants_total(request.args)
         
-        query = Order.query
+        # 一次批量加载本页所有订单项
+        query = Order.query.options(selectinload(Order.items))
         
         if status:
             query = query.filter(Order.status == status)
         
-        orders = query.order_by(desc(Order.created_at)).paginate(page=page, per_page=per_page, error_out=False)
+        # 传入 cursor 时按 (created_at, id) 游标分页，避免深翻页的 OFFSET 扫描
+        orders = paginate(
+            query.order_by(*keyset_order(Order.created_at, Order.id)), page, per_page,
+            cursor=cursor,
+            sort_column=Order.created_at,
+            id_column=Order.id,
+            with_total=with_total
+        )
         
         return jsonify({
             'orders': [order.to_dict() for order in orders.items],
             'total': orders.total,
             'pages': orders.pages,
-            'current_page': page
+            'current_page': page if cursor is None else None,
+            'next_cursor': orders.next_cursor
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -390,6 +455,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Category created successfully',
@@ -400,6 +466,14 @@ def create_category():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# 缓存监控
+@admin_bp.route('/cache-stats', methods=['GET'])
+@cross_origin()
+@admin_required
+def get_cache_stats():
+    """获取目录缓存命中统计"""
+    return jsonify({'catalog': catalog_cache.stats()})
+
 # 系统设置
 @admin_bp.route('/settings', methods=['GET'])
 @cross_origin()
@@ -509,12 +583,12 @@ def get_users():
         
         users = query.order_by(desc(User.created_at)).paginate(page=page, per_page=per_page, error_out=False)
         
+        # 本页用户的统计数据一次查询得出
+        order_stats = get_user_order_stats([user.id for user in users.items])
+        
         users_data = []
         for user in users.items:
-            # 计算用户统计数据
-            user_orders = Order.query.filter_by(user_id=user.id).all()
-            total_spent = sum(float(order.total_amount) for order in user_orders)
-            order_count = len(user_orders)
+            stats = order_stats[user.id]
             
             user_data = {
                 'id': user.id,
@@ -524,9 +598,9 @@ def get_users():
                 'created_at': user.created_at.isoformat() if user.created_at else None,
                 'updated_at': user.updated_at.isoformat() if user.updated_at else None,
                 'last_login': getattr(user, 'last_login', None),
-                'order_count': order_count,
-                'total_spent': total_spent,
-                'avg_order_value': total_spent / order_count if order_count > 0 else 0
+                'order_count': stats['order_count'],
+                'total_spent': stats['total_spent'],
+                'avg_order_value': stats['avg_order_value']
             }
             users_data.append(user_data)
         
@@ -577,9 +651,7 @@ def get_user_detail(user_id):
                 addresses.append(address_data)
         
         # 计算统计数据
-        all_orders = Order.query.filter_by(user_id=user_id).all()
-        total_spent = sum(float(order.total_amount) for order in all_orders)
-        order_count = len(all_orders)
+        stats = get_user_order_stats([user.id])[user.id]
         
         user_data = {
             'id': user.id,
@@ -589,9 +661,9 @@ def get_user_detail(user_id):
             'created_at': user.created_at.isoformat() if user.created_at else None,
             'updated_at': user.updated_at.isoformat() if user.updated_at else None,
             'last_login': getattr(user, 'last_login', None),
-            'order_count': order_count,
-            'total_spent': total_spent,
-            'avg_order_value': total_spent / order_count if order_count > 0 else 0,
+            'order_count': stats['order_count'],
+            'total_spent': stats['total_spent'],
+            'avg_order_value': stats['avg_order_value'],
             'recent_orders': recent_orders,
             'addresses': addresses
         }
@@ -2,13 +2,19 @@ from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 import stripe
 import os
-from src.models.models_fixed import db, Order, OrderItem, Payment, PaymentMethod, User, Product
+from src.models.models_fixed import db, Order, OrderItem, Payment, PaymentMethod, Refund, User, Product
+from src.services.cart import resolve_cart, CartError
+from src.services.inventory import InsufficientStockError
+from src.services.stock_reservations import (
+    session_expires_at, reservation_expiry, hold_stock, commit_reservations, release_reservations
+)
+from src.services.webhook_queue import event_handler, enqueue_event, EVENT_HANDLERS
+from src.services.payment_gateway import get_gateway, new_idempotency_key, PaymentGatewayError
 from datetime import datetime
 
 payment_bp = Blueprint('payment', __name__)
 
-# 设置Stripe API密钥
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY', 'sk_test_...')  # 需要设置环境变量
+# Stripe API密钥和连接设置见 src/services/payment_gateway.py（需要设置环境变量 STRIPE_SECRET_KEY）
 
 @payment_bp.route('/config', methods=['GET'])
 @cross_origin()
@@ -33,17 +39,14 @@ def create_checkout_session():
         if not user_id or not items:
             return jsonify({'error': 'Missing required data'}), 400
         
-        # 计算总金额并创建line_items
+        # 一次查询解析购物车，计算总金额并创建line_items
+        cart = resolve_cart(items, check_stock=False)
+        total_amount = cart.subtotal
         line_items = []
-        total_amount = 0
         
-        for item in items:
-            product = Product.query.get(item['product_id'])
-            if not product:
-                return jsonify({'error': f'Product {item["product_id"]} not found'}), 400
-            
-            quantity = item['quantity']
-            unit_amount = int(product.price * 100)  # Stripe使用分为单位
+        for line in cart.lines:
+            product = line.product
+            unit_amount = int(line.unit_price * 100)  # Stripe使用分为单位
             
             line_items.append({
                 'price_data': {
@@ -54,14 +57,13 @@ def create_checkout_session():
                     },
                     'unit_amount': unit_amount,
                 },
-                'quantity': quantity,
+                'quantity': line.quantity,
             })
-            
-            total_amount += product.price * quantity
         
         # 创建订单记录
         order = Order(
             user_id=user_id,
+            subtotal=total_amount,
             total_amount=total_amount,
             status='pending',
             payment_status='pending',
@@ -70,34 +72,64 @@ def create_checkout_session():
         db.session.add(order)
         db.session.flush()  # 获取订单ID
         
-        # 创建订单项
-        for item in items:
-            product = Product.query.get(item['product_id'])
+        # 创建订单项（复用已解析的购物车，不再逐个查询商品）
+        for line in cart.lines:
             order_item = OrderItem(
                 order_id=order.id,
-                product_id=item['product_id'],
-                quantity=item['quantity'],
-                unit_price=product.price,
-                total_price=product.price * item['quantity']
+                product_id=line.product_id,
+                product_name=line.product.name,
+                product_sku=line.product.sku,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.total_price
             )
             db.session.add(order_item)
         
-        # 创建Stripe Checkout会话
-        checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=line_items,
-            mode='payment',
-            success_url=data.get('success_url', 'http://localhost:3000/payment/success?session_id={CHECKOUT_SESSION_ID}'),
-            cancel_url=data.get('cancel_url', 'http://localhost:3000/payment/cancel'),
-            metadata={
-                'order_id': str(order.id),
+        # 预扣库存，会话过期未支付时由清理任务释放（预留比会话晚过期）
+        hold_stock(order.id, cart.quantities(), reservation_expiry())
+        
+        # 先提交订单和库存预留，调用 Stripe 期间不持有数据库事务
+        order_id = order.id
+        db.session.commit()
+        
+    except CartError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    try:
+        # 创建Stripe Checkout会话（会话先于预留过期，过期后不能再支付；expires_at 紧挨调用前计算）
+        # 幂等键绑定订单，网关重试不会为同一订单创建多个会话
+        checkout_session = get_gateway().create_checkout_session({
+            'payment_method_types': ['card'],
+            'line_items': line_items,
+            'mode': 'payment',
+            'expires_at': session_expires_at(),
+            'success_url': data.get('success_url', 'http://localhost:3000/payment/success?session_id={CHECKOUT_SESSION_ID}'),
+            'cancel_url': data.get('cancel_url', 'http://localhost:3000/payment/cancel'),
+            'metadata': {
+                'order_id': str(order_id),
                 'user_id': str(user_id)
             }
-        )
-        
+        }, idempotency_key=f'checkout-order-{order_id}')
+    except PaymentGatewayError as e:
+        # 会话没有创建成功，立即释放预留并取消订单
+        try:
+            release_reservations(order_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+        return jsonify({'error': e.message, 'order_id': order_id}), e.status_code
+    
+    try:
         # 创建支付记录
         payment = Payment(
-            order_id=order.id,
+            order_id=order_id,
             amount=total_amount,
             currency='CNY',
             status='pending',
@@ -109,7 +141,7 @@ def create_checkout_session():
         
         return jsonify({
             'checkout_session_id': checkout_session.id,
-            'order_id': order.id
+            'order_id': order_id
         })
         
     except Exception as e:
@@ -133,52 +165,68 @@ def stripe_webhook():
     except stripe.error.SignatureVerificationError:
         return jsonify({'error': 'Invalid signature'}), 400
     
-    # 处理事件
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        handle_checkout_session_completed(session)
-    elif event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        handle_payment_succeeded(payment_intent)
+    # 只保存事件，由后台 worker 异步处理（src/services/webhook_queue.py），重复投递的事件直接丢弃
+    if event['type'] not in EVENT_HANDLERS:
+        return jsonify({'status': 'ignored'})
     
-    return jsonify({'status': 'success'})
+    try:
+        queued = enqueue_event(event['id'], event['type'], payload.decode('utf-8'))
+    except Exception as e:
+        db.session.rollback()
+        # 返回 5xx 让 Stripe 稍后重试
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({'status': 'queued' if queued else 'duplicate'})
 
+@event_handler('checkout.session.completed')
 def handle_checkout_session_completed(session):
     """处理支付完成事件"""
-    try:
-        order_id = session['metadata']['order_id']
+    order_id = session['metadata']['order_id']
+    
+    # 更新订单状态
+    order = Order.query.get(order_id)
+    if order:
+        order.status = 'confirmed'
+        order.payment_status = 'completed'
         
-        # 更新订单状态
-        order = Order.query.get(order_id)
-        if order:
-            order.status = 'confirmed'
-            order.payment_status = 'completed'
-            
-            # 更新支付记录
-            payment = Payment.query.filter_by(
-                order_id=order_id,
-                transaction_id=session['id']
-            ).first()
-            if payment:
-                payment.status = 'completed'
-                payment.gateway_response = session
-            
-            db.session.commit()
-            
-            # 这里可以添加发送确认邮件、更新库存等逻辑
-            
-    except Exception as e:
-        print(f"Error handling checkout session completed: {e}")
-        db.session.rollback()
+        # 更新支付记录
+        payment = Payment.query.filter_by(
+            order_id=order_id,
+            transaction_id=session['id']
+        ).first()
+        if payment:
+            payment.status = 'completed'
+            payment.gateway_response = session
+        
+        # 确认库存预留；预留已过期释放时会重新扣减
+        try:
+            with db.session.begin_nested():
+                commit_reservations(order.id)
+        except InsufficientStockError as e:
+            # 已经收款但库存不足，订单照常确认，需人工补货或退款
+            print(f"Order {order.id} paid after reservation expired, insufficient stock: {e.failures}")
+        
+        # 这里可以添加发送确认邮件等逻辑
+
+@event_handler('checkout.session.expired')
+def handle_checkout_session_expired(session):
+    """处理支付会话过期事件：立即释放库存预留并取消订单"""
+    order_id = int(session['metadata']['order_id'])
+    release_reservations(order_id)
+    
+    payment = Payment.query.filter_by(
+        order_id=order_id,
+        transaction_id=session['id']
+    ).first()
+    if payment and payment.status == 'pending':
+        payment.status = 'failed'
 
+@event_handler('payment_intent.succeeded')
 def handle_payment_succeeded(payment_intent):
     """处理支付成功事件"""
-    try:
-        # 根据payment_intent更新相关记录
-        # 这里可以添加额外的业务逻辑
-        pass
-    except Exception as e:
-        print(f"Error handling payment succeeded: {e}")
+    # 根据payment_intent更新相关记录
+    # 这里可以添加额外的业务逻辑
+    pass
 
 @payment_bp.route('/payment-status/<int:order_id>', methods=['GET'])
 @cross_origin()
@@ -206,15 +254,18 @@ def create_payment_intent():
         amount = data.get('amount')  # 金额（分）
         currency = data.get('currency', 'cny')
         
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency=currency,
-            metadata=data.get('metadata', {})
-        )
+        # 前端重新提交时带上同一个 idempotency_key，不会创建重复的 PaymentIntent
+        intent = get_gateway().create_payment_intent({
+            'amount': amount,
+            'currency': currency,
+            'metadata': data.get('metadata', {})
+        }, idempotency_key=data.get('idempotency_key') or new_idempotency_key('payment-intent'))
         
         return jsonify({
             'client_secret': intent.client_secret
         })
+    except PaymentGatewayError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -228,7 +279,7 @@ def save_payment_method():
         payment_method_id = data.get('payment_method_id')  # Stripe返回的payment method ID
         
         # 从Stripe获取支付方式详情
-        payment_method = stripe.PaymentMethod.retrieve(payment_method_id)
+        payment_method = get_gateway().retrieve_payment_method(payment_method_id)
         
         # 保存到数据库
         user_payment_method = PaymentMethod(
@@ -254,6 +305,9 @@ def save_payment_method():
             'payment_method': user_payment_method.to_dict()
         })
         
+    except PaymentGatewayError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -269,31 +323,40 @@ def create_refund():
         reason = data.get('reason', '')
         
         payment = Payment.query.get_or_404(payment_id)
+        transaction_id = payment.transaction_id
+        # 结束读取支付记录的事务，调用 Stripe 期间不持有数据库事务
+        db.session.rollback()
         
         # 创建Stripe退款
         refund_data = {
-            'payment_intent': payment.transaction_id,
+            'payment_intent': transaction_id,
             'reason': 'requested_by_customer'
         }
         
-        if amount:
-            refund_data['amount'] = int(amount * 100)  # 转换为分
+        amount_cents = int(round(float(amount) * 100)) if amount else None  # 转换为分
+        if amount_cents:
+            refund_data['amount'] = amount_cents
         
-        stripe_refund = stripe.Refund.create(**refund_data)
+        # 客户端没有提供幂等键时由支付记录和退款金额确定（与 checkout-order-{id} 相同），
+        # 超时后重试同一退款请求不会再退一次款
+        idempotency_key = data.get('idempotency_key') or f"refund-payment-{payment_id}-{amount_cents or 'full'}"
+        stripe_refund = get_gateway().create_refund(refund_data, idempotency_key=idempotency_key)
         
-        # 保存退款记录
-        from src.models.models_fixed import Refund
-        refund = Refund(
-            payment_id=payment_id,
-            amount=amount or payment.amount,
-            reason=reason,
-            status='pending',
-            refund_id=stripe_refund.id
-        )
-        db.session.add(refund)
-        
-        # 更新支付状态
-        payment.status = 'refunded' if not amount or amount >= payment.amount else 'partially_refunded'
+        payment = Payment.query.get(payment_id)
+        # 保存退款记录；重试返回的是同一笔退款，不重复记录
+        refund = Refund.query.filter_by(refund_id=stripe_refund.id).first()
+        if refund is None:
+            refund = Refund(
+                payment_id=payment_id,
+                amount=amount or payment.amount,
+                reason=reason,
+                status='pending',
+                refund_id=stripe_refund.id
+            )
+            db.session.add(refund)
+            
+            # 更新支付状态
+            payment.status = 'refunded' if not amount or amount >= payment.amount else 'partially_refunded'
         
         db.session.commit()
         
@@ -302,6 +365,9 @@ def create_refund():
             'refund': refund.to_dict()
         })
         
+    except PaymentGatewayError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_cors import cross_origin
-from src.models.models_fixed import db, Product, Category, Order, OrderItem, User
+from sqlalchemy.orm import selectinload
+from src.models.models_fixed import db, Product, ProductImage, Category, Order, OrderItem, User
+from src.utils.pagination import paginate, keyset_order, wants_total, InvalidCursorError
+from src.utils.cache import catalog_cache
+from src.utils.http_cache import collection_version, make_etag, conditional_response
+from src.utils.projection import parse_fields, project_query, project_rows, ProjectionError
+from src.services.cart import resolve_cart, CartError
+from src.services.inventory import decrement_stock, InsufficientStockError
 
 product_bp = Blueprint('product', __name__)
 
@@ -15,6 +22,10 @@ def get_products():
         sort_by = request.args.get('sort_by', 'default')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        with_total = wants_total(request.args)
+        # view=card / fields=... select only those columns (None means full objects)
+        fields = parse_fields(request.args, Product, Product.CARD_FIELDS)
         
         # Build query
         query = Product.query
@@ -28,25 +39,60 @@ def get_products():
         if max_price is not None:
             query = query.filter(Product.price <= max_price)
         
-        # Apply sorting
+        # Version of the filtered set (row count + max updated_at) drives ETag / 304.
+        # with_total=false skips the aggregate query entirely (no ETag, no count)
+        count, last_modified, etag = None, None, None
+        if with_total:
+            count, last_modified = collection_version(query, Product.updated_at)
+            etag = make_etag(count, last_modified)
+        
+        # Images for the whole page are loaded in one batched SELECT
+        if fields is None:
+            query = query.options(selectinload(Product.images))
+        
+        # Apply sorting: the same (sort keys..., id) order is used for offset and cursor pages
+        sort_columns, descending = (), False
         if sort_by == 'price-low':
-            query = query.order_by(Product.price.asc())
+            sort_columns, descending = (Product.price,), False
         elif sort_by == 'price-high':
-            query = query.order_by(Product.price.desc())
+            sort_columns, descending = (Product.price,), True
         elif sort_by == 'rating':
-            query = query.order_by(Product.rating.desc())
+            sort_columns, descending = (Product.rating,), True
         elif sort_by == 'newest':
-            query = query.order_by(Product.is_new.desc(), Product.created_at.desc())
+            sort_columns, descending = (Product.is_new, Product.created_at), True
+        query = query.order_by(*keyset_order(sort_columns, Product.id, descending))
         
-        # Paginate
-        products = query.paginate(page=page, per_page=per_page, error_out=False)
+        if fields is not None:
+            query = project_query(query, Product, fields, extra_columns=sort_columns + (Product.id,))
         
-        return jsonify({
-            'products': [product.to_dict() for product in products.items],
-            'total': products.total,
-            'pages': products.pages,
-            'current_page': page
-        })
+        def build_response():
+            # Paginate (offset by default, keyset when a cursor is given)
+            products = paginate(
+                query, page, per_page,
+                cursor=cursor,
+                sort_column=sort_columns,
+                id_column=Product.id,
+                descending=descending,
+                with_total=with_total,
+                total=count  # the version query already counted the filtered set
+            )
+            
+            if fields is None:
+                items = [product.to_dict() for product in products.items]
+            else:
+                items = project_rows(db.session, products.items, fields, ProductImage, ProductImage.product_id)
+            
+            return jsonify({
+                'products': items,
+                'total': products.total,
+                'pages': products.pages,
+                'current_page': page if cursor is None else None,
+                'next_cursor': products.next_cursor
+            })
+        
+        return conditional_response(build_response, etag, last_modified, policy='catalog_list')
+    except (InvalidCursorError, ProjectionError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.exception("--- ERROR IN GET_PRODUCTS ---")
         return jsonify({'error': str(e)}), 500
@@ -56,7 +102,12 @@ def get_products():
 def get_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
-        return jsonify(product.to_dict())
+        return conditional_response(
+            lambda: jsonify(product.to_dict()),
+            make_etag(product.id, product.updated_at),
+            product.updated_at,
+            policy='revalidate'  # 详情含实时库存，每次回源验证
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -64,8 +115,11 @@ def get_product(product_id):
 @cross_origin()
 def get_categories():
     try:
-        categories = Category.query.filter_by(is_active=True).all()
-        return jsonify([category.to_dict() for category in categories])
+        categories = catalog_cache.get_or_set(
+            'categories',
+            lambda: [category.to_dict() for category in Category.query.filter_by(is_active=True).all()]
+        )
+        return jsonify(categories)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -75,9 +129,19 @@ def create_order():
     try:
         data = request.get_json()
         
-        # Create new order
+        user_id = data.get('user_id')
+        if not user_id:
+            return jsonify({'error': 'Missing required data'}), 400
+        
+        # Resolve the whole cart (products, prices) with a single query;
+        # stock is checked atomically by decrement_stock below
+        cart = resolve_cart(data['items'], check_stock=False)
+        
+        # Create new order (amounts come from current prices, any client total is ignored)
         order = Order(
-            total_amount=data['total_amount'],
+            user_id=user_id,
+            subtotal=cart.subtotal,
+            total_amount=cart.subtotal,
             shipping_address=data['shipping_address'],
             payment_method=data['payment_method']
         )
@@ -86,27 +150,22 @@ def create_order():
         db.session.flush()  # Get the order ID
         
         # Add order items
-        for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
-            if not product:
-                return jsonify({'error': f'Product {item_data["product_id"]} not found'}), 400
-            
-            if product.stock < item_data['quantity']:
-                return jsonify({'error': f'Insufficient stock for product {product.name}'}), 400
-            
+        for line in cart.lines:
             order_item = OrderItem(
                 order_id=order.id,
-                product_id=item_data['product_id'],
-                quantity=item_data['quantity'],
-                unit_price=product.price,
-                total_price=product.price * item_data['quantity']
+                product_id=line.product_id,
+                product_name=line.product.name,
+                product_sku=line.product.sku,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.total_price
             )
             
-            # Update product stock
-            product.stock -= item_data['quantity']
-            
             db.session.add(order_item)
         
+        # Conditional UPDATE per product: fails instead of overselling under concurrency
+        decrement_stock(cart.quantities())
+        
         db.session.commit()
         
         return jsonify({
@@ -114,6 +173,12 @@ def create_order():
             'order_id': order.id
         }), 201
         
+    except CartError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), e.status_code
+    except InsufficientStockError as e:
+        db.session.rollback()
+        return jsonify(e.to_dict()), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -150,6 +215,7 @@ def create_product():
         
         db.session.add(product)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Product created successfully',
@@ -174,6 +240,7 @@ def update_product(product_id):
                 setattr(product, field, data[field])
         
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -191,6 +258,7 @@ def delete_product(product_id):
         product = Product.query.get_or_404(product_id)
         db.session.delete(product)
         db.session.commit()
+        catalog_cache.invalidate()
         
         return jsonify({'message': 'Product deleted successfully'})
         
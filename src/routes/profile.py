@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 from src.models.models_fixed import db, User, UserProfile, Address, Wishlist, PaymentMethod, Notification
+from src.utils.pagination import paginate, keyset_order, wants_total, InvalidCursorError
 from datetime import datetime
 
 profile_bp = Blueprint('profile', __name__)
@@ -215,18 +216,27 @@ def get_user_notifications(user_id):
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
         
-        notifications = Notification.query.filter_by(user_id=user_id)\
-            .order_by(Notification.created_at.desc())\
-            .paginate(page=page, per_page=per_page, error_out=False)
+        notifications = paginate(
+            Notification.query.filter_by(user_id=user_id).order_by(*keyset_order(Notification.created_at, Notification.id)),
+            page, per_page,
+            cursor=cursor,
+            sort_column=Notification.created_at,
+            id_column=Notification.id,
+            with_total=wants_total(request.args)
+        )
         
         return jsonify({
             'notifications': [notification.to_dict() for notification in notifications.items],
             'total': notifications.total,
             'pages': notifications.pages,
-            'current_page': page,
+            'current_page': page if cursor is None else None,
+            'next_cursor': notifications.next_cursor,
             'unread_count': Notification.query.filter_by(user_id=user_id, is_read=False).count()
         })
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
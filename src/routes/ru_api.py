@@ -1,11 +1,21 @@
 from flask import Blueprint, request, jsonify
-from models.models import db, User, Order, OrderItem, Address
-from models.ru_models import RuPorcelain, RuCategory, RuPorcelainImage, RuPorcelainReview, RuKnowledge, RuInquiry
+from src.models.models_fixed import db, User, Order, OrderItem, Address
+from src.models.ru_models import RuPorcelain, RuCategory, RuPorcelainImage, RuPorcelainReview, RuKnowledge, RuInquiry
+from src.utils.pagination import paginate, keyset_order, wants_total, InvalidCursorError
+from src.utils.cache import catalog_cache
+from src.utils.http_cache import collection_version, make_etag, conditional_response
+from src.utils.projection import parse_fields, project_query, project_rows, ProjectionError
+from src.services.view_counter import view_counter
+from src.services import rating_aggregates  # noqa: F401  汝瓷评价的评分聚合在服务模块中登记
+from src.services import porcelain_search
 from datetime import datetime
 import json
 
 ru_bp = Blueprint('ru', __name__)
 
+# 汝瓷商品增删改时同步全文检索索引
+porcelain_search.register_search_index(RuPorcelain)
+
 # ========== 汝瓷商品相关API ==========
 
 @ru_bp.route('/porcelains', methods=['GET'])
@@ -22,8 +32,12 @@ def get_porcelains():
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
         search = request.args.get('search')
-        sort_by = request.args.get('sort_by', 'created_at')  # created_at, price, view_count
+        # created_at, price, view_count, relevance（有搜索词时默认按相关度）
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'created_at')
         sort_order = request.args.get('sort_order', 'desc')  # asc, desc
+        with_total = wants_total(request.args)
+        # view=card / fields=... 只查询需要的列（None 表示完整数据）
+        fields = parse_fields(request.args, RuPorcelain, RuPorcelain.CARD_FIELDS)
         
         # 构建查询
         query = RuPorcelain.query.filter_by(is_active=True)
@@ -48,8 +62,11 @@ def get_porcelains():
         if max_price:
             query = query.filter(RuPorcelain.price <= max_price)
         
-        # 搜索
-        if search:
+        # 搜索：优先使用全文检索索引，索引不可用时回退到 LIKE
+        fts = porcelain_search.search_subquery(db.session, search) if search else None
+        if fts is not None:
+            query = query.join(fts, fts.c.porcelain_id == RuPorcelain.id)
+        elif search:
             search_term = f'%{search}%'
             query = query.filter(
                 db.or_(
@@ -60,8 +77,17 @@ def get_porcelains():
                 )
             )
         
+        # 数据版本（行数 + 最大更新时间）用于 ETag，未变化时返回 304；
+        # with_total=false 时不执行这条聚合查询（没有总数，也不带 ETag）
+        count, last_modified, etag = None, None, None
+        if with_total:
+            count, last_modified = collection_version(query, RuPorcelain.updated_at)
+            etag = make_etag(count, last_modified)
+        
         # 排序
-        if sort_by == 'price':
+        if sort_by == 'relevance' and fts is not None:
+            query = query.order_by(fts.c.rank.asc(), RuPorcelain.id.desc())
+        elif sort_by == 'price':
             if sort_order == 'asc':
                 query = query.order_by(RuPorcelain.price.asc())
             else:
@@ -74,28 +100,39 @@ def get_porcelains():
             else:
                 query = query.order_by(RuPorcelain.created_at.desc())
         
-        # 分页
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        porcelains = [p.to_dict() for p in pagination.items]
+        if fields is not None:
+            query = project_query(query, RuPorcelain, fields)
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'porcelains': porcelains,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_next': pagination.has_next,
-                    'has_prev': pagination.has_prev
+        def build_response():
+            # 分页（总数复用数据版本查询的行数，不再单独 COUNT）
+            pagination = paginate(query, page, per_page, with_total=with_total, total=count)
+            
+            if fields is None:
+                porcelains = [p.to_dict() for p in pagination.items]
+            else:
+                porcelains = project_rows(
+                    db.session, pagination.items, fields, RuPorcelainImage, RuPorcelainImage.porcelain_id
+                )
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'porcelains': porcelains,
+                    'pagination': {
+                        'page': page,
+                        'per_page': per_page,
+                        'total': pagination.total,
+                        'pages': pagination.pages,
+                        'has_next': pagination.has_next,
+                        'has_prev': pagination.has_prev
+                    }
                 }
-            }
-        })
+            })
         
+        return conditional_response(build_response, etag, last_modified, policy='catalog_list')
+        
+    except ProjectionError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -105,9 +142,8 @@ def get_porcelain_detail(porcelain_id):
     try:
         porcelain = RuPorcelain.query.get_or_404(porcelain_id)
         
-        # 增加浏览量
-        porcelain.view_count += 1
-        db.session.commit()
+        # 增加浏览量（写入缓冲区，批量写回数据库）
+        view_counter.increment(RuPorcelain.__table__, porcelain_id)
         
         # 获取相关推荐（同类型或同釉色）
         related_query = RuPorcelain.query.filter(
@@ -122,13 +158,25 @@ def get_porcelain_detail(porcelain_id):
         
         related_porcelains = related_query.limit(4).all()
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'porcelain': porcelain.to_dict(),
-                'related_porcelains': [p.to_dict() for p in related_porcelains]
-            }
-        })
+        # 版本由商品及相关推荐的更新时间决定；实时浏览量不计入版本，因此使用弱 ETag
+        versions = [(p.id, p.updated_at) for p in [porcelain] + related_porcelains]
+        last_modified = max((p.updated_at for p in [porcelain] + related_porcelains if p.updated_at), default=None)
+        
+        def build_response():
+            porcelain_data = porcelain.to_dict()
+            porcelain_data['view_count'] = (porcelain.view_count or 0) + view_counter.pending_count(RuPorcelain.__table__, porcelain_id)
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'porcelain': porcelain_data,
+                    'related_porcelains': [p.to_dict() for p in related_porcelains]
+                }
+            })
+        
+        return conditional_response(
+            build_response, make_etag(versions), last_modified, policy='revalidate', weak=True
+        )
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -139,15 +187,20 @@ def get_featured_porcelains():
     try:
         limit = request.args.get('limit', 8, type=int)
         
-        porcelains = RuPorcelain.query.filter_by(
+        query = RuPorcelain.query.filter_by(
             is_active=True, 
             is_featured=True
-        ).order_by(RuPorcelain.created_at.desc()).limit(limit).all()
+        )
+        count, last_modified = collection_version(query, RuPorcelain.updated_at)
         
-        return jsonify({
-            'success': True,
-            'data': [p.to_dict() for p in porcelains]
-        })
+        def build_response():
+            porcelains = query.order_by(RuPorcelain.created_at.desc()).limit(limit).all()
+            return jsonify({
+                'success': True,
+                'data': [p.to_dict() for p in porcelains]
+            })
+        
+        return conditional_response(build_response, make_etag(count, last_modified), last_modified, policy='catalog_list')
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -158,15 +211,20 @@ def get_rare_porcelains():
     try:
         limit = request.args.get('limit', 6, type=int)
         
-        porcelains = RuPorcelain.query.filter_by(
+        query = RuPorcelain.query.filter_by(
             is_active=True, 
             is_rare=True
-        ).order_by(RuPorcelain.price.desc()).limit(limit).all()
+        )
+        count, last_modified = collection_version(query, RuPorcelain.updated_at)
         
-        return jsonify({
-            'success': True,
-            'data': [p.to_dict() for p in porcelains]
-        })
+        def build_response():
+            porcelains = query.order_by(RuPorcelain.price.desc()).limit(limit).all()
+            return jsonify({
+                'success': True,
+                'data': [p.to_dict() for p in porcelains]
+            })
+        
+        return conditional_response(build_response, make_etag(count, last_modified), last_modified, policy='catalog_list')
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -179,27 +237,31 @@ def get_categories():
     try:
         category_type = request.args.get('type')  # vessel_type, glaze_color, collection_level, dynasty_period
         
-        query = RuCategory.query.filter_by(is_active=True)
-        
-        if category_type:
-            query = query.filter_by(category_type=category_type)
-        
-        categories = query.order_by(RuCategory.sort_order).all()
-        
-        # 构建树形结构
-        category_tree = []
-        category_dict = {cat.id: cat.to_dict() for cat in categories}
-        
-        for cat in categories:
-            cat_dict = category_dict[cat.id]
-            if cat.parent_id is None:
-                cat_dict['children'] = []
-                category_tree.append(cat_dict)
-            else:
-                if cat.parent_id in category_dict:
-                    if 'children' not in category_dict[cat.parent_id]:
-                        category_dict[cat.parent_id]['children'] = []
-                    category_dict[cat.parent_id]['children'].append(cat_dict)
+        def build_category_tree():
+            query = RuCategory.query.filter_by(is_active=True)
+            
+            if category_type:
+                query = query.filter_by(category_type=category_type)
+            
+            categories = query.order_by(RuCategory.sort_order).all()
+            
+            # 构建树形结构
+            category_tree = []
+            category_dict = {cat.id: cat.to_dict() for cat in categories}
+            
+            for cat in categories:
+                cat_dict = category_dict[cat.id]
+                if cat.parent_id is None:
+                    cat_dict['children'] = []
+                    category_tree.append(cat_dict)
+                else:
+                    if cat.parent_id in category_dict:
+                        if 'children' not in category_dict[cat.parent_id]:
+                            category_dict[cat.parent_id]['children'] = []
+                        category_dict[cat.parent_id]['children'].append(cat_dict)
+            return category_tree
+        
+        category_tree = catalog_cache.get_or_set(f'ru_categories:{category_type or ""}', build_category_tree)
         
         return jsonify({
             'success': True,
@@ -215,36 +277,35 @@ def get_categories():
 def get_filter_options():
     """获取筛选选项"""
     try:
-        # 获取所有可用的筛选选项
-        glaze_colors = db.session.query(RuPorcelain.glaze_color).filter(
-            RuPorcelain.glaze_color.isnot(None),
-            RuPorcelain.is_active == True
-        ).distinct().all()
-        
-        vessel_types = db.session.query(RuPorcelain.vessel_type).filter(
-            RuPorcelain.vessel_type.isnot(None),
-            RuPorcelain.is_active == True
-        ).distinct().all()
-        
-        collection_levels = db.session.query(RuPorcelain.collection_level).filter(
-            RuPorcelain.collection_level.isnot(None),
-            RuPorcelain.is_active == True
-        ).distinct().all()
-        
-        dynasty_periods = db.session.query(RuPorcelain.dynasty_period).filter(
-            RuPorcelain.dynasty_period.isnot(None),
-            RuPorcelain.is_active == True
-        ).distinct().all()
-        
-        # 价格范围
-        price_range = db.session.query(
-            db.func.min(RuPorcelain.price),
-            db.func.max(RuPorcelain.price)
-        ).filter(RuPorcelain.is_active == True).first()
-        
-        return jsonify({
-            'success': True,
-            'data': {
+        def load_filter_options():
+            # 获取所有可用的筛选选项
+            glaze_colors = db.session.query(RuPorcelain.glaze_color).filter(
+                RuPorcelain.glaze_color.isnot(None),
+                RuPorcelain.is_active == True
+            ).distinct().all()
+            
+            vessel_types = db.session.query(RuPorcelain.vessel_type).filter(
+                RuPorcelain.vessel_type.isnot(None),
+                RuPorcelain.is_active == True
+            ).distinct().all()
+            
+            collection_levels = db.session.query(RuPorcelain.collection_level).filter(
+                RuPorcelain.collection_level.isnot(None),
+                RuPorcelain.is_active == True
+            ).distinct().all()
+            
+            dynasty_periods = db.session.query(RuPorcelain.dynasty_period).filter(
+                RuPorcelain.dynasty_period.isnot(None),
+                RuPorcelain.is_active == True
+            ).distinct().all()
+            
+            # 价格范围
+            price_range = db.session.query(
+                db.func.min(RuPorcelain.price),
+                db.func.max(RuPorcelain.price)
+            ).filter(RuPorcelain.is_active == True).first()
+            
+            return {
                 'glaze_colors': [color[0] for color in glaze_colors if color[0]],
                 'vessel_types': [vtype[0] for vtype in vessel_types if vtype[0]],
                 'collection_levels': [level[0] for level in collection_levels if level[0]],
@@ -254,6 +315,10 @@ def get_filter_options():
                     'max': float(price_range[1]) if price_range[1] else 0
                 }
             }
+        
+        return jsonify({
+            'success': True,
+            'data': catalog_cache.get_or_set('ru_filter_options', load_filter_options)
         })
         
     except Exception as e:
@@ -269,6 +334,7 @@ def get_knowledge():
         per_page = request.args.get('per_page', 10, type=int)
         category = request.args.get('category')
         featured_only = request.args.get('featured', False, type=bool)
+        cursor = request.args.get('cursor')
         
         query = RuKnowledge.query
         
@@ -278,10 +344,14 @@ def get_knowledge():
         if featured_only:
             query = query.filter_by(is_featured=True)
         
-        query = query.order_by(RuKnowledge.created_at.desc())
+        query = query.order_by(*keyset_order(RuKnowledge.created_at, RuKnowledge.id))
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
+        pagination = paginate(
+            query, page, per_page,
+            cursor=cursor,
+            sort_column=RuKnowledge.created_at,
+            id_column=RuKnowledge.id,
+            with_total=wants_total(request.args)
         )
         
         articles = [article.to_dict() for article in pagination.items]
@@ -294,11 +364,14 @@ def get_knowledge():
                     'page': page,
                     'per_page': per_page,
                     'total': pagination.total,
-                    'pages': pagination.pages
+                    'pages': pagination.pages,
+                    'next_cursor': pagination.next_cursor
                 }
             }
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -308,13 +381,15 @@ def get_knowledge_detail(article_id):
     try:
         article = RuKnowledge.query.get_or_404(article_id)
         
-        # 增加浏览量
-        article.view_count += 1
-        db.session.commit()
+        # 增加浏览量（写入缓冲区，批量写回数据库）
+        view_counter.increment(RuKnowledge.__table__, article_id)
+        
+        article_data = article.to_dict()
+        article_data['view_count'] = (article.view_count or 0) + view_counter.pending_count(RuKnowledge.__table__, article_id)
         
         return jsonify({
             'success': True,
-            'data': article.to_dict()
+            'data': article_data
         })
         
     except Exception as e:
@@ -366,11 +441,18 @@ def get_porcelain_reviews(porcelain_id):
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
         
-        pagination = RuPorcelainReview.query.filter_by(
+        query = RuPorcelainReview.query.filter_by(
             porcelain_id=porcelain_id
-        ).order_by(RuPorcelainReview.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        ).order_by(*keyset_order(RuPorcelainReview.created_at, RuPorcelainReview.id))
+        
+        pagination = paginate(
+            query, page, per_page,
+            cursor=cursor,
+            sort_column=RuPorcelainReview.created_at,
+            id_column=RuPorcelainReview.id,
+            with_total=wants_total(request.args)
         )
         
         reviews = [review.to_dict() for review in pagination.items]
@@ -383,11 +465,14 @@ def get_porcelain_reviews(porcelain_id):
                     'page': page,
                     'per_page': per_page,
                     'total': pagination.total,
-                    'pages': pagination.pages
+                    'pages': pagination.pages,
+                    'next_cursor': pagination.next_cursor
                 }
             }
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -414,16 +499,8 @@ def create_porcelain_review(porcelain_id):
             is_anonymous=data.get('is_anonymous', False)
         )
         
+        # 商品评分统计由 rating_aggregates 在同一事务内增量更新
         db.session.add(review)
-        
-        # 更新商品评分统计
-        porcelain = RuPorcelain.query.get(porcelain_id)
-        if porcelain:
-            reviews = RuPorcelainReview.query.filter_by(porcelain_id=porcelain_id).all()
-            total_rating = sum(r.overall_rating for r in reviews) + data['overall_rating']
-            porcelain.review_count = len(reviews) + 1
-            porcelain.rating_avg = total_rating / porcelain.review_count
-        
         db.session.commit()
         
         return jsonify({
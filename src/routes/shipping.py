@@ -2,11 +2,20 @@ from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 from src.models.models_fixed import db, Order, Shipment, ShipmentTracking, Notification, User
 from datetime import datetime, timedelta
+from src.services.order_status import bulk_update_order_status
+from src.services.tracking_ingest import FORMATS, detect_format, iter_records, ingest_tracking_events
+from src.services.shipping_rates import CARRIERS, ShippingRateError, billable_weight, rate_engine
+from src.services.cart import resolve_cart, CartError
+import io
+import os
 import random
 import string
 
 shipping_bp = Blueprint('shipping', __name__)
 
+# 商品未填写重量时按 500 克计算运费
+DEFAULT_ITEM_WEIGHT_GRAMS = 500
+
 @shipping_bp.route('/create-shipment', methods=['POST'])
 @cross_origin()
 def create_shipment():
@@ -147,6 +156,33 @@ def update_tracking():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@shipping_bp.route('/tracking/ingest', methods=['POST'])
+@cross_origin()
+def ingest_tracking():
+    """批量导入快递公司推送的扫描记录（NDJSON 或 CSV，见 src/services/tracking_ingest.py）"""
+    # 配置了 TRACKING_INGEST_TOKEN 时要求快递公司携带相同的令牌
+    token = os.environ.get('TRACKING_INGEST_TOKEN')
+    if token and request.headers.get('X-Ingest-Token') != token:
+        return jsonify({'error': 'Invalid ingest token'}), 401
+    
+    fmt = request.args.get('format') or detect_format(request.content_type)
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+    
+    try:
+        chunk_size = min(max(request.args.get('chunk_size', 1000, type=int), 1), 5000)
+        # 逐行读取请求体，不把整个文件读入内存
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        result = ingest_tracking_events(iter_records(lines, fmt), chunk_size=chunk_size)
+        return jsonify(result.to_dict())
+        
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Request body must be UTF-8'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @shipping_bp.route('/simulate-tracking/<int:shipment_id>', methods=['POST'])
 @cross_origin()
 def simulate_tracking_updates(shipment_id):
@@ -217,17 +253,7 @@ def simulate_tracking_updates(shipment_id):
 @cross_origin()
 def get_carriers():
     """获取支持的快递公司列表"""
-    carriers = [
-        {'code': 'sf', 'name': '顺丰速运', 'services': ['标准快递', '次日达', '即日达']},
-        {'code': 'ems', 'name': '中国邮政EMS', 'services': ['标准快递', '次日达']},
-        {'code': 'sto', 'name': '申通快递', 'services': ['标准快递']},
-        {'code': 'yt', 'name': '圆通速递', 'services': ['标准快递']},
-        {'code': 'zto', 'name': '中通快递', 'services': ['标准快递']},
-        {'code': 'yunda', 'name': '韵达速递', 'services': ['标准快递']},
-        {'code': 'jd', 'name': '京东物流', 'services': ['标准快递', '次日达', '当日达']},
-    ]
-    
-    return jsonify(carriers)
+    return jsonify(CARRIERS)
 
 @shipping_bp.route('/estimate-delivery', methods=['POST'])
 @cross_origin()
@@ -239,30 +265,21 @@ def estimate_delivery():
         service = data.get('service', '标准快递')
         destination = data.get('destination', '')
         
-        # 简单的配送时间估算逻辑
-        base_days = 3
-        if service == '次日达':
-            base_days = 1
-        elif service == '当日达':
-            base_days = 0
-        elif service == '即日达':
-            base_days = 0
-        
-        # 根据目的地调整时间（简化逻辑）
-        if '北京' in destination or '上海' in destination or '广州' in destination or '深圳' in destination:
-            base_days = max(1, base_days)
-        elif '西藏' in destination or '新疆' in destination:
-            base_days += 2
-        
+        # 按目的地分区和服务时效估算（费率表见 src/services/shipping_rates.py）
+        zone = rate_engine.resolve_zone(data.get('region_code'), destination)
+        base_days = rate_engine.delivery_days(service, zone)
         estimated_delivery = datetime.utcnow() + timedelta(days=base_days)
         
         return jsonify({
             'estimated_delivery': estimated_delivery.isoformat(),
             'estimated_days': base_days,
             'carrier': carrier,
-            'service': service
+            'service': service,
+            'zone': rate_engine.zone_codes[zone]
         })
         
+    except ShippingRateError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -275,23 +292,22 @@ def batch_update_status():
         order_ids = data.get('order_ids', [])
         new_status = data.get('status')
         
-        updated_orders = []
-        for order_id in order_ids:
-            order = Order.query.get(order_id)
-            if order:
-                order.status = new_status
-                updated_orders.append(order.id)
-                
-                # 如果有物流信息，也更新物流状态
-                shipment = Shipment.query.filter_by(order_id=order_id).first()
-                if shipment:
-                    shipment.status = new_status
+        if not new_status or not isinstance(order_ids, list):
+            return jsonify({'error': 'status and order_ids are required'}), 400
+        try:
+            order_ids = [int(order_id) for order_id in order_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'order_ids must be integers'}), 400
         
+        # 按块批量更新订单和物流状态，并批量写入状态变更通知
+        results = bulk_update_order_status(order_ids, new_status)
         db.session.commit()
         
+        updated_orders = [order_id for order_id, result in results.items() if result != 'not_found']
         return jsonify({
             'message': f'Updated {len(updated_orders)} orders',
-            'updated_orders': updated_orders
+            'updated_orders': updated_orders,
+            'results': {str(order_id): result for order_id, result in results.items()}
         })
         
     except Exception as e:
@@ -308,7 +324,10 @@ def generate_tracking_number():
 @shipping_bp.route('/shipping-cost', methods=['POST'])
 @cross_origin()
 def calculate_shipping_cost():
-    """计算运费"""
+    """计算运费
+
+    快递公司或服务不存在、区划代码未知、重量不是正数时返回 400。
+    """
     try:
         data = request.get_json()
         weight = data.get('weight', 1.0)  # 重量（kg）
@@ -316,33 +335,64 @@ def calculate_shipping_cost():
         carrier = data.get('carrier', 'sf')
         service = data.get('service', '标准快递')
         
-        # 简化的运费计算逻辑
-        base_cost = 10.0  # 基础运费
-        
-        # 根据重量计算
-        if weight > 1:
-            base_cost += (weight - 1) * 5
-        
-        # 根据服务类型调整
-        if service == '次日达':
-            base_cost *= 1.5
-        elif service == '当日达' or service == '即日达':
-            base_cost *= 2.0
-        
-        # 根据目的地调整
-        if '西藏' in destination or '新疆' in destination:
-            base_cost *= 1.8
-        elif '内蒙古' in destination or '青海' in destination:
-            base_cost *= 1.3
+        # 按费率表计算：目的地分区 x 快递服务 x 计费重量段
+        zone = rate_engine.resolve_zone(data.get('region_code'), destination)
+        quote = rate_engine.quote(carrier, service, weight, zone)
         
         return jsonify({
-            'shipping_cost': round(base_cost, 2),
+            'shipping_cost': quote['shipping_cost'],
             'carrier': carrier,
             'service': service,
             'weight': weight,
-            'destination': destination
+            'billable_weight': quote['billable_weight'],
+            'destination': destination,
+            'zone': quote['zone'],
+            'estimated_days': quote['estimated_days']
+        })
+        
+    except ShippingRateError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@shipping_bp.route('/quote-cart', methods=['POST'])
+@cross_origin()
+def quote_cart():
+    """按购物车总重量一次返回所有快递公司、所有服务的运费和时效"""
+    try:
+        data = request.get_json()
+        items = data.get('items')
+        
+        if items:
+            # 一次查询取出购物车商品，商品重量以克为单位，未填写的按默认重量计算
+            cart = resolve_cart(items, check_stock=False)
+            grams = sum(
+                float(line.product.weight or DEFAULT_ITEM_WEIGHT_GRAMS) * line.quantity
+                for line in cart.lines
+            )
+            weight = grams / 1000
+        else:
+            weight = data.get('weight')
+            if weight is None:
+                return jsonify({'error': 'items or weight is required'}), 400
+        
+        zone = rate_engine.resolve_zone(data.get('region_code'), data.get('destination', ''))
+        quotes = rate_engine.quote_all(weight, zone)
+        now = datetime.utcnow()
+        for quote in quotes:
+            quote['estimated_delivery'] = (now + timedelta(days=quote['estimated_days'])).isoformat()
+        
+        return jsonify({
+            'weight': round(weight, 3),
+            'billable_weight': billable_weight(weight),
+            'zone': rate_engine.zone_codes[zone],
+            'quotes': quotes
         })
         
+    except CartError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except ShippingRateError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,83 @@
+"""
+购物车解析
+下单和创建支付会话共用：一次 IN 查询取出购物车内全部商品，
+校验商品存在与库存，并按当前售价计算每行金额。
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from src.models.models_fixed import Product
+
+
+class CartError(Exception):
+    """购物车校验失败，message 直接返回给前端"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.product_id = product.id
+        self.quantity = quantity
+        self.unit_price = Decimal(str(product.price))
+        self.total_price = self.unit_price * quantity
+
+
+class PricedCart:
+    def __init__(self, lines):
+        self.lines = lines
+
+    @property
+    def subtotal(self):
+        return sum((line.total_price for line in self.lines), Decimal('0'))
+
+    @property
+    def products(self):
+        return {line.product_id: line.product for line in self.lines}
+
+    def quantities(self):
+        """按商品合并后的购买数量 {product_id: quantity}"""
+        totals = defaultdict(int)
+        for line in self.lines:
+            totals[line.product_id] += line.quantity
+        return dict(totals)
+
+
+def resolve_cart(items, check_stock=True):
+    """解析购物车 [{'product_id', 'quantity'}, ...] 为 PricedCart"""
+    if not items:
+        raise CartError('Cart is empty')
+
+    try:
+        requested = [(int(item['product_id']), int(item['quantity'])) for item in items]
+    except (KeyError, TypeError, ValueError):
+        raise CartError('Each item requires product_id and quantity')
+
+    for product_id, quantity in requested:
+        if quantity <= 0:
+            raise CartError(f'Invalid quantity for product {product_id}')
+
+    product_ids = {product_id for product_id, _ in requested}
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids)).all()
+    }
+
+    for product_id, _ in requested:
+        if product_id not in products:
+            raise CartError(f'Product {product_id} not found')
+
+    cart = PricedCart([CartLine(products[product_id], quantity) for product_id, quantity in requested])
+
+    if check_stock:
+        for product_id, quantity in cart.quantities().items():
+            product = products[product_id]
+            if (product.stock or 0) < quantity:
+                raise CartError(f'Insufficient stock for product {product.name}')
+
+    return cart
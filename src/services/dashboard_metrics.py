@@ -0,0 +1,173 @@
+"""
+仪表板统计数据维护
+订单创建、删除或状态、金额变更时在同一事务内增量更新统计表，
+仪表板只需读取按天汇总的数据，无需扫描订单表。
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from src.models.models_fixed import db, Order, OrderItem, DailyOrderMetric, ProductSalesMetric
+from src.utils.db_dialect import date_of, upsert_increment
+
+DEFAULT_STATUS = 'pending'
+
+
+def _to_decimal(value):
+    if value is None:
+        return Decimal('0')
+    return Decimal(str(value))
+
+
+def _metric_date(order):
+    created_at = order.created_at or datetime.utcnow()
+    return created_at.date() if isinstance(created_at, datetime) else created_at
+
+
+def add_status_change(order_deltas, order, old_status, new_status, old_amount, new_amount):
+    """把订单从 (old_status, old_amount) 变为 (new_status, new_amount) 的增量累加到 order_deltas
+
+    order 可以是 ORM 对象，也可以是 Core 查询返回的行，只需有 created_at。
+    状态不变时计数的增减相互抵消，只留下金额差。
+    """
+    metric_date = _metric_date(order)
+    old_amount = _to_decimal(old_amount)
+    new_amount = _to_decimal(new_amount)
+    order_deltas[(metric_date, old_status)][0] -= 1
+    order_deltas[(metric_date, old_status)][1] -= old_amount
+    order_deltas[(metric_date, new_status)][0] += 1
+    order_deltas[(metric_date, new_status)][1] += new_amount
+
+
+def apply_order_deltas(connection, order_deltas, product_deltas):
+    """把累计的增量写入统计表
+
+    order_deltas: {(metric_date, status): [count_delta, revenue_delta]}
+    product_deltas: {product_id: units_delta}
+    """
+    order_table = DailyOrderMetric.__table__
+    for (metric_date, status), (count_delta, revenue_delta) in order_deltas.items():
+        if not count_delta and not revenue_delta:
+            continue
+        upsert_increment(
+            connection, order_table,
+            index_elements=['metric_date', 'status'],
+            values={
+                'metric_date': metric_date,
+                'status': status,
+                'order_count': count_delta,
+                'revenue': revenue_delta
+            },
+            increment=['order_count', 'revenue']
+        )
+
+    product_table = ProductSalesMetric.__table__
+    for product_id, units_delta in product_deltas.items():
+        if not units_delta or product_id is None:
+            continue
+        upsert_increment(
+            connection, product_table,
+            index_elements=['product_id'],
+            values={'product_id': product_id, 'units_sold': units_delta},
+            increment=['units_sold']
+        )
+
+
+def _committed_value(obj, attr):
+    """flush 前数据库中的值；属性未修改时即当前值
+
+    Order.status / total_amount 和 OrderItem.quantity 开启了 active_history，
+    对象过期后再修改时也会先加载原值，这里总能取到修改前的值。
+    """
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_order_changes(session, flush_context, instances):
+    """收集本次flush中新建、删除的订单和订单项，以及订单状态、金额和订单项数量的变化"""
+    order_deltas = defaultdict(lambda: [0, Decimal('0')])
+    product_deltas = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            key = (_metric_date(obj), obj.status or DEFAULT_STATUS)
+            order_deltas[key][0] += 1
+            order_deltas[key][1] += _to_decimal(obj.total_amount)
+        elif isinstance(obj, OrderItem):
+            product_deltas[obj.product_id] += obj.quantity or 0
+
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            key = (_metric_date(obj), _committed_value(obj, 'status') or DEFAULT_STATUS)
+            order_deltas[key][0] -= 1
+            order_deltas[key][1] -= _to_decimal(_committed_value(obj, 'total_amount'))
+        elif isinstance(obj, OrderItem):
+            product_deltas[_committed_value(obj, 'product_id')] -= _committed_value(obj, 'quantity') or 0
+
+    for obj in session.dirty:
+        if isinstance(obj, OrderItem):
+            old_quantity = _committed_value(obj, 'quantity') or 0
+            old_product_id = _committed_value(obj, 'product_id')
+            if old_quantity != (obj.quantity or 0) or old_product_id != obj.product_id:
+                product_deltas[old_product_id] -= old_quantity
+                product_deltas[obj.product_id] += obj.quantity or 0
+            continue
+        if not isinstance(obj, Order):
+            continue
+        old_status = _committed_value(obj, 'status') or DEFAULT_STATUS
+        new_status = obj.status or DEFAULT_STATUS
+        old_amount = _to_decimal(_committed_value(obj, 'total_amount'))
+        new_amount = _to_decimal(obj.total_amount)
+        if old_status == new_status and old_amount == new_amount:
+            continue
+        add_status_change(order_deltas, obj, old_status, new_status, old_amount, new_amount)
+
+    if order_deltas or product_deltas:
+        apply_order_deltas(session.connection(), order_deltas, product_deltas)
+
+
+def rebuild_metrics():
+    """根据现有订单数据重建全部统计（需在应用上下文中调用）"""
+    DailyOrderMetric.query.delete()
+    ProductSalesMetric.query.delete()
+
+    daily_rows = db.session.query(
+        date_of(Order.created_at).label('metric_date'),
+        Order.status,
+        func.count(Order.id).label('order_count'),
+        func.coalesce(func.sum(Order.total_amount), 0).label('revenue')
+    ).group_by(date_of(Order.created_at), Order.status).all()
+
+    order_rows = [
+        {
+            'metric_date': row.metric_date,
+            'status': row.status or DEFAULT_STATUS,
+            'order_count': row.order_count,
+            'revenue': row.revenue
+        }
+        for row in daily_rows if row.metric_date is not None
+    ]
+    if order_rows:
+        db.session.execute(DailyOrderMetric.__table__.insert(), order_rows)
+
+    product_rows = db.session.query(
+        OrderItem.product_id,
+        func.sum(OrderItem.quantity).label('units_sold')
+    ).group_by(OrderItem.product_id).all()
+
+    sales_rows = [
+        {'product_id': row.product_id, 'units_sold': row.units_sold or 0}
+        for row in product_rows
+    ]
+    if sales_rows:
+        db.session.execute(ProductSalesMetric.__table__.insert(), sales_rows)
+
+    db.session.commit()
+    return len(order_rows), len(sales_rows)
@@ -0,0 +1,76 @@
+"""
+库存扣减
+用带条件的 UPDATE（stock >= 购买数量）原子扣减库存，根据影响行数判断是否成功，
+避免"先读库存再写回"在并发下造成超卖。一个购物车的所有商品在调用方的同一事务内扣减，
+任一商品不足时抛出 InsufficientStockError，由调用方回滚整个事务。
+
+库存变化照常触发 updated_at 的 onupdate，商品详情和列表的 ETag 随之失效，不会返回过期的库存。
+"""
+
+from sqlalchemy import bindparam, update
+
+from src.models.models_fixed import db, Product
+
+
+class InsufficientStockError(Exception):
+    """库存不足，failures 为每个失败商品的明细"""
+
+    def __init__(self, failures):
+        super().__init__('Insufficient stock')
+        self.failures = failures
+
+    def to_dict(self):
+        return {
+            'error': 'Insufficient stock',
+            'details': self.failures
+        }
+
+
+def decrement_stock(quantities, session=None):
+    """按 {product_id: quantity} 原子扣减库存
+
+    按商品 id 顺序执行，避免多个事务交叉加锁。全部成功返回 None，
+    否则抛出 InsufficientStockError（不会提交，调用方需回滚）。
+    """
+    session = session or db.session
+    failed = {}
+    for product_id in sorted(quantities):
+        quantity = quantities[product_id]
+        result = session.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            failed[product_id] = quantity
+
+    if failed:
+        available = dict(
+            session.query(Product.id, Product.stock).filter(Product.id.in_(failed)).all()
+        )
+        raise InsufficientStockError([
+            {
+                'product_id': product_id,
+                'requested': quantity,
+                'available': available.get(product_id, 0) or 0
+            }
+            for product_id, quantity in failed.items()
+        ])
+
+
+def increment_stock(quantities, session=None):
+    """归还库存（取消订单、释放预留时使用），所有商品合并为一条批量 UPDATE"""
+    if not quantities:
+        return
+    session = session or db.session
+    products = Product.__table__
+    session.connection().execute(
+        update(products)
+        .where(products.c.id == bindparam('b_id'))
+        .values(stock=products.c.stock + bindparam('b_quantity')),
+        [
+            {'b_id': product_id, 'b_quantity': quantities[product_id]}
+            for product_id in sorted(quantities)
+        ]
+    )
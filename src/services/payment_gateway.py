@@ -0,0 +1,307 @@
+"""
+支付网关
+路由通过 get_gateway() 调用支付服务，不直接使用 stripe SDK 的全局配置：
+    - 所有请求共用一个 keep-alive 连接池（requests.Session）
+    - 每次调用有连接 / 读取超时，可按调用覆盖
+    - 网络错误、429 和 5xx 按带抖动的指数退避重试，总耗时不超过重试预算
+    - 创建类请求带幂等键，重试（包括客户端重新提交）不会重复扣款或退款
+    - 连续失败达到阈值后熔断，熔断期间直接返回 503，不再占用 worker 等待超时
+
+调用外部服务前应先提交数据库事务，不要在事务中等待网关响应。
+
+配置（环境变量）:
+    PAYMENT_GATEWAY          stripe（默认）或 fake（本地测试用的内存网关）
+    STRIPE_CONNECT_TIMEOUT   连接超时（秒），默认 3.05
+    STRIPE_READ_TIMEOUT      读取超时（秒），默认 15
+    STRIPE_MAX_RETRIES       最大重试次数，默认 2
+    STRIPE_RETRY_BUDGET      单次调用（含重试）的总耗时上限（秒），默认 20
+    STRIPE_POOL_SIZE         连接池大小，默认 10
+    STRIPE_BREAKER_THRESHOLD 连续失败多少次后熔断，默认 5
+    STRIPE_BREAKER_RESET     熔断持续时间（秒），默认 30
+"""
+
+import os
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import stripe
+
+
+class PaymentGatewayError(Exception):
+    """支付网关调用失败，message 直接返回给前端"""
+
+    def __init__(self, message, status_code=502, retryable=False):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+class GatewayUnavailableError(PaymentGatewayError):
+    """熔断中，暂不调用支付网关"""
+
+    def __init__(self, message='Payment gateway temporarily unavailable'):
+        super().__init__(message, status_code=503, retryable=True)
+
+
+def new_idempotency_key(prefix):
+    return f"{prefix}-{uuid.uuid4().hex}"
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后熔断 reset_timeout 秒，之后放行一次试探请求"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half_open' and self._trial_running):
+                raise GatewayUnavailableError()
+            if state == 'half_open':
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class StripeGateway:
+    """Stripe 网关：连接池、超时、重试、幂等键和熔断"""
+
+    name = 'stripe'
+
+    def __init__(self, api_key, connect_timeout=3.05, read_timeout=15, max_retries=2, retry_budget=20,
+                 backoff_base=0.25, backoff_max=2.0, pool_size=10, breaker=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_budget = retry_budget
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        # 重试由本类控制，连接池本身不重试
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.http_session.mount('https://', adapter)
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(
+            api_key=environ.get('STRIPE_SECRET_KEY', 'sk_test_...'),
+            connect_timeout=float(environ.get('STRIPE_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(environ.get('STRIPE_READ_TIMEOUT', 15)),
+            max_retries=int(environ.get('STRIPE_MAX_RETRIES', 2)),
+            retry_budget=float(environ.get('STRIPE_RETRY_BUDGET', 20)),
+            pool_size=int(environ.get('STRIPE_POOL_SIZE', 10)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(environ.get('STRIPE_BREAKER_THRESHOLD', 5)),
+                reset_timeout=float(environ.get('STRIPE_BREAKER_RESET', 30))
+            )
+        )
+
+    def _client(self, timeout):
+        """按超时设置缓存 StripeClient，所有客户端共用同一个连接池"""
+        client = self._clients.get(timeout)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(timeout)
+                if client is None:
+                    client = stripe.StripeClient(
+                        self.api_key,
+                        http_client=stripe.RequestsClient(timeout=timeout, session=self.http_session),
+                        max_network_retries=0
+                    )
+                    client = getattr(client, 'v1', client)
+                    self._clients[timeout] = client
+        return client
+
+    @staticmethod
+    def _is_retryable(error):
+        if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+            return True
+        status = getattr(error, 'http_status', None)
+        return status is not None and (status >= 500 or status == 409)
+
+    def _backoff(self, attempt):
+        # full jitter: 0 ~ min(上限, 基数 * 2^attempt)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _call(self, operation, timeout=None, idempotency_key=None):
+        """执行 operation(client, options)，按需重试并更新熔断器
+
+        无论以何种异常结束都会记录一次成功或失败，半开状态的试探名额总会释放。
+        """
+        client = self._client(timeout or self.timeout)
+        options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+        self.breaker.before_call()
+        try:
+            result = self._call_with_retries(operation, client, options)
+        except PaymentGatewayError as e:
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                # 参数错误、卡被拒等是请求本身的问题，不计入熔断
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            # 其他异常（底层网络库错误、响应处理出错等）同样计为失败
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _call_with_retries(self, operation, client, options):
+        deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+
+        while True:
+            try:
+                return operation(client, options)
+            except stripe.error.StripeError as e:
+                retryable = self._is_retryable(e)
+                if retryable:
+                    delay = self._backoff(attempt)
+                    if attempt < self.max_retries and time.monotonic() + delay < deadline:
+                        attempt += 1
+                        time.sleep(delay)
+                        continue
+                message = getattr(e, 'user_message', None) or str(e) or type(e).__name__
+                status_code = 502 if retryable else (getattr(e, 'http_status', None) or 400)
+                raise PaymentGatewayError(message, status_code=status_code, retryable=retryable) from e
+
+    def create_checkout_session(self, params, idempotency_key, timeout=None):
+        return self._call(
+            lambda client, options: client.checkout.sessions.create(params=params, options=options),
+            timeout, idempotency_key
+        )
+
+    def create_payment_intent(self, params, idempotency_key, timeout=None):
+        return self._call(
+            lambda client, options: client.payment_intents.create(params=params, options=options),
+            timeout, idempotency_key
+        )
+
+    def retrieve_payment_method(self, payment_method_id, timeout=None):
+        return self._call(
+            lambda client, options: client.payment_methods.retrieve(payment_method_id, options=options),
+            timeout
+        )
+
+    def create_refund(self, params, idempotency_key, timeout=None):
+        return self._call(
+            lambda client, options: client.refunds.create(params=params, options=options),
+            timeout, idempotency_key
+        )
+
+
+class FakeGateway:
+    """内存中的支付网关，用于本地开发和测试
+
+    按幂等键返回同一对象；fail_next() 让接下来的调用失败，用于测试重试、补偿和熔断。
+    """
+
+    name = 'fake'
+
+    def __init__(self):
+        self.calls = []
+        self.objects = {}
+        self._idempotent = {}
+        self._failures = []
+        self._lock = threading.Lock()
+
+    def fail_next(self, count=1, message='Fake gateway failure', status_code=502):
+        self._failures.extend([PaymentGatewayError(message, status_code=status_code, retryable=True)] * count)
+
+    def _create(self, kind, prefix, idempotency_key, **attributes):
+        with self._lock:
+            self.calls.append((kind, idempotency_key))
+            if self._failures:
+                raise self._failures.pop(0)
+            if idempotency_key and (kind, idempotency_key) in self._idempotent:
+                return self._idempotent[(kind, idempotency_key)]
+            obj = SimpleNamespace(id=f"{prefix}_fake_{uuid.uuid4().hex[:24]}", **attributes)
+            self.objects[obj.id] = obj
+            if idempotency_key:
+                self._idempotent[(kind, idempotency_key)] = obj
+            return obj
+
+    def create_checkout_session(self, params, idempotency_key, timeout=None):
+        session = self._create('checkout_session', 'cs', idempotency_key,
+                               metadata=params.get('metadata', {}), expires_at=params.get('expires_at'))
+        session.url = f"https://checkout.fake.local/{session.id}"
+        return session
+
+    def create_payment_intent(self, params, idempotency_key, timeout=None):
+        intent = self._create('payment_intent', 'pi', idempotency_key,
+                              amount=params.get('amount'), currency=params.get('currency'))
+        intent.client_secret = f"{intent.id}_secret_fake"
+        return intent
+
+    def retrieve_payment_method(self, payment_method_id, timeout=None):
+        with self._lock:
+            self.calls.append(('payment_method', None))
+            if self._failures:
+                raise self._failures.pop(0)
+        card = SimpleNamespace(brand='visa', last4='4242', exp_month=12, exp_year=2030)
+        return SimpleNamespace(id=payment_method_id, card=card)
+
+    def create_refund(self, params, idempotency_key, timeout=None):
+        return self._create('refund', 're', idempotency_key,
+                            amount=params.get('amount'), payment_intent=params.get('payment_intent'))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """返回进程内共用的网关实例（按 PAYMENT_GATEWAY 创建）"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                if os.environ.get('PAYMENT_GATEWAY', 'stripe').lower() == 'fake':
+                    _gateway = FakeGateway()
+                else:
+                    _gateway = StripeGateway.from_env()
+    return _gateway
+
+
+def set_gateway(gateway):
+    """替换网关实例（测试中注入 FakeGateway）"""
+    global _gateway
+    _gateway = gateway
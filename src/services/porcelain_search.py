@@ -0,0 +1,110 @@
+"""
+汝瓷全文检索
+基于 SQLite FTS5 的检索索引 ru_porcelains_fts（rowid 即商品 id），
+商品新增/修改/删除时通过 ORM 事件同步，查询按 BM25 相关度排序。
+索引表由 src/rebuild_search_index.py 创建并回填；索引不存在或数据库不是
+SQLite 时 search_subquery 返回 None，调用方回退到 LIKE 查询。
+"""
+
+from sqlalchemy import event, inspect, text, Integer, Float
+
+from src.utils.text_search import segment_text, build_match_query
+
+FTS_TABLE = 'ru_porcelains_fts'
+FTS_FIELDS = ('name', 'description', 'artist_info', 'provenance')
+# BM25 各字段权重：名称 > 艺术家 > 来源 > 描述
+FTS_WEIGHTS = (10.0, 1.0, 3.0, 2.0)
+REBUILD_BATCH_SIZE = 1000
+
+
+def _is_sqlite(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def index_exists(connection):
+    if not _is_sqlite(connection):
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def _document(obj):
+    return {field: segment_text(getattr(obj, field)) for field in FTS_FIELDS}
+
+
+def _upsert_document(connection, row_id, document):
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': row_id})
+    connection.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_FIELDS)}) "
+            f"VALUES (:id, {', '.join(':' + field for field in FTS_FIELDS)})"
+        ),
+        dict(document, id=row_id)
+    )
+
+
+def register_search_index(model):
+    """为模型挂载索引同步事件（模型需包含 FTS_FIELDS 中的字段）"""
+
+    @event.listens_for(model, 'after_insert')
+    def _after_insert(mapper, connection, target):
+        if index_exists(connection):
+            _upsert_document(connection, target.id, _document(target))
+
+    @event.listens_for(model, 'after_update')
+    def _after_update(mapper, connection, target):
+        state = inspect(target)
+        if not any(state.attrs[field].history.has_changes() for field in FTS_FIELDS):
+            return
+        if index_exists(connection):
+            _upsert_document(connection, target.id, _document(target))
+
+    @event.listens_for(model, 'after_delete')
+    def _after_delete(mapper, connection, target):
+        if index_exists(connection):
+            connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
+
+
+def search_subquery(session, search):
+    """返回 (porcelain_id, rank) 子查询，rank 越小越相关；不可用时返回 None"""
+    match_query = build_match_query(search)
+    if match_query is None or not index_exists(session.connection()):
+        return None
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    return text(
+        f"SELECT rowid AS porcelain_id, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match_query"
+    ).bindparams(match_query=match_query).columns(
+        porcelain_id=Integer, rank=Float
+    ).subquery('porcelain_fts')
+
+
+def rebuild_search_index(connection, table):
+    """重建索引：删除并重新创建 FTS 表，按批从商品表回填"""
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_FIELDS)}, tokenize = 'unicode61')"
+    ))
+    insert_stmt = text(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_FIELDS)}) "
+        f"VALUES (:id, {', '.join(':' + field for field in FTS_FIELDS)})"
+    )
+    columns = [table.c.id] + [table.c[field] for field in FTS_FIELDS]
+    result = connection.execution_options(stream_results=True).execute(
+        table.select().with_only_columns(*columns)
+    )
+
+    total = 0
+    while True:
+        rows = result.fetchmany(REBUILD_BATCH_SIZE)
+        if not rows:
+            break
+        connection.execute(insert_stmt, [
+            dict({field: segment_text(row._mapping[field]) for field in FTS_FIELDS}, id=row.id)
+            for row in rows
+        ])
+        total += len(rows)
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"))
+    return total
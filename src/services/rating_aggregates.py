@@ -0,0 +1,135 @@
+"""
+评分聚合维护
+评价新增、删除或修改评分时，在同一事务内用 SQL 表达式增量更新
+商品的 review_count / rating_total / rating_avg，无需重新读取全部评价。
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case, event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from src.models.models_fixed import db, Product, Review
+from src.models.ru_models import RuPorcelain, RuPorcelainReview
+
+# review_model -> (target_model, 外键属性名, 评分属性名)
+_AGGREGATES = {}
+
+
+def register_rating_aggregate(review_model, target_model, fk_attr, rating_attr):
+    """登记一组 评价表 -> 商品表 的评分聚合关系
+
+    重复登记同一关系不生效；同一评价表登记为不同的关系时抛出 ValueError。
+    """
+    config = (target_model, fk_attr, rating_attr)
+    existing = _AGGREGATES.get(review_model)
+    if existing is not None and existing != config:
+        raise ValueError(f"Rating aggregate for {review_model.__name__} is already registered")
+    _AGGREGATES[review_model] = config
+
+
+# 评分属性需要 active_history=True：修改已过期的评价时 flush 前加载原值，才能计算增量
+register_rating_aggregate(Review, Product, 'product_id', 'rating')
+register_rating_aggregate(RuPorcelainReview, RuPorcelain, 'porcelain_id', 'overall_rating')
+
+
+def apply_rating_deltas(connection, target_model, deltas):
+    """deltas: {target_id: [count_delta, sum_delta]}"""
+    table = target_model.__table__
+    count_col = func.coalesce(table.c.review_count, 0)
+    total_col = func.coalesce(table.c.rating_total, 0)
+    for target_id, (count_delta, sum_delta) in deltas.items():
+        if target_id is None or (not count_delta and not sum_delta):
+            continue
+        new_count = count_col + count_delta
+        new_total = total_col + sum_delta
+        connection.execute(
+            update(table).where(table.c.id == target_id).values(
+                review_count=new_count,
+                rating_total=new_total,
+                rating_avg=case((new_count > 0, new_total * 1.0 / new_count), else_=0)
+            )
+        )
+
+
+def _track_review_changes(session, flush_context, instances):
+    deltas = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    for obj in session.new:
+        config = _AGGREGATES.get(type(obj))
+        if config:
+            target_model, fk_attr, rating_attr = config
+            entry = deltas[target_model][getattr(obj, fk_attr)]
+            entry[0] += 1
+            entry[1] += getattr(obj, rating_attr) or 0
+
+    for obj in session.deleted:
+        config = _AGGREGATES.get(type(obj))
+        if config:
+            target_model, fk_attr, rating_attr = config
+            entry = deltas[target_model][getattr(obj, fk_attr)]
+            entry[0] -= 1
+            entry[1] -= getattr(obj, rating_attr) or 0
+
+    for obj in session.dirty:
+        config = _AGGREGATES.get(type(obj))
+        if not config:
+            continue
+        target_model, fk_attr, rating_attr = config
+        history = inspect(obj).attrs[rating_attr].history
+        if history.has_changes() and history.deleted:
+            entry = deltas[target_model][getattr(obj, fk_attr)]
+            entry[1] += (getattr(obj, rating_attr) or 0) - (history.deleted[0] or 0)
+
+    if deltas:
+        connection = session.connection()
+        for target_model, target_deltas in deltas.items():
+            apply_rating_deltas(connection, target_model, target_deltas)
+
+
+if not event.contains(Session, 'before_flush', _track_review_changes):
+    event.listen(Session, 'before_flush', _track_review_changes)
+
+
+def recompute_rating_aggregates(session=None):
+    """用一次 GROUP BY 重新计算所有已登记商品的评分聚合（修复用）
+
+    数据库中还没有的表（如未启用汝瓷模块）跳过，不出现在返回结果中。
+    """
+    session = session or db.session
+    results = {}
+    existing_tables = set(inspect(session.connection()).get_table_names())
+    for review_model, (target_model, fk_attr, rating_attr) in _AGGREGATES.items():
+        if not {review_model.__tablename__, target_model.__tablename__} <= existing_tables:
+            continue
+        fk_col = getattr(review_model, fk_attr)
+        rating_col = getattr(review_model, rating_attr)
+        rows = session.query(
+            fk_col.label('target_id'),
+            func.count().label('review_count'),
+            func.coalesce(func.sum(rating_col), 0).label('rating_total')
+        ).group_by(fk_col).all()
+
+        table = target_model.__table__
+        session.execute(update(table).values(review_count=0, rating_total=0, rating_avg=0))
+        params = [
+            {
+                'b_id': row.target_id,
+                'b_count': row.review_count,
+                'b_total': row.rating_total,
+                'b_avg': row.rating_total / row.review_count if row.review_count else 0
+            }
+            for row in rows
+        ]
+        if params:
+            session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(
+                    review_count=bindparam('b_count'),
+                    rating_total=bindparam('b_total'),
+                    rating_avg=bindparam('b_avg')
+                ),
+                params
+            )
+        results[target_model.__tablename__] = len(params)
+    session.commit()
+    return results
@@ -0,0 +1,245 @@
+"""
+运费费率引擎
+按 行政区划代码 -> 运费分区、快递公司/服务 -> 计费重量段 两张表计算运费和配送时效：
+    - 区划代码使用 GB/T 2260 前两位（省级）或前四位（地级市，少数城市单独分区），
+      只有自由文本地址时按表中的省市名称匹配一次并缓存
+    - 计费重量按 0.5kg 向上取整，MAX_TABLE_WEIGHT 以内的价格启动时预先算好放进
+      扁平数组，超出部分按续重单价累加
+    - 价格以分为单位的整数保存，返回时再换算为元
+    - CARRIERS 未列出的快递公司/服务组合（如顺丰当日达）按该公司费率和服务系数现算，
+      与原实现一样报价；快递公司或服务本身不存在时抛出 ShippingRateError
+
+启动时由表数据构建 RateEngine，报价只做几次数组下标运算，单次在微秒级。
+"""
+
+import math
+from array import array
+from functools import lru_cache
+
+# 快递公司及其服务（/api/shipping/carriers 返回的列表）
+CARRIERS = [
+    {'code': 'sf', 'name': '顺丰速运', 'services': ['标准快递', '次日达', '即日达']},
+    {'code': 'ems', 'name': '中国邮政EMS', 'services': ['标准快递', '次日达']},
+    {'code': 'sto', 'name': '申通快递', 'services': ['标准快递']},
+    {'code': 'yt', 'name': '圆通速递', 'services': ['标准快递']},
+    {'code': 'zto', 'name': '中通快递', 'services': ['标准快递']},
+    {'code': 'yunda', 'name': '韵达速递', 'services': ['标准快递']},
+    {'code': 'jd', 'name': '京东物流', 'services': ['标准快递', '次日达', '当日达']},
+]
+
+# 运费分区: (代码, 价格系数, 额外天数, 最少天数)
+ZONES = [
+    ('metro', 1.0, 0, 1),      # 北京、上海、广州、深圳
+    ('standard', 1.0, 0, 0),   # 其他省份
+    ('remote', 1.3, 0, 0),     # 内蒙古、青海
+    ('far', 1.8, 2, 0),        # 西藏、新疆
+]
+DEFAULT_ZONE = 'standard'
+
+# 省级行政区划代码 -> (名称, 分区)
+PROVINCES = {
+    '11': ('北京', 'metro'), '12': ('天津', 'standard'), '13': ('河北', 'standard'),
+    '14': ('山西', 'standard'), '15': ('内蒙古', 'remote'), '21': ('辽宁', 'standard'),
+    '22': ('吉林', 'standard'), '23': ('黑龙江', 'standard'), '31': ('上海', 'metro'),
+    '32': ('江苏', 'standard'), '33': ('浙江', 'standard'), '34': ('安徽', 'standard'),
+    '35': ('福建', 'standard'), '36': ('江西', 'standard'), '37': ('山东', 'standard'),
+    '41': ('河南', 'standard'), '42': ('湖北', 'standard'), '43': ('湖南', 'standard'),
+    '44': ('广东', 'standard'), '45': ('广西', 'standard'), '46': ('海南', 'standard'),
+    '50': ('重庆', 'standard'), '51': ('四川', 'standard'), '52': ('贵州', 'standard'),
+    '53': ('云南', 'standard'), '54': ('西藏', 'far'), '61': ('陕西', 'standard'),
+    '62': ('甘肃', 'standard'), '63': ('青海', 'remote'), '64': ('宁夏', 'standard'),
+    '65': ('新疆', 'far'), '71': ('台湾', 'standard'), '81': ('香港', 'standard'),
+    '82': ('澳门', 'standard'),
+}
+
+# 与所在省份分区不同的地级市: 代码 -> (名称, 分区)
+CITIES = {
+    '4401': ('广州', 'metro'),
+    '4403': ('深圳', 'metro'),
+}
+
+# 服务: (价格系数, 基础天数)
+SERVICES = {
+    '标准快递': (1.0, 3),
+    '次日达': (1.5, 1),
+    '当日达': (2.0, 0),
+    '即日达': (2.0, 0),
+}
+
+# 各快递公司的首重（1kg 以内）价格和续重单价，单位：分
+CARRIER_RATES = {
+    'sf': (1000, 500),
+    'ems': (1200, 400),
+    'sto': (800, 300),
+    'yt': (800, 300),
+    'zto': (800, 300),
+    'yunda': (800, 300),
+    'jd': (1000, 400),
+}
+
+WEIGHT_STEP = 0.5      # 计费重量取整单位（kg）
+FIRST_WEIGHT = 1.0     # 首重（kg）
+MAX_TABLE_WEIGHT = 30  # 预先计算价格的最大重量（kg），超出部分按续重累加
+
+
+class ShippingRateError(ValueError):
+    """快递公司 / 服务不存在或重量不合法"""
+    pass
+
+
+def billable_weight(weight):
+    """计费重量：按 WEIGHT_STEP 向上取整，最少 WEIGHT_STEP"""
+    try:
+        weight = float(weight)
+    except (TypeError, ValueError):
+        raise ShippingRateError('Weight must be a positive number')
+    if not weight > 0 or math.isinf(weight):
+        raise ShippingRateError('Weight must be a positive number')
+    return max(WEIGHT_STEP, math.ceil(weight / WEIGHT_STEP - 1e-9) * WEIGHT_STEP)
+
+
+def _band_cost(first_price, extra_price, weight, factor):
+    """计费重量 weight 的运费（分）：首重价格加续重，再乘服务和分区系数"""
+    return round((first_price + max(0.0, weight - FIRST_WEIGHT) * extra_price) * factor)
+
+
+class RateEngine:
+    """启动时把费率表展开为数组的报价引擎"""
+
+    def __init__(self, carriers=CARRIERS, carrier_rates=CARRIER_RATES, services=SERVICES,
+                 zones=ZONES, provinces=PROVINCES, cities=CITIES):
+        self.carriers = carriers
+        self.carrier_rates = carrier_rates
+        self.services = services
+        self.zone_multipliers = [zone[1] for zone in zones]
+        self.zone_codes = [zone[0] for zone in zones]
+        zone_index = {code: index for index, code in enumerate(self.zone_codes)}
+        self.default_zone = zone_index[DEFAULT_ZONE]
+        self.zone_min_days = [zone[3] for zone in zones]
+        self.zone_extra_days = [zone[2] for zone in zones]
+
+        # 区划代码 -> 分区下标：省级用 100 长度数组直接下标，城市覆盖用字典
+        self.province_zones = array('b', [-1] * 100)
+        for code, (_, zone) in provinces.items():
+            self.province_zones[int(code)] = zone_index[zone]
+        self.city_zones = {int(code): zone_index[zone] for code, (_, zone) in cities.items()}
+        # 地址文本匹配顺序：城市优先，名称长的优先（避免“内蒙古”之类被短名称抢先匹配）
+        self.place_names = sorted(
+            [(name, zone_index[zone]) for name, zone in list(cities.values()) + list(provinces.values())],
+            key=lambda item: -len(item[0])
+        )
+        self._resolve_text = lru_cache(maxsize=4096)(self._match_destination)
+
+        # (快递公司, 服务) -> 下标；价格数组按 [服务下标][分区][重量段] 展开
+        self.bands = int(MAX_TABLE_WEIGHT / WEIGHT_STEP)
+        self.days_by_service = {service: days for service, (_, days) in services.items()}
+        self.service_index = {}
+        self.service_days = []
+        self.extra_rates = []  # 超出表格部分每个重量段的价格（分），按 [服务下标][分区]
+        prices = []
+        for carrier in carriers:
+            first_price, extra_price = carrier_rates[carrier['code']]
+            for service in carrier['services']:
+                multiplier, days = services[service]
+                self.service_index[(carrier['code'], service)] = len(self.service_days)
+                self.service_days.append(days)
+                for _, zone_multiplier, _, _ in zones:
+                    factor = multiplier * zone_multiplier
+                    for band in range(1, self.bands + 1):
+                        prices.append(_band_cost(first_price, extra_price, band * WEIGHT_STEP, factor))
+                    self.extra_rates.append(extra_price * WEIGHT_STEP * factor)
+        self.prices = array('l', prices)
+
+    # ---------- 分区 ----------
+    def zone_for_code(self, region_code):
+        """行政区划代码（2 位省级、4 位地级或 6 位县级）对应的分区下标，未知代码返回 None"""
+        code = str(region_code).strip()
+        if len(code) < 2 or not code[:2].isdigit():
+            return None
+        if len(code) >= 4 and code[:4].isdigit():
+            zone = self.city_zones.get(int(code[:4]))
+            if zone is not None:
+                return zone
+        zone = self.province_zones[int(code[:2])]
+        return zone if zone >= 0 else None
+
+    def _match_destination(self, destination):
+        for name, zone in self.place_names:
+            if name in destination:
+                return zone
+        return self.default_zone
+
+    def resolve_zone(self, region_code=None, destination=None):
+        """优先使用区划代码，其次按地址文本匹配；都无法识别时为默认分区"""
+        if region_code:
+            zone = self.zone_for_code(region_code)
+            if zone is None:
+                raise ShippingRateError(f'Unknown region code: {region_code}')
+            return zone
+        if destination:
+            return self._resolve_text(destination)
+        return self.default_zone
+
+    # ---------- 报价 ----------
+    def quote_cents(self, carrier, service, weight, zone):
+        """运费（分）"""
+        weight = billable_weight(weight)
+        index = self.service_index.get((carrier, service))
+        if index is None:
+            return self._unlisted_quote(carrier, service, weight, zone)
+        return self._quote(index, weight, zone)
+
+    def _unlisted_quote(self, carrier, service, weight, zone):
+        """CARRIERS 未列出的组合不在价格数组中，按快递公司费率和服务系数现算"""
+        if carrier not in self.carrier_rates:
+            raise ShippingRateError(f'Unsupported carrier: {carrier}')
+        if service not in self.services:
+            raise ShippingRateError(f'Unsupported service: {service}')
+        first_price, extra_price = self.carrier_rates[carrier]
+        factor = self.services[service][0] * self.zone_multipliers[zone]
+        return _band_cost(first_price, extra_price, weight, factor)
+
+    def _quote(self, service_index, weight, zone):
+        band = int(round(weight / WEIGHT_STEP))
+        row = service_index * len(self.zone_codes) + zone
+        if band <= self.bands:
+            return self.prices[row * self.bands + band - 1]
+        return self.prices[row * self.bands + self.bands - 1] + round((band - self.bands) * self.extra_rates[row])
+
+    def delivery_days(self, service, zone):
+        """配送天数只取决于服务类型和分区"""
+        days = self.days_by_service.get(service)
+        if days is None:
+            raise ShippingRateError(f'Unsupported service: {service}')
+        return max(self.zone_min_days[zone], days + self.zone_extra_days[zone])
+
+    def quote(self, carrier, service, weight, zone):
+        """单个快递服务的报价"""
+        return {
+            'carrier': carrier,
+            'service': service,
+            'billable_weight': billable_weight(weight),
+            'zone': self.zone_codes[zone],
+            'shipping_cost': self.quote_cents(carrier, service, weight, zone) / 100,
+            'estimated_days': self.delivery_days(service, zone)
+        }
+
+    def quote_all(self, weight, zone):
+        """所有快递公司、所有服务的报价，按运费从低到高排序"""
+        weight = billable_weight(weight)
+        quotes = []
+        for carrier in self.carriers:
+            for service in carrier['services']:
+                index = self.service_index[(carrier['code'], service)]
+                quotes.append({
+                    'carrier': carrier['code'],
+                    'carrier_name': carrier['name'],
+                    'service': service,
+                    'shipping_cost': self._quote(index, weight, zone) / 100,
+                    'estimated_days': max(self.zone_min_days[zone], self.service_days[index] + self.zone_extra_days[zone])
+                })
+        quotes.sort(key=lambda item: (item['shipping_cost'], item['estimated_days']))
+        return quotes
+
+
+rate_engine = RateEngine()
@@ -0,0 +1,242 @@
+"""
+支付会话库存预留
+创建 Stripe Checkout 会话时按购物车预扣库存并写入带过期时间的预留记录；
+checkout.session.completed 时把预留确认为已售出；会话过期或超时未支付时
+由后台清理任务按批释放预留、归还库存并取消对应的待支付订单。
+
+预留状态: held（预扣中） -> committed（已售出） / released（已释放）。
+确认和释放都是带 status = 'held' 条件的 UPDATE，两者并发时只有一方生效。
+"""
+
+import atexit
+import math
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from src.models.models_fixed import db, Order, StockReservation
+from src.services.inventory import decrement_stock, increment_stock
+
+# Stripe 要求 Checkout 会话的 expires_at 在创建后 30 分钟到 24 小时之间
+CHECKOUT_TTL_MINUTES = max(30, int(os.environ.get('RESERVATION_TTL_MINUTES', 30)))
+# 会话过期时间在 TTL 之外多留的秒数：抵消请求在途时间和时钟偏差，避免不足 30 分钟被 Stripe 拒绝
+SESSION_EXPIRY_MARGIN_SECONDS = max(60, int(os.environ.get('SESSION_EXPIRY_MARGIN_SECONDS', 120)))
+# 预留比会话多保留一段时间，等待支付完成的 webhook 送达
+RESERVATION_GRACE_SECONDS = int(os.environ.get('RESERVATION_GRACE_SECONDS', 300))
+RELEASE_BATCH_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def session_expires_at(now=None):
+    """Stripe 会话的 expires_at（Unix 时间戳，向上取整到秒）
+
+    在调用网关之前计算，不要使用预扣库存时算好的时间；网关内部重试沿用同一个值。
+    """
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(minutes=CHECKOUT_TTL_MINUTES, seconds=SESSION_EXPIRY_MARGIN_SECONDS)
+    return math.ceil((expires_at - _EPOCH).total_seconds())
+
+
+def reservation_expiry(now=None):
+    """预留过期时间（UTC）
+
+    预扣库存时计算，比随后创建的会话至少晚 RESERVATION_GRACE_SECONDS 减去
+    提交事务所用的时间，会话过期前预留不会被清理任务释放。
+    """
+    now = now or datetime.utcnow()
+    return now + timedelta(
+        minutes=CHECKOUT_TTL_MINUTES, seconds=SESSION_EXPIRY_MARGIN_SECONDS + RESERVATION_GRACE_SECONDS
+    )
+
+
+def hold_stock(order_id, quantities, expires_at, session=None):
+    """按 {product_id: quantity} 预扣库存并写入预留记录
+
+    库存不足时抛出 InsufficientStockError，由调用方回滚。
+    """
+    session = session or db.session
+    decrement_stock(quantities, session=session)
+    session.execute(
+        StockReservation.__table__.insert(),
+        [
+            {
+                'order_id': order_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'status': 'held',
+                'expires_at': expires_at,
+                'created_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
+            }
+            for product_id, quantity in sorted(quantities.items())
+        ]
+    )
+
+
+def commit_reservations(order_id, session=None):
+    """支付完成后确认订单的预留，返回确认的预留条数
+
+    如果预留已被清理任务释放（webhook 晚于过期时间送达），重新扣减库存后再确认；
+    此时库存不足会抛出 InsufficientStockError。
+    """
+    session = session or db.session
+    reservations = StockReservation.__table__
+    now = datetime.utcnow()
+
+    result = session.execute(
+        update(reservations)
+        .where(reservations.c.order_id == order_id, reservations.c.status == 'held')
+        .values(status='committed', updated_at=now)
+    )
+    if result.rowcount:
+        return result.rowcount
+
+    released = dict(session.execute(
+        select(reservations.c.product_id, func.sum(reservations.c.quantity))
+        .where(reservations.c.order_id == order_id, reservations.c.status == 'released')
+        .group_by(reservations.c.product_id)
+    ).all())
+    if not released:
+        return 0
+
+    decrement_stock(released, session=session)
+    result = session.execute(
+        update(reservations)
+        .where(reservations.c.order_id == order_id, reservations.c.status == 'released')
+        .values(status='committed', updated_at=now)
+    )
+    return result.rowcount
+
+
+def _release(session, criteria, cancel_orders, limit=None):
+    """释放满足条件的预留：先把本批标记为 releasing，再按商品合并归还库存
+
+    整个过程在调用方的同一事务内完成，其他事务看不到 releasing 中间状态。
+    返回 (本批选中条数, 释放条数, 涉及的订单 id 集合)；选中的行可能已被并发的确认或
+    清理认领，释放条数少于选中条数不代表没有剩余的预留。
+    """
+    reservations = StockReservation.__table__
+    batch = select(reservations.c.id).where(reservations.c.status == 'held', *criteria).order_by(reservations.c.id)
+    if limit:
+        batch = batch.limit(limit)
+    ids = session.execute(batch).scalars().all()
+    if not ids:
+        return 0, 0, set()
+
+    # 带 status = 'held' 条件认领，期间被 webhook 确认的预留不会被释放
+    claimed = session.execute(
+        update(reservations)
+        .where(reservations.c.id.in_(ids), reservations.c.status == 'held')
+        .values(status='releasing')
+    ).rowcount
+    if not claimed:
+        return len(ids), 0, set()
+
+    # 只处理本次认领的行：其他 worker 认领的 releasing 行由它们自己归还库存
+    mine = (reservations.c.id.in_(ids), reservations.c.status == 'releasing')
+    quantities = defaultdict(int)
+    order_ids = set()
+    for order_id, product_id, quantity in session.execute(
+        select(reservations.c.order_id, reservations.c.product_id, reservations.c.quantity).where(*mine)
+    ):
+        quantities[product_id] += quantity
+        order_ids.add(order_id)
+
+    increment_stock(dict(quantities), session=session)
+    session.execute(
+        update(reservations)
+        .where(*mine)
+        .values(status='released', updated_at=datetime.utcnow())
+    )
+
+    if cancel_orders and order_ids:
+        # 通过 ORM 修改订单状态，仪表板统计的 flush 监听才能看到状态变化
+        for order in session.query(Order).filter(Order.id.in_(order_ids), Order.status == 'pending').all():
+            order.status = 'cancelled'
+    return len(ids), claimed, order_ids
+
+
+def release_reservations(order_id, session=None):
+    """立即释放订单的全部预留（支付会话过期或被放弃），返回释放条数"""
+    session = session or db.session
+    _, released, _ = _release(session, [StockReservation.order_id == order_id], cancel_orders=True)
+    return released
+
+
+def release_expired(now=None, batch_size=RELEASE_BATCH_SIZE, session=None):
+    """按批释放已过期的预留，每批单独提交，直到没有过期的 held 预留，返回释放总条数"""
+    session = session or db.session
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        try:
+            selected, released, _ = _release(
+                session, [StockReservation.expires_at <= now], cancel_orders=True, limit=batch_size
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        total += released
+        if not selected:
+            return total
+
+
+class ReservationSweeper:
+    """后台定时释放过期预留"""
+
+    def __init__(self, interval=60, batch_size=RELEASE_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.app = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = float(app.config.get('RESERVATION_SWEEP_INTERVAL', self.interval))
+        self.batch_size = int(app.config.get('RESERVATION_SWEEP_BATCH_SIZE', self.batch_size))
+        # 每个 worker 进程收到第一个请求时启动清理线程
+        app.before_request(self.ensure_running)
+        atexit.register(self.shutdown)
+
+    def sweep(self):
+        with self.app.app_context():
+            try:
+                released = release_expired(batch_size=self.batch_size)
+                if released:
+                    self.app.logger.info(f"Released {released} expired stock reservations")
+                return released
+            except Exception as e:
+                self.app.logger.warning(f"Stock reservation sweep failed: {e}")
+                return 0
+            finally:
+                db.session.remove()
+
+    def shutdown(self):
+        self._stop.set()
+
+    def ensure_running(self):
+        # gunicorn fork 之后线程不会被继承，按进程号懒启动
+        if self.app is None or (self._pid == os.getpid() and self._thread is not None):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='stock-reservation-sweeper', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep()
+
+
+reservation_sweeper = ReservationSweeper()
@@ -0,0 +1,292 @@
+"""
+快递扫描记录批量导入
+接收快递公司推送的 NDJSON 或 CSV 扫描数据，逐行流式解析，按块处理：
+    1. 一次查询按 tracking_number 解析整块涉及的物流单
+    2. 块内去重，并与数据库中已有的扫描记录去重（shipment_id, status, timestamp, location）
+    3. executemany 批量插入 ShipmentTracking
+    4. executemany 更新物流单状态（只用比已有记录更新的扫描覆盖状态）
+    5. 新送达的物流单对应的订单集合更新为 delivered，并批量发送送达通知
+每块单独提交，中途失败时已提交的块不受影响；重复导入同一文件不会产生重复记录。
+
+每条记录的字段:
+    tracking_number  快递单号（必填）
+    status           扫描状态（必填），如 in_transit / out_for_delivery / delivered
+    timestamp        扫描时间（必填），ISO 8601 或 Unix 时间戳，带时区的转换为 UTC
+    location         扫描地点（可选）
+    description      描述（可选）
+"""
+
+import csv
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, func, select, update
+
+from src.models.models_fixed import db, Shipment, ShipmentTracking
+from src.services.order_status import bulk_update_order_status
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 100
+DELIVERED = 'delivered'
+FORMATS = ('ndjson', 'csv')
+
+
+class TrackingRecordError(ValueError):
+    """单条扫描记录不合法"""
+    pass
+
+
+class IngestResult:
+    """导入统计"""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.unknown = 0
+        self.invalid = 0
+        self.shipments_updated = 0
+        self.orders_delivered = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'received': self.received,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'unknown_tracking_numbers': self.unknown,
+            'invalid': self.invalid,
+            'shipments_updated': self.shipments_updated,
+            'orders_delivered': self.orders_delivered,
+            'errors': self.errors
+        }
+
+
+def parse_timestamp(value):
+    if value is None or value == '':
+        raise TrackingRecordError('timestamp is required')
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        raise TrackingRecordError(f'Invalid timestamp: {value}')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def normalize_record(record):
+    """校验并规范化一条记录，返回 (tracking_number, status, timestamp, location, description)"""
+    if not isinstance(record, dict):
+        raise TrackingRecordError('Record must be an object')
+    tracking_number = str(record.get('tracking_number') or '').strip()
+    status = str(record.get('status') or '').strip()
+    if not tracking_number:
+        raise TrackingRecordError('tracking_number is required')
+    if not status:
+        raise TrackingRecordError('status is required')
+    location = str(record.get('location') or '').strip() or None
+    description = str(record.get('description') or '').strip() or None
+    return tracking_number, status, parse_timestamp(record.get('timestamp')), location, description
+
+
+def iter_ndjson(lines):
+    """逐行解析 NDJSON，产出 (行号, 记录或 TrackingRecordError)"""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, TrackingRecordError(f'Invalid JSON: {e}')
+
+
+def iter_csv(lines):
+    """逐行解析带表头的 CSV，产出 (行号, 记录)"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def detect_format(content_type=None, filename=None):
+    """根据 Content-Type 或文件扩展名判断格式，无法判断时返回 None"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json'):
+        return 'ndjson'
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension == 'csv':
+            return 'csv'
+        if extension in ('ndjson', 'jsonl', 'json'):
+            return 'ndjson'
+    return None
+
+
+def iter_records(lines, fmt):
+    if fmt == 'ndjson':
+        return iter_ndjson(lines)
+    if fmt == 'csv':
+        return iter_csv(lines)
+    raise ValueError(f'Unsupported format: {fmt}')
+
+
+def ingest_tracking_events(records, chunk_size=CHUNK_SIZE, session=None):
+    """导入 (行号, 记录) 序列，每 chunk_size 条处理并提交一次，返回 IngestResult"""
+    session = session or db.session
+    result = IngestResult()
+    chunk = []
+
+    for line_number, record in records:
+        result.received += 1
+        try:
+            if isinstance(record, TrackingRecordError):
+                raise record
+            chunk.append(normalize_record(record))
+        except TrackingRecordError as e:
+            result.add_error(line_number, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _ingest_chunk(session, chunk, result)
+            chunk = []
+
+    if chunk:
+        _ingest_chunk(session, chunk, result)
+    return result
+
+
+def _ingest_chunk(session, events, result):
+    try:
+        _process_chunk(session, events, result)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+
+def _process_chunk(session, events, result):
+    shipments = Shipment.__table__
+    tracking = ShipmentTracking.__table__
+    now = datetime.utcnow()
+
+    # 1. 一次查询解析整块的物流单
+    tracking_numbers = {event[0] for event in events}
+    shipment_rows = {
+        row.tracking_number: row
+        for row in session.execute(
+            select(shipments.c.id, shipments.c.tracking_number, shipments.c.order_id, shipments.c.status)
+            .where(shipments.c.tracking_number.in_(tracking_numbers))
+        )
+    }
+
+    # 2. 块内去重
+    candidates = {}
+    for tracking_number, status, timestamp, location, description in events:
+        shipment = shipment_rows.get(tracking_number)
+        if shipment is None:
+            result.unknown += 1
+            continue
+        key = (shipment.id, status, timestamp, location)
+        if key in candidates:
+            result.duplicates += 1
+            continue
+        candidates[key] = description
+    if not candidates:
+        return
+
+    # 与已有记录去重；同时取每个物流单已有的最新扫描时间
+    shipment_ids = {key[0] for key in candidates}
+    timestamps = [key[2] for key in candidates]
+    existing = {
+        (row.shipment_id, row.status, row.timestamp, row.location)
+        for row in session.execute(
+            select(tracking.c.shipment_id, tracking.c.status, tracking.c.timestamp, tracking.c.location)
+            .where(
+                tracking.c.shipment_id.in_(shipment_ids),
+                tracking.c.timestamp.between(min(timestamps), max(timestamps))
+            )
+        )
+    }
+    latest_existing = dict(session.execute(
+        select(tracking.c.shipment_id, func.max(tracking.c.timestamp))
+        .where(tracking.c.shipment_id.in_(shipment_ids))
+        .group_by(tracking.c.shipment_id)
+    ).all())
+
+    rows = []
+    latest = {}
+    for key, description in candidates.items():
+        if key in existing:
+            result.duplicates += 1
+            continue
+        shipment_id, status, timestamp, location = key
+        rows.append({
+            'shipment_id': shipment_id,
+            'status': status,
+            'location': location,
+            'description': description,
+            'timestamp': timestamp,
+            'created_at': now
+        })
+        if shipment_id not in latest or timestamp >= latest[shipment_id][1]:
+            latest[shipment_id] = (status, timestamp)
+    if not rows:
+        return
+
+    # 3. 批量插入扫描记录
+    session.execute(tracking.insert(), rows)
+    result.inserted += len(rows)
+
+    # 4. 物流单状态：只用比已有记录更新的扫描覆盖，已送达的不再回退
+    by_id = {row.id: row for row in shipment_rows.values()}
+    status_updates = []
+    delivered_orders = {}
+    for shipment_id, (status, timestamp) in latest.items():
+        shipment = by_id[shipment_id]
+        previous = latest_existing.get(shipment_id)
+        if shipment.status == DELIVERED or (previous is not None and timestamp < previous) or shipment.status == status:
+            continue
+        status_updates.append({
+            'b_id': shipment_id,
+            'b_status': status,
+            'b_delivered_at': timestamp if status == DELIVERED else None
+        })
+        if status == DELIVERED:
+            delivered_orders[shipment.order_id] = shipment.tracking_number
+
+    if status_updates:
+        session.execute(
+            update(shipments)
+            .where(shipments.c.id == bindparam('b_id'))
+            .values(
+                status=bindparam('b_status'),
+                delivered_at=func.coalesce(
+                    bindparam('b_delivered_at', type_=shipments.c.delivered_at.type), shipments.c.delivered_at
+                ),
+                updated_at=now
+            ),
+            status_updates
+        )
+        result.shipments_updated += len(status_updates)
+
+    # 5. 新送达的订单集合更新为 delivered，发送与单条更新一致的送达通知
+    if delivered_orders:
+        results = bulk_update_order_status(
+            list(delivered_orders), DELIVERED,
+            notification=lambda row, new_status: {
+                'type': 'order_delivered',
+                'title': '订单已送达',
+                'content': f'您的订单 #{row.id} 已成功送达，感谢您的购买！',
+                'data': {'order_id': row.id, 'tracking_number': delivered_orders[row.id]}
+            },
+            session=session
+        )
+        result.orders_delivered += sum(1 for status in results.values() if status == 'updated')
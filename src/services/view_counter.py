@@ -0,0 +1,125 @@
+"""
+浏览量写回缓冲
+详情页的浏览量先累计在进程内存中，按时间间隔或累计次数批量写回数据库，
+避免每次 GET 请求都产生一次写事务。进程正常退出时（包括 gunicorn worker 平滑重启）
+通过 atexit 把剩余计数写回。
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, update
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounterBuffer:
+    """按 (表, 行id) 累计浏览量并批量写回"""
+
+    def __init__(self, flush_interval=10, flush_threshold=500):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.app = None
+        self.db = None
+        self._pending = defaultdict(int)  # (table, row_id) -> 增量
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.flush_interval = float(app.config.get('VIEW_COUNT_FLUSH_INTERVAL', self.flush_interval))
+        self.flush_threshold = int(app.config.get('VIEW_COUNT_FLUSH_THRESHOLD', self.flush_threshold))
+        atexit.register(self.shutdown)
+
+    def increment(self, table, row_id, count=1):
+        """记录一次浏览，table 为模型的 __table__"""
+        self._ensure_worker()
+        with self._lock:
+            self._pending[(table, row_id)] += count
+            self._pending_total += count
+            should_flush = (
+                self._pending_total >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if should_flush:
+            self.flush()
+
+    def pending_count(self, table, row_id):
+        """尚未写回数据库的浏览量，用于在响应中补齐显示"""
+        with self._lock:
+            return self._pending.get((table, row_id), 0)
+
+    def flush(self):
+        """把累计的浏览量写回数据库，每张表一条批量 UPDATE"""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = defaultdict(int)
+                self._pending_total = 0
+                self._last_flush = time.monotonic()
+            if not pending:
+                return 0
+
+            by_table = defaultdict(list)
+            for (table, row_id), count in pending.items():
+                by_table[table].append({'b_id': row_id, 'b_count': count})
+
+            try:
+                if self.app is None:
+                    raise RuntimeError('ViewCounterBuffer.init_app() has not been called')
+                with self.app.app_context():
+                    with self.db.engine.begin() as connection:
+                        for table, params in by_table.items():
+                            # 浏览量为 NULL 的旧数据按 0 累加
+                            # updated_at 照常由 onupdate 更新，写回的浏览量会改变数据版本（ETag）
+                            stmt = update(table).where(
+                                table.c.id == bindparam('b_id')
+                            ).values(
+                                view_count=func.coalesce(table.c.view_count, 0) + bindparam('b_count')
+                            )
+                            connection.execute(stmt, params)
+            except Exception:
+                # 写回失败时把计数放回缓冲区，下次再试
+                with self._lock:
+                    for key, count in pending.items():
+                        self._pending[key] += count
+                        self._pending_total += count
+                (self.app.logger if self.app is not None else logger).exception(
+                    f"View count flush failed, {sum(pending.values())} views kept for retry"
+                )
+                return 0
+            return sum(pending.values())
+
+    def shutdown(self):
+        self._stop.set()
+        if self.app is not None:
+            self.flush()
+
+    def _ensure_worker(self):
+        # gunicorn fork 之后线程不会被继承，按进程号懒启动后台写回线程
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+view_counter = ViewCounterBuffer()
@@ -0,0 +1,217 @@
+"""
+Webhook 事件队列
+webhook 接口验签后只把原始事件写入 webhook_events 表（事件 ID 为主键）并立即返回 200，
+Stripe 重复投递的同一事件插入时主键冲突，直接丢弃。后台 worker 线程池从表中认领事件、
+调用对应的处理函数，处理结果和事件状态在同一事务中提交。
+
+事件状态: pending（待处理） -> processing（处理中） -> processed（已处理） / failed（超过重试次数）。
+处理失败的事件按指数退避延后重试；worker 崩溃遗留的 processing 事件超过锁定时间后重新认领。
+
+配置:
+    WEBHOOK_WORKERS          每个进程的 worker 线程数，默认 2
+    WEBHOOK_POLL_INTERVAL    空闲时轮询间隔（秒），默认 5
+    WEBHOOK_MAX_ATTEMPTS     最大处理次数，默认 8
+    WEBHOOK_LOCK_TIMEOUT     processing 事件的锁定时间（秒），默认 300
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.models.models_fixed import db, WebhookEvent
+
+# {事件类型: 处理函数}，处理函数接收 event['data']['object']，不自行提交事务
+EVENT_HANDLERS = {}
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+
+
+def event_handler(event_type):
+    """注册事件处理函数；处理函数抛出异常时事件回滚并稍后重试"""
+    def decorator(fn):
+        EVENT_HANDLERS[event_type] = fn
+        return fn
+    return decorator
+
+
+def enqueue_event(event_id, event_type, payload, gateway='stripe'):
+    """保存事件并提交，返回 True；事件 ID 已存在（重复投递）时返回 False"""
+    if db.session.get(WebhookEvent, event_id) is not None:
+        return False
+    db.session.add(WebhookEvent(id=event_id, gateway=gateway, type=event_type, payload=payload))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # 并发投递的同一事件已被另一请求写入
+        db.session.rollback()
+        return False
+    webhook_workers.notify()
+    return True
+
+
+def _claimable(now, lock_timeout):
+    return or_(
+        and_(WebhookEvent.status == 'pending', WebhookEvent.available_at <= now),
+        and_(WebhookEvent.status == 'processing', WebhookEvent.locked_at <= now - timedelta(seconds=lock_timeout))
+    )
+
+
+def claim_next(lock_timeout=300, now=None):
+    """认领一个待处理事件，返回事件 ID；没有可处理的事件时返回 None
+
+    带状态条件的 UPDATE 保证多个 worker（包括其他进程）不会认领同一事件。
+    """
+    while True:
+        now = now or datetime.utcnow()
+        event_id = db.session.execute(
+            select(WebhookEvent.id)
+            .where(_claimable(now, lock_timeout))
+            .order_by(WebhookEvent.created_at, WebhookEvent.id)
+            .limit(1)
+        ).scalar()
+        if event_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id, _claimable(now, lock_timeout))
+            .values(status='processing', locked_at=now, attempts=WebhookEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return event_id
+        now = None  # 被其他 worker 抢先，重新查找
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+def process_event(event_id, max_attempts=8):
+    """处理已认领的事件，返回处理后的状态"""
+    event = db.session.get(WebhookEvent, event_id)
+    if event is None or event.status != 'processing':
+        db.session.rollback()
+        return None
+
+    try:
+        handler = EVENT_HANDLERS.get(event.type)
+        if handler is not None:
+            handler(json.loads(event.payload)['data']['object'])
+        event.status = 'processed'
+        event.processed_at = datetime.utcnow()
+        event.last_error = None
+        event.locked_at = None
+        db.session.commit()
+        return event.status
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        db.session.rollback()
+
+    # 处理结果已回滚，单独记录失败信息
+    event = db.session.get(WebhookEvent, event_id)
+    event.status = 'failed' if event.attempts >= max_attempts else 'pending'
+    event.last_error = error
+    event.available_at = datetime.utcnow() + timedelta(seconds=retry_delay(event.attempts))
+    event.locked_at = None
+    db.session.commit()
+    return event.status
+
+
+def process_pending(limit=None, max_attempts=8, lock_timeout=300):
+    """同步处理当前所有可处理的事件（脚本和回放使用），返回处理的事件数"""
+    processed = 0
+    while limit is None or processed < limit:
+        event_id = claim_next(lock_timeout)
+        if event_id is None:
+            break
+        process_event(event_id, max_attempts)
+        processed += 1
+    return processed
+
+
+class WebhookWorkerPool:
+    """后台 worker 线程池，持续处理 webhook 事件队列"""
+
+    def __init__(self, workers=2, poll_interval=5, max_attempts=8, lock_timeout=300):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lock_timeout = lock_timeout
+        self.app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(app.config.get('WEBHOOK_WORKERS', self.workers))
+        self.poll_interval = float(app.config.get('WEBHOOK_POLL_INTERVAL', self.poll_interval))
+        self.max_attempts = int(app.config.get('WEBHOOK_MAX_ATTEMPTS', self.max_attempts))
+        self.lock_timeout = int(app.config.get('WEBHOOK_LOCK_TIMEOUT', self.lock_timeout))
+        # 每个 worker 进程收到第一个请求时启动线程池
+        app.before_request(self.ensure_running)
+        atexit.register(self.shutdown)
+
+    def notify(self):
+        """有新事件入队，唤醒本进程的空闲 worker"""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def shutdown(self):
+        self._stop.set()
+        self.notify()
+
+    def ensure_running(self):
+        # gunicorn fork 之后线程不会被继承，按进程号懒启动
+        if self.app is None or self.workers <= 0 or (self._pid == os.getpid() and self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'webhook-worker-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def drain(self):
+        """处理到队列中没有可处理的事件为止，返回处理的事件数"""
+        processed = 0
+        with self.app.app_context():
+            try:
+                while not self._stop.is_set():
+                    event_id = claim_next(self.lock_timeout)
+                    if event_id is None:
+                        break
+                    status = process_event(event_id, self.max_attempts)
+                    if status == 'failed':
+                        self.app.logger.error(f"Webhook event {event_id} failed after {self.max_attempts} attempts")
+                    processed += 1
+            except Exception as e:
+                self.app.logger.warning(f"Webhook worker failed: {e}")
+            finally:
+                db.session.remove()
+        return processed
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.drain():
+                continue
+            with self._wakeup:
+                self._wakeup.wait(self.poll_interval)
+
+
+webhook_workers = WebhookWorkerPool()
@@ -0,0 +1,98 @@
+"""
+进程内缓存
+带过期时间(TTL)和LRU淘汰的简单缓存，用于分类、筛选项等很少变化的目录数据。
+每个 gunicorn worker 各自持有一份，管理端写操作调用 invalidate 清除本进程缓存，
+其他 worker 最多在 TTL 到期后刷新。
+get_or_set 在计算期间发生过 invalidate 时不写入结果，避免把失效前读到的旧数据放回缓存。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """线程安全的 TTL + LRU 缓存"""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0  # 每次 invalidate 加一
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl, generation=None):
+        """写入缓存；generation 不是当前代（期间发生过 invalidate）时放弃写入"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key, factory, ttl=None):
+        """命中则返回缓存值，否则调用 factory() 计算并写入缓存"""
+        sentinel = object()
+        with self._lock:
+            generation = self._generation
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self._store(key, value, ttl, generation)
+        return value
+
+    def invalidate(self, prefix=None):
+        """清除全部缓存，或仅清除以 prefix 开头的键"""
+        with self._lock:
+            if prefix is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k.startswith(prefix)]:
+                    del self._data[key]
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# 商品目录缓存：分类、筛选项等
+catalog_cache = TTLCache(
+    maxsize=int(os.environ.get('CATALOG_CACHE_MAXSIZE', 256)),
+    ttl=int(os.environ.get('CATALOG_CACHE_TTL', 300))
+)
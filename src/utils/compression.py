@@ -0,0 +1,144 @@
+"""
+响应压缩
+after_request 中根据 Accept-Encoding 对响应体做 brotli / gzip 压缩：
+    COMPRESS_MIN_SIZE     小于该字节数的响应不压缩，默认 500
+    COMPRESS_GZIP_LEVEL   gzip 压缩级别，默认 6
+    COMPRESS_BR_LEVEL     brotli 压缩级别，默认 4（实时压缩不宜用最高级别）
+只压缩文本类内容（JSON、HTML、JS、CSS、SVG 等），图片、压缩包等已压缩格式直接跳过。
+brotli 为可选依赖，未安装时只使用 gzip。
+
+静态文件在启动时由 precompress_static 预先生成 .br / .gz 文件，
+serve() 直接发送预压缩文件，不再逐请求压缩。
+"""
+
+import gzip
+import mimetypes
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset([
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/manifest+json',
+    'image/svg+xml',
+])
+# 预压缩文件的扩展名
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def supported_encodings():
+    """服务端支持的编码，按优先顺序"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(available=None):
+    """根据 Accept-Encoding 选择编码，客户端不接受压缩时返回 None"""
+    available = supported_encodings() if available is None else available
+    if not available:
+        return None
+    return request.accept_encodings.best_match(available)
+
+
+def compress(data, encoding, gzip_level=6, br_level=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=br_level)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def add_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+class Compressor:
+    """对 JSON / 文本响应按需压缩"""
+
+    def __init__(self, min_size=500, gzip_level=6, br_level=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.br_level = br_level
+
+    def init_app(self, app):
+        self.min_size = int(app.config.get('COMPRESS_MIN_SIZE', self.min_size))
+        self.gzip_level = int(app.config.get('COMPRESS_GZIP_LEVEL', self.gzip_level))
+        self.br_level = int(app.config.get('COMPRESS_BR_LEVEL', self.br_level))
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not is_compressible(response.mimetype)
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        # 响应内容随 Accept-Encoding 变化，缓存需按编码区分
+        add_vary(response)
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, self.gzip_level, self.br_level))
+        response.headers['Content-Encoding'] = encoding
+        # 压缩后字节不同，强 ETag 改为弱 ETag（If-None-Match 使用弱比较，304 不受影响）
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def precompress_static(folder, min_size=500, gzip_level=9, br_level=11, logger=None):
+    """为静态目录中的文本文件生成 .br / .gz 预压缩文件
+
+    已存在且不早于原文件的预压缩文件不会重新生成；压缩后没有变小的不保留。
+    返回 {相对路径: {编码: 预压缩文件相对路径}}。目录不可写时跳过并返回已有的部分。
+    """
+    variants = {}
+    if not folder or not os.path.isdir(folder):
+        return variants
+
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if any(name.endswith(suffix) for suffix in ENCODING_SUFFIXES.values()):
+                continue
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(name)[0]
+            if not is_compressible(mimetype) or os.path.getsize(path) < min_size:
+                continue
+
+            rel_path = os.path.relpath(path, folder).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = None
+                for encoding in supported_encodings():
+                    target = path + ENCODING_SUFFIXES[encoding]
+                    try:
+                        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+                            data = f.read() if data is None else data
+                            compressed = compress(data, encoding, gzip_level, br_level)
+                            if len(compressed) >= len(data):
+                                continue
+                            with open(target, 'wb') as out:
+                                out.write(compressed)
+                    except OSError as e:
+                        if logger is not None:
+                            logger.warning(f"Precompress {rel_path} ({encoding}) failed: {e}")
+                        continue
+                    variants.setdefault(rel_path, {})[encoding] = rel_path + ENCODING_SUFFIXES[encoding]
+    return variants
@@ -0,0 +1,64 @@
+"""
+数据库方言差异
+SQLite 与 PostgreSQL 在日期截取、JSON 列类型和 upsert 语法上不同，
+业务代码通过这里的封装编写一次，按连接的方言生成对应的 SQL。
+"""
+
+from sqlalchemy import Date, JSON
+from sqlalchemy.dialects.postgresql import JSONB, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# JSON 列：PostgreSQL 使用可索引的 JSONB，其他数据库使用通用 JSON
+JSONType = JSON().with_variant(JSONB(), 'postgresql')
+
+
+class date_of(FunctionElement):
+    """取日期时间列的日期部分，结果类型为 Date"""
+    type = Date()
+    name = 'date_of'
+    inherit_cache = True
+
+
+@compiles(date_of)
+def _date_of_default(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+
+@compiles(date_of, 'sqlite')
+def _date_of_sqlite(element, compiler, **kw):
+    # SQLite 的 CAST AS DATE 会按数值处理，需使用 date() 函数
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+
+_INSERT_BUILDERS = {
+    'sqlite': sqlite_insert,
+    'postgresql': postgresql_insert,
+}
+
+
+def upsert_increment(connection, table, index_elements, values, increment):
+    """插入一行，唯一键冲突时把 increment 中的列在原值上累加
+
+    SQLite 和 PostgreSQL 使用 ON CONFLICT DO UPDATE，其他数据库回退为先 UPDATE、影响 0 行时再 INSERT。
+    """
+    builder = _INSERT_BUILDERS.get(connection.dialect.name)
+
+    if builder is not None:
+        stmt = builder(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: table.c[column] + stmt.excluded[column] for column in increment}
+        )
+        connection.execute(stmt)
+        return
+
+    key_criteria = [table.c[column] == values[column] for column in index_elements]
+    result = connection.execute(
+        table.update().where(*key_criteria).values(
+            {column: table.c[column] + values[column] for column in increment}
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**values))
@@ -0,0 +1,96 @@
+"""
+读写分离
+配置了只读副本（SQLALCHEMY_BINDS 中的 replica）时，GET/HEAD 请求的查询走副本，
+其他请求以及任何写操作走主库。客户端自己写入成功后的一段时间内（粘滞窗口）
+通过 cookie 标记，其读请求也走主库，保证刚下的订单、刚改的资料立即可见。
+
+路由状态保存在 flask.g 中，按请求隔离；请求之外（后台线程、脚本）始终使用主库。
+"""
+
+import time
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND_KEY = 'replica'
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+STICKY_COOKIE = 'db_primary_until'
+
+
+def _use_replica():
+    return has_request_context() and g.get('db_route') == REPLICA_BIND_KEY
+
+
+def use_primary():
+    """本请求剩余的查询改走主库（读到的数据要用于写入时调用）"""
+    if has_request_context():
+        g.db_route = 'primary'
+
+
+class RoutingSession(Session):
+    """按请求的路由状态选择主库或只读副本"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _use_replica():
+            if self._flushing or isinstance(clause, UpdateBase):
+                # 只读请求里出现写操作时，本请求之后的查询都回到主库，保证读到自己的写入
+                use_primary()
+            elif self._is_default_bind(mapper):
+                replica = self._db.engines.get(REPLICA_BIND_KEY)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    @staticmethod
+    def _is_default_bind(mapper):
+        if mapper is None:
+            return True
+        table = getattr(mapper, 'local_table', None)
+        return table is None or table.metadata.info.get('bind_key') is None
+
+
+class ReadReplicaRouter:
+    """在请求开始时决定本请求的路由，写请求成功后设置粘滞 cookie"""
+
+    def __init__(self, sticky_seconds=10):
+        self.sticky_seconds = sticky_seconds
+        self.app = None
+        self.enabled = False
+
+    def init_app(self, app, db):
+        self.app = app
+        self.sticky_seconds = int(app.config.get('DB_REPLICA_STICKY_SECONDS', self.sticky_seconds))
+        with app.app_context():
+            self.enabled = REPLICA_BIND_KEY in db.engines
+        if not self.enabled:
+            return
+        app.before_request(self._choose_route)
+        app.after_request(self._mark_sticky)
+
+    def _choose_route(self):
+        if request.method in READ_METHODS and not self._in_sticky_window():
+            g.db_route = REPLICA_BIND_KEY
+        else:
+            g.db_route = 'primary'
+
+    def _in_sticky_window(self):
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _mark_sticky(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time()) + self.sticky_seconds),
+                max_age=self.sticky_seconds,
+                httponly=True,
+                secure=self.app.config.get('SESSION_COOKIE_SECURE', False),
+                samesite=self.app.config.get('SESSION_COOKIE_SAMESITE')
+            )
+        return response
+
+
+read_replica_router = ReadReplicaRouter()
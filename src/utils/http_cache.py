@@ -0,0 +1,86 @@
+"""
+HTTP 条件请求
+目录类接口根据数据版本（行数 + 最大 updated_at，或单条记录的 updated_at）生成 ETag，
+客户端带 If-None-Match / If-Modified-Since 且数据未变化时直接返回 304，不再序列化 JSON。
+ETag 同时包含请求路径和查询参数，不同筛选条件、分页互不影响。
+
+商品的库存、浏览量、评分统计通过 Core UPDATE 修改时也会触发 updated_at 的 onupdate，
+响应中的每个字段都计入数据版本，因此可以使用强 ETag。
+列表接口的分页总数直接复用 collection_version 查出的行数，不再单独 COUNT；
+with_total=false 时不查询数据版本，响应不带 ETag。
+"""
+
+import hashlib
+import json
+from datetime import timezone
+
+from flask import current_app, request
+from sqlalchemy import func
+
+# 各接口的 Cache-Control 策略
+CACHE_POLICIES = {
+    # 列表页：浏览器/CDN 缓存 60 秒，过期后 5 分钟内可先返回旧数据并在后台重新验证
+    'catalog_list': 'public, max-age=60, stale-while-revalidate=300',
+    # 含库存或需要统计浏览量的详情页：每次都回源验证（命中时返回 304）
+    'revalidate': 'public, no-cache',
+}
+
+
+def collection_version(query, updated_column):
+    """一次聚合查询返回 (行数, 最大 updated_at)，用作列表数据的版本"""
+    count, last_modified = query.order_by(None).with_entities(
+        func.count(), func.max(updated_column)
+    ).one()
+    return count, last_modified
+
+
+def make_etag(*parts):
+    """由请求路径、查询参数和数据版本计算 ETag"""
+    payload = json.dumps(
+        [request.path, sorted(request.args.items(multi=True)), parts],
+        default=str,
+        separators=(',', ':')
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _http_datetime(value):
+    if value is None:
+        return None
+    # updated_at 以 naive UTC 存储，HTTP 日期只精确到秒
+    return value.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # If-None-Match 优先于 If-Modified-Since，GET 使用弱比较
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _set_validators(response, etag, last_modified, policy, weak):
+    if etag is not None:
+        response.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = CACHE_POLICIES[policy]
+    return response
+
+
+def conditional_response(build, etag, last_modified=None, policy='catalog_list', weak=False):
+    """未变化时返回 304，否则调用 build() 生成响应并附加缓存头
+
+    build 返回 Response；弱 ETag 用于响应中含有不计入版本的易变字段（如实时浏览量）的接口。
+    etag 为 None（调用方没有查询数据版本，如 with_total=false）时只附加 Cache-Control。
+    """
+    last_modified = _http_datetime(last_modified)
+    if etag is not None and _not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+        return _set_validators(response, etag, last_modified, policy, weak)
+
+    response = build()
+    if response.status_code == 200:
+        _set_validators(response, etag, last_modified, policy, weak)
+    return response
@@ -0,0 +1,166 @@
+"""
+列表分页工具
+默认沿用 OFFSET 分页；请求携带 cursor 参数时改为按 (排序键..., id) 的游标分页，
+with_total=false 时跳过 COUNT(*) 查询；调用方已知总行数（如 ETag 的数据版本）时直接传入 total。
+
+排序键可以是多列（同一方向），NULL 一律排在最后。支持游标的接口用 keyset_order()
+生成 OFFSET 模式的 ORDER BY，两种分页方式返回的顺序一致。
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, false, literal, or_
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析"""
+
+
+def wants_total(args):
+    """解析 with_total 参数，默认返回总数"""
+    return args.get('with_total', 'true').lower() not in ('false', '0', 'no')
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _decode_value(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(sort_values, row_id):
+    raw = json.dumps([_encode_value(value) for value in sort_values] + [row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_columns):
+    """返回 ([排序键值...], id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(sort_columns) + 1:
+            raise ValueError('cursor does not match the sort order')
+        sort_values = [_decode_value(column, value) for column, value in zip(sort_columns, values)]
+        return sort_values, int(values[-1])
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f'Invalid cursor: {cursor}') from e
+
+
+def _sort_columns(sort_column, id_column):
+    if sort_column is None:
+        return []
+    if isinstance(sort_column, (list, tuple)):
+        return [column for column in sort_column if column is not id_column]
+    return [] if sort_column is id_column else [sort_column]
+
+
+def keyset_order(sort_column, id_column, descending=True):
+    """(排序键..., id) 的 ORDER BY 子句，NULL 排在最后；sort_column 可以是单列或多列"""
+    columns = _sort_columns(sort_column, id_column) + [id_column]
+    return [(column.desc() if descending else column.asc()).nulls_last() for column in columns]
+
+
+def _after(columns, values, descending):
+    """按 keyset_order 的顺序排在 values 之后的行"""
+    conditions = []
+    equal = []
+    for column, value in zip(columns, values):
+        if value is None:
+            # NULL 排在最后，之后没有非 NULL 的值
+            later = false()
+            equal.append(column.is_(None))
+        else:
+            # 绑定为参数，布尔列也可以用 < / > 比较
+            value = literal(value, type_=column.type)
+            later = or_(column < value if descending else column > value, column.is_(None))
+            equal.append(column == value)
+        conditions.append(and_(*equal[:-1], later))
+    return or_(*conditions)
+
+
+class Page:
+    """分页结果，字段与 Flask-SQLAlchemy 的 Pagination 保持一致，并附带 next_cursor"""
+
+    def __init__(self, items, total, pages, has_next, has_prev, next_cursor=None):
+        self.items = items
+        self.total = total
+        self.pages = pages
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = next_cursor
+
+
+def paginate(query, page, per_page, cursor=None, sort_column=None, id_column=None,
+             descending=True, with_total=True, total=None):
+    """分页查询
+
+    cursor 为 None 时使用 OFFSET 分页（保留 query 原有排序）；
+    否则按 keyset_order(sort_column, id_column, descending) 做游标分页，空字符串表示第一页。
+    total 为调用方已经查出的总行数，传入时不再执行 COUNT(*)。
+    """
+    if cursor is None:
+        pagination = query.paginate(
+            page=page, per_page=per_page, error_out=False, count=with_total and total is None
+        )
+        if total is not None:
+            pagination.total = total
+        counted = pagination.total is not None
+        return Page(
+            items=pagination.items,
+            total=pagination.total if with_total else None,
+            pages=pagination.pages if with_total else None,
+            has_next=pagination.has_next if counted else len(pagination.items) == per_page,
+            has_prev=pagination.has_prev
+        )
+
+    sort_columns = _sort_columns(sort_column, id_column)
+    if total is None and with_total:
+        total = query.order_by(None).count()
+    total = total if with_total else None
+
+    keyset_query = query
+    if cursor:
+        last_values, last_id = decode_cursor(cursor, sort_columns)
+        keyset_query = keyset_query.filter(
+            _after(sort_columns + [id_column], last_values + [last_id], descending)
+        )
+    keyset_query = keyset_query.order_by(None).order_by(*keyset_order(sort_columns, id_column, descending))
+
+    # 多取一条用于判断是否还有下一页
+    rows = keyset_query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in sort_columns], getattr(last, id_column.key))
+
+    return Page(
+        items=items,
+        total=total,
+        pages=None,
+        has_next=has_next,
+        has_prev=bool(cursor),
+        next_cursor=next_cursor
+    )
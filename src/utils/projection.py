@@ -0,0 +1,85 @@
+"""
+列表字段投影
+列表接口支持 view=card|full 和 fields=a,b,c 参数：请求部分字段时只 SELECT 这些列，
+结果按元组读取后直接组装成字典，不创建 ORM 对象，也不加载图片等关联数据。
+主图通过 primary_images 一次查询取出整页商品的第一张图片。
+"""
+
+from sqlalchemy import select
+
+# 伪字段：不是表中的列，由调用方单独查询后补充
+IMAGE_FIELD = 'image'
+
+
+class ProjectionError(ValueError):
+    """fields / view 参数不合法"""
+    pass
+
+
+def parse_fields(args, model, card_fields):
+    """解析请求参数，返回要返回的字段列表；返回 None 表示完整数据（view=full）"""
+    fields = args.get('fields')
+    view = args.get('view', 'full')
+
+    if fields:
+        requested = [name.strip() for name in fields.split(',') if name.strip()]
+    elif view == 'card':
+        requested = list(card_fields)
+    elif view == 'full':
+        return None
+    else:
+        raise ProjectionError(f'Unknown view: {view}')
+
+    columns = model.__table__.columns
+    unknown = [name for name in requested if name not in columns and name != IMAGE_FIELD]
+    if unknown:
+        raise ProjectionError(f"Unknown fields: {', '.join(unknown)}")
+
+    # id 总是返回，去重并保持请求顺序
+    result = ['id']
+    for name in requested:
+        if name not in result:
+            result.append(name)
+    return result
+
+
+def project_query(query, model, fields, extra_columns=()):
+    """把查询改为只选取 fields 中的列；extra_columns 为分页游标等需要但不返回的列"""
+    columns = [getattr(model, name) for name in fields if name != IMAGE_FIELD]
+    selected = {column.key for column in columns}
+    for column in extra_columns:
+        if column is not None and column.key not in selected:
+            columns.append(column)
+            selected.add(column.key)
+    return query.with_entities(*columns)
+
+
+def project_rows(session, rows, fields, image_model=None, owner_column=None):
+    """把投影查询的行转换为字典；请求了 image 字段时一次查询补充整页的主图"""
+    column_fields = [name for name in fields if name != IMAGE_FIELD]
+    with_image = IMAGE_FIELD in fields and image_model is not None
+    images = primary_images(session, image_model, owner_column, [row.id for row in rows]) if with_image else {}
+
+    items = []
+    for row in rows:
+        mapping = row._mapping
+        item = {name: mapping[name] for name in column_fields}
+        if IMAGE_FIELD in fields:
+            item[IMAGE_FIELD] = images.get(item['id'])
+        items.append(item)
+    return items
+
+
+def primary_images(session, image_model, owner_column, owner_ids):
+    """一次查询返回 {owner_id: image_url}，优先主图，其次按 sort_order 取第一张"""
+    if not owner_ids:
+        return {}
+    rows = session.execute(
+        select(owner_column, image_model.image_url)
+        .where(owner_column.in_(owner_ids))
+        .order_by(owner_column, image_model.is_primary.desc(), image_model.sort_order, image_model.id)
+    ).all()
+    images = {}
+    for owner_id, image_url in rows:
+        images.setdefault(owner_id, image_url)
+    return images
@@ -0,0 +1,75 @@
+"""
+SQLite 连接参数
+在连接池每次新建连接时执行 PRAGMA：WAL 模式下读写互不阻塞，busy_timeout 让写锁冲突
+排队等待而不是立即报 database is locked，synchronous=NORMAL 在 WAL 下只在检查点时同步磁盘。
+
+各项可通过环境变量调整，SQLITE_TUNING=off 时保持 SQLite 默认设置：
+    SQLITE_JOURNAL_MODE   默认 WAL
+    SQLITE_BUSY_TIMEOUT   毫秒，默认 5000
+    SQLITE_SYNCHRONOUS    默认 NORMAL
+    SQLITE_CACHE_SIZE     页缓存，负数表示 KiB，默认 -65536（64MB）
+    SQLITE_MMAP_SIZE      字节，默认 268435456（256MB），0 表示不使用内存映射
+    SQLITE_TEMP_STORE     默认 MEMORY
+"""
+
+import os
+
+from sqlalchemy import event
+
+DEFAULT_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE', 'WAL'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT', '5000'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS', 'NORMAL'),
+    ('cache_size', 'SQLITE_CACHE_SIZE', '-65536'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE', '268435456'),
+    ('temp_store', 'SQLITE_TEMP_STORE', 'MEMORY'),
+)
+
+
+def pragma_settings(environ=None):
+    """根据环境变量返回 [(pragma, value), ...]，关闭调优时返回空列表"""
+    environ = os.environ if environ is None else environ
+    if environ.get('SQLITE_TUNING', 'on').lower() in ('off', '0', 'false', 'no'):
+        return []
+    settings = []
+    for pragma, env_name, default in DEFAULT_PRAGMAS:
+        value = environ.get(env_name, default)
+        if value:
+            settings.append((pragma, value))
+    return settings
+
+
+def apply_pragmas(dbapi_connection, settings):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in settings:
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    finally:
+        cursor.close()
+
+
+def register_sqlite_pragmas(engine, settings=None):
+    """为 engine 的每个新连接应用 PRAGMA，非 SQLite 引擎直接忽略"""
+    if engine.dialect.name != 'sqlite':
+        return []
+    settings = pragma_settings() if settings is None else settings
+    if not settings:
+        return []
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, settings)
+
+    return settings
+
+
+def init_app(app, db):
+    """在 db.init_app 之后调用，为应用的所有数据库引擎注册 PRAGMA"""
+    with app.app_context():
+        engines = set(db.engines.values())
+    for engine in engines:
+        settings = register_sqlite_pragmas(engine)
+        if settings:
+            app.logger.info(
+                "SQLite pragmas: " + ', '.join(f"{pragma}={value}" for pragma, value in settings)
+            )
@@ -0,0 +1,218 @@
+"""
+静态文件索引
+启动时扫描静态目录，建立 {相对路径: 文件信息} 的内存索引（大小、修改时间、内容哈希 ETag、
+MIME 类型、预压缩版本），serve() 查索引决定返回哪个文件，不再逐请求 os.path.exists。
+index.html 连同其压缩版本直接保存在内存中。
+
+文件名带内容哈希的构建产物（如 assets/index-4f3a9c1b.js）使用一年的 immutable 缓存，
+其他文件每次回源验证 ETag。
+
+生产环境通过信号（默认 SIGHUP，STATIC_RELOAD_SIGNAL 配置）重新扫描目录：信号处理函数只设置标记，
+由收到信号后的第一个请求执行扫描和预压缩（信号处理函数中加锁可能与被打断的请求死锁）；
+STATIC_INDEX_AUTO_RELOAD 为真（默认与 debug 相同）时每次请求检查命中文件的修改时间，
+变化时重新扫描；未命中的路径（前端路由、探测请求）最多每 STATIC_INDEX_RESCAN_INTERVAL 秒
+（默认 1）触发一次重新扫描，间隔内的未命中直接返回 None。
+"""
+
+import hashlib
+import mimetypes
+import os
+import re
+import signal
+import threading
+import time
+
+from flask import request, send_file
+
+from src.utils.compression import (
+    ENCODING_SUFFIXES, compress, is_compressible, negotiate_encoding, precompress_static, supported_encodings
+)
+
+# 文件名中的哈希段：至少 8 位且包含数字，例如 index-4f3a9c1b.js、main.Bx7k2q9a.css
+HASHED_NAME = re.compile(r'[.-]([A-Za-z0-9_]{8,})\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'public, no-cache'
+INDEX_FILE = 'index.html'
+
+
+def is_hashed_name(name):
+    match = HASHED_NAME.search(name)
+    return bool(match) and any(ch.isdigit() for ch in match.group(1))
+
+
+class StaticFile:
+    """索引中的一个静态文件"""
+
+    def __init__(self, rel_path, abs_path, variants):
+        stat = os.stat(abs_path)
+        self.rel_path = rel_path
+        self.abs_path = abs_path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        self.cache_control = IMMUTABLE_CACHE if is_hashed_name(os.path.basename(rel_path)) else REVALIDATE_CACHE
+        # {编码: 预压缩文件绝对路径}
+        self.variants = {
+            encoding: os.path.join(os.path.dirname(abs_path), os.path.basename(variant))
+            for encoding, variant in variants.items()
+        }
+        self.body = None  # 保存在内存中的文件内容（仅 index.html）
+        self.compressed = {}  # {编码: 内存中的压缩内容}
+
+        digest = hashlib.sha1()
+        with open(abs_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        self.etag = digest.hexdigest()
+
+    def load_into_memory(self):
+        with open(self.abs_path, 'rb') as f:
+            self.body = f.read()
+        if self.body and is_compressible(self.mimetype):
+            for encoding in supported_encodings():
+                data = compress(self.body, encoding, gzip_level=9, br_level=11)
+                if len(data) < len(self.body):
+                    self.compressed[encoding] = data
+
+    def is_stale(self):
+        try:
+            return os.stat(self.abs_path).st_mtime != self.mtime
+        except OSError:
+            return True
+
+
+class StaticIndex:
+    """静态目录的内存索引"""
+
+    def __init__(self):
+        self.app = None
+        self.folder = None
+        self.files = {}
+        self.index_file = None
+        self.auto_reload = False
+        self.rescan_interval = 1.0
+        self._last_scan = None
+        self._reload_requested = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.folder = app.static_folder
+        self.auto_reload = bool(app.config.get('STATIC_INDEX_AUTO_RELOAD', app.debug))
+        self.rescan_interval = float(app.config.get('STATIC_INDEX_RESCAN_INTERVAL', self.rescan_interval))
+        self.reload()
+
+        signal_name = app.config.get('STATIC_RELOAD_SIGNAL', 'SIGHUP')
+        signum = getattr(signal, signal_name, None) if signal_name else None
+        if signum is not None:
+            try:
+                signal.signal(signum, lambda *args: self.request_reload())
+            except ValueError:
+                # 只能在主线程注册信号处理函数（例如在测试或交互环境中导入时）
+                app.logger.info(f"Static index reload signal {signal_name} not registered (not main thread)")
+
+    def reload(self):
+        """重新扫描静态目录并替换索引"""
+        files = {}
+        index_file = None
+        if self.folder and os.path.isdir(self.folder):
+            variants = precompress_static(self.folder, logger=self.app.logger if self.app else None)
+            suffixes = tuple(ENCODING_SUFFIXES.values())
+            for root, _, names in os.walk(self.folder):
+                for name in names:
+                    if name.endswith(suffixes):
+                        continue
+                    abs_path = os.path.join(root, name)
+                    rel_path = os.path.relpath(abs_path, self.folder).replace(os.sep, '/')
+                    files[rel_path] = StaticFile(rel_path, abs_path, variants.get(rel_path, {}))
+            index_file = files.get(INDEX_FILE)
+            if index_file is not None:
+                index_file.load_into_memory()
+
+        with self._lock:
+            self.files = files
+            self.index_file = index_file
+            self._last_scan = time.monotonic()
+        if self.app is not None:
+            self.app.logger.info(f"Static index loaded: {len(files)} files")
+        return len(files)
+
+    def request_reload(self):
+        """要求下一个请求重新扫描（在信号处理函数中调用，不加锁、不做 IO）"""
+        self._reload_requested = True
+
+    def _reload_if_requested(self):
+        if not self._reload_requested:
+            return
+        with self._lock:
+            # 并发请求只有一个执行扫描
+            requested, self._reload_requested = self._reload_requested, False
+        if requested:
+            self.reload()
+
+    def _rescan_due(self):
+        """距上次扫描已超过 rescan_interval 秒时返回 True，并占用本次扫描（并发请求只有一个会扫描）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_scan is not None and now - self._last_scan < self.rescan_interval:
+                return False
+            self._last_scan = now
+            return True
+
+    def lookup(self, path):
+        """返回 path 对应的 StaticFile，不存在时返回 None"""
+        self._reload_if_requested()
+        entry = self.files.get(path)
+        if not self.auto_reload:
+            return entry
+        if entry is not None:
+            # 命中的文件被修改或删除时立即重新扫描
+            if entry.is_stale():
+                self.reload()
+                entry = self.files.get(path)
+        elif self._rescan_due():
+            self.reload()
+            entry = self.files.get(path)
+        return entry
+
+    def spa_index(self):
+        self._reload_if_requested()
+        if self.auto_reload:
+            if self.index_file is not None and self.index_file.is_stale():
+                self.reload()
+            elif self.index_file is None and self._rescan_due():
+                self.reload()
+        return self.index_file
+
+    def send(self, entry):
+        """发送索引中的文件：协商预压缩版本，处理 If-None-Match / Range"""
+        available = list(entry.compressed or entry.variants)
+        encoding = negotiate_encoding(available) if available else None
+        etag = entry.etag if encoding is None else f"{entry.etag}-{encoding}"
+
+        if entry.body is not None:
+            body = entry.body if encoding is None else entry.compressed[encoding]
+            response = self.app.response_class(body, mimetype=entry.mimetype)
+            response.set_etag(etag)
+            response.last_modified = entry.mtime
+            response.make_conditional(request)
+        else:
+            path = entry.abs_path if encoding is None else entry.variants[encoding]
+            response = send_file(
+                path,
+                mimetype=entry.mimetype,
+                etag=etag,
+                last_modified=entry.mtime,
+                conditional=True,
+                max_age=None
+            )
+
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if available:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = entry.cache_control
+        return response
+
+
+static_index = StaticIndex()
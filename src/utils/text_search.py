@@ -0,0 +1,38 @@
+"""
+全文检索文本处理
+SQLite FTS5 自带的 unicode61 分词器会把连续的中文当成一个词，
+这里在入库和查询前把每个汉字拆成独立的词元，查询时用短语匹配
+（相邻汉字按顺序出现），效果等同于子串匹配，同时可以使用 BM25 排序。
+"""
+
+import re
+
+_CJK_RE = re.compile(
+    '([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af])'
+)
+
+
+def segment_text(text):
+    """把汉字逐字用空格隔开，其余文本保持不变"""
+    if not text:
+        return ''
+    return _CJK_RE.sub(r' \1 ', text)
+
+
+def build_match_query(search):
+    """把用户输入转换为 FTS5 MATCH 表达式，各关键词之间为 AND 关系
+
+    中文关键词转为短语匹配，英文/数字关键词使用前缀匹配。
+    没有可检索内容时返回 None。
+    """
+    terms = []
+    for term in (search or '').split():
+        tokens = re.findall(r'\w+', segment_text(term))
+        if not tokens:
+            continue
+        phrase = ' '.join(tokens)
+        if _CJK_RE.search(term):
+            terms.append(f'"{phrase}"')
+        else:
+            terms.append(f'"{phrase}"*')
+    return ' '.join(terms) if terms else None
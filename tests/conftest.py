@@ -0,0 +1,104 @@
+"""
+测试公共配置
+每个测试使用独立的 SQLite 数据库文件和新的 Flask 应用，
+与 src/main.py 一样注册订单统计、评分聚合的 flush 监听和 JSON provider。
+assert_matches_rebuild 检查增量维护的仪表板统计与 rebuild_metrics() 重新计算的结果一致。
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+# 与 src/main.py 相同，从仓库根目录导入 src 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from src.models.models_fixed import db, DailyOrderMetric, ProductSalesMetric
+from src.services import dashboard_metrics  # 同时注册订单统计的 flush 监听
+from src.services import rating_aggregates  # noqa: F401  注册评分聚合的 flush 监听
+from src.utils.json_provider import FastJSONProvider
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: 耗时较长的测试（如并发压力测试），可用 -m "not slow" 跳过')
+
+
+def create_test_app(database_uri, **config):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    app.config.update(config)
+    db.init_app(app)
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_test_app(f"sqlite:///{tmp_path / 'test.db'}")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class StatementCounter:
+    """记录引擎执行的 SQL 语句"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements = []
+
+
+@pytest.fixture
+def statements(app):
+    counter = StatementCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', counter)
+
+
+def _metrics_snapshot():
+    daily = {
+        (row.metric_date, row.status): (row.order_count, Decimal(str(row.revenue)))
+        for row in DailyOrderMetric.query.all()
+        if row.order_count or row.revenue
+    }
+    sales = {row.product_id: row.units_sold for row in ProductSalesMetric.query.all() if row.units_sold}
+    return daily, sales
+
+
+@pytest.fixture
+def metrics_snapshot(app):
+    """返回读取统计表的函数：({(metric_date, status): (order_count, revenue)}, {product_id: units_sold})"""
+    return _metrics_snapshot
+
+
+@pytest.fixture
+def assert_matches_rebuild(app):
+    """返回检查函数：当前统计表应与 rebuild_metrics() 重新计算的结果一致"""
+    def check():
+        incremental = _metrics_snapshot()
+        dashboard_metrics.rebuild_metrics()
+        assert incremental == _metrics_snapshot()
+    return check
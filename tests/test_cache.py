@@ -0,0 +1,106 @@
+"""
+进程内 TTL + LRU 缓存：过期、淘汰、失效以及 /api/admin/cache-stats 展示的计数
+"""
+
+import pytest
+
+from src.utils import cache as cache_module
+from src.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(ttl=10)
+    cache.set('categories', ['汝窑'])
+    cache.set('filters', {'price': [0, 500]}, ttl=60)
+
+    clock.now += 9.9
+    assert cache.get('categories') == ['汝窑']
+
+    clock.now += 0.1
+    assert cache.get('categories') is None
+    assert cache.get('filters') == {'price': [0, 500]}
+    assert cache.stats()['size'] == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # a 变为最近使用
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_all_or_by_prefix(clock):
+    cache = TTLCache()
+    cache.set('catalog:categories', 1)
+    cache.set('catalog:filters', 2)
+    cache.set('ru:categories', 3)
+
+    cache.invalidate('catalog:')
+    assert cache.get('catalog:categories') is None
+    assert cache.get('catalog:filters') is None
+    assert cache.get('ru:categories') == 3
+
+    cache.invalidate()
+    assert cache.get('ru:categories') is None
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_get_or_set_does_not_store_value_computed_before_invalidate(clock):
+    cache = TTLCache()
+
+    def stale_factory():
+        # 计算期间管理端修改了数据并清除缓存
+        cache.invalidate('catalog:')
+        return 'old'
+
+    assert cache.get_or_set('catalog:categories', stale_factory) == 'old'
+    assert cache.get('catalog:categories') is None
+    assert cache.get_or_set('catalog:categories', lambda: 'new') == 'new'
+    assert cache.get('catalog:categories') == 'new'
+
+
+def test_stats_counts_hits_and_misses(clock):
+    cache = TTLCache(maxsize=8, ttl=30)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return 'value'
+
+    for _ in range(4):
+        assert cache.get_or_set('key', factory) == 'value'
+    assert cache.get('missing') is None
+
+    assert len(calls) == 1
+    assert cache.stats() == {
+        'size': 1,
+        'maxsize': 8,
+        'ttl': 30,
+        'hits': 3,
+        'misses': 2,
+        'hit_rate': 0.6,
+        'evictions': 0,
+        'invalidations': 0
+    }
@@ -0,0 +1,94 @@
+"""
+仪表板统计的增量维护：每次提交后的统计表应与 rebuild_metrics() 重新计算的结果一致
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.models_fixed import db, User, Product, Order, OrderItem
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def product(app):
+    product = Product(name='汝窑茶杯', price=Decimal('49.50'), stock=100)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def _create_order(user, product, total_amount='99.00', quantity=2, status='pending'):
+    order = Order(user_id=user.id, subtotal=total_amount, total_amount=total_amount, status=status)
+    order.items.append(OrderItem(
+        product_id=product.id, product_name=product.name, quantity=quantity,
+        unit_price=product.price, total_price=product.price * quantity
+    ))
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def test_status_change_on_expired_order(user, product, assert_matches_rebuild, metrics_snapshot):
+    order = _create_order(user, product)
+    assert_matches_rebuild()
+
+    # 提交后 order 已过期，修改状态时由 active_history 加载原值
+    for status in ('paid', 'shipped', 'delivered'):
+        order.status = status
+        db.session.commit()
+        assert_matches_rebuild()
+
+    daily, _ = metrics_snapshot()
+    assert list(daily.values()) == [(1, Decimal('99.00'))]
+
+
+def test_status_change_in_fresh_session(user, product, assert_matches_rebuild):
+    order_id = _create_order(user, product).id
+    db.session.remove()
+
+    order = db.session.get(Order, order_id)
+    order.status = 'paid'
+    db.session.commit()
+    assert_matches_rebuild()
+
+
+def test_total_amount_change(user, product, assert_matches_rebuild):
+    order = _create_order(user, product, total_amount='0')
+
+    order.total_amount = Decimal('99.00')
+    db.session.commit()
+    assert_matches_rebuild()
+
+    order.status = 'paid'
+    order.total_amount = Decimal('120.00')
+    db.session.commit()
+    assert_matches_rebuild()
+
+
+def test_delete_order_removes_order_and_items(user, product, assert_matches_rebuild, metrics_snapshot):
+    kept = _create_order(user, product, total_amount='10.00', quantity=1)
+    deleted = _create_order(user, product, total_amount='99.00', quantity=3, status='paid')
+
+    db.session.delete(deleted)
+    db.session.commit()
+    assert_matches_rebuild()
+
+    daily, sales = metrics_snapshot()
+    assert list(daily.values()) == [(1, Decimal('10.00'))]
+    assert sales == {product.id: kept.items[0].quantity}
+
+
+def test_item_quantity_change(user, product, assert_matches_rebuild):
+    order = _create_order(user, product, quantity=2)
+
+    order.items[0].quantity = 5
+    db.session.commit()
+    assert_matches_rebuild()
@@ -0,0 +1,78 @@
+"""
+读写分离：主库和只读副本为两个 SQLite 文件，GET 读副本，写入后的粘滞窗口内读主库
+"""
+
+import time
+
+import pytest
+from flask import jsonify
+
+from conftest import create_test_app
+from src.models.models_fixed import db, Category
+from src.utils.db_routing import REPLICA_BIND_KEY, STICKY_COOKIE, ReadReplicaRouter
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_test_app(
+        f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_BINDS={REPLICA_BIND_KEY: f"sqlite:///{tmp_path / 'replica.db'}"},
+        DB_REPLICA_STICKY_SECONDS=30
+    )
+    ReadReplicaRouter().init_app(app, db)
+
+    @app.route('/categories', methods=['GET'])
+    def list_categories():
+        return jsonify([category.name for category in Category.query.order_by(Category.id).all()])
+
+    @app.route('/categories', methods=['POST'])
+    def create_category():
+        db.session.add(Category(name='新分类'))
+        db.session.commit()
+        return jsonify({'ok': True}), 201
+
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines[REPLICA_BIND_KEY])
+        # 两个库放入不同的数据，按返回内容判断读的是哪个库
+        db.session.add(Category(name='主库'))
+        db.session.commit()
+        with db.engines[REPLICA_BIND_KEY].begin() as connection:
+            connection.execute(Category.__table__.insert(), {'name': '副本'})
+        db.session.remove()
+    yield app
+    # init_app 按 SQLALCHEMY_BINDS 在共用的 db 上登记了 replica 的 metadata，其他测试的应用没有这个库
+    db.metadatas.pop(REPLICA_BIND_KEY, None)
+
+
+def test_reads_go_to_replica(client):
+    assert client.get('/categories').get_json() == ['副本']
+
+
+def test_writes_go_to_primary_and_reads_stick(client, app):
+    response = client.post('/categories')
+    assert response.status_code == 201
+    assert client.get_cookie(STICKY_COOKIE) is not None
+
+    # 粘滞窗口内读主库，能看到刚写入的数据
+    assert client.get('/categories').get_json() == ['主库', '新分类']
+
+    # 其他客户端仍读副本
+    assert app.test_client().get('/categories').get_json() == ['副本']
+
+
+def test_expired_sticky_window_reads_replica(client):
+    client.post('/categories')
+    client.set_cookie(STICKY_COOKIE, str(int(time.time()) - 1))
+
+    assert client.get('/categories').get_json() == ['副本']
+
+
+def test_failed_write_does_not_set_sticky_cookie(app):
+    @app.route('/fail', methods=['POST'])
+    def fail():
+        return jsonify({'error': 'bad request'}), 400
+
+    client = app.test_client()
+    client.post('/fail')
+    assert client.get_cookie(STICKY_COOKIE) is None
@@ -0,0 +1,57 @@
+"""
+批量更新订单状态：订单、物流单同步更新，状态变化的订单各发一条通知，统计表与重新计算的结果一致
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.models_fixed import db, User, Order, Shipment, Notification
+from src.services.order_status import bulk_update_order_status
+
+
+@pytest.fixture
+def orders(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    orders = [
+        Order(user_id=user.id, subtotal=amount, total_amount=amount, status=status)
+        for amount, status in (('10.00', 'paid'), ('20.00', 'paid'), ('30.00', 'shipped'))
+    ]
+    db.session.add_all(orders)
+    db.session.flush()
+    db.session.add_all(
+        Shipment(order_id=order.id, tracking_number=f'SF{order.id:012d}', status='pending') for order in orders
+    )
+    db.session.commit()
+    return [order.id for order in orders]
+
+
+def test_bulk_update_orders_shipments_and_notifications(orders, assert_matches_rebuild):
+    missing = max(orders) + 100
+    results = bulk_update_order_status(orders + [missing], 'shipped', chunk_size=2)
+    db.session.commit()
+
+    assert results == {orders[0]: 'updated', orders[1]: 'updated', orders[2]: 'unchanged', missing: 'not_found'}
+    assert {order.status for order in Order.query.all()} == {'shipped'}
+    assert {shipment.status for shipment in Shipment.query.all()} == {'shipped'}
+
+    notifications = Notification.query.order_by(Notification.id).all()
+    assert [notification.data for notification in notifications] == [
+        {'order_id': order_id, 'old_status': 'paid', 'new_status': 'shipped'} for order_id in orders[:2]
+    ]
+    assert_matches_rebuild()
+
+
+def test_loaded_orders_see_new_status(orders, assert_matches_rebuild):
+    order = db.session.get(Order, orders[0])
+    assert order.status == 'paid'
+
+    bulk_update_order_status([orders[0]], 'delivered', notify=False)
+    db.session.commit()
+
+    assert order.status == 'delivered'
+    assert Notification.query.count() == 0
+    assert_matches_rebuild()
+    assert Order.query.filter_by(status='delivered').one().total_amount == Decimal('10.00')
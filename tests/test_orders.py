@@ -0,0 +1,56 @@
+"""
+下单接口：金额按当前售价计算，不使用客户端提交的总价
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.models_fixed import db, User, Product, Order
+from src.routes.product import product_bp
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(product_bp, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.fixture
+def catalog(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    bowl = Product(name='天青釉碗', price=Decimal('120.00'), stock=10)
+    cup = Product(name='月白釉杯', price=Decimal('35.50'), stock=10)
+    db.session.add_all([user, bowl, cup])
+    db.session.commit()
+    return user, bowl, cup
+
+
+def test_client_total_is_ignored(client, catalog):
+    user, bowl, cup = catalog
+    response = client.post('/api/orders', json={
+        'user_id': user.id,
+        'items': [{'product_id': bowl.id, 'quantity': 2}, {'product_id': cup.id, 'quantity': 1}],
+        'total_amount': 0.01,
+        'shipping_address': '河南省汝州市',
+        'payment_method': 'card'
+    })
+
+    assert response.status_code == 201
+    order = db.session.get(Order, response.get_json()['order_id'])
+    assert order.user_id == user.id
+    assert order.subtotal == Decimal('275.50')
+    assert order.total_amount == Decimal('275.50')
+    assert db.session.get(Product, bowl.id).stock == 8
+
+
+def test_user_is_required(client, catalog):
+    _, bowl, _ = catalog
+    response = client.post('/api/orders', json={
+        'items': [{'product_id': bowl.id, 'quantity': 1}],
+        'shipping_address': '河南省汝州市',
+        'payment_method': 'card'
+    })
+
+    assert response.status_code == 400
+    assert Order.query.count() == 0
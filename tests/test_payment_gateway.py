@@ -0,0 +1,58 @@
+"""
+支付网关熔断器：任何异常结束的试探请求都会释放半开状态
+"""
+
+import pytest
+import stripe
+
+from src.services.payment_gateway import (
+    CircuitBreaker, GatewayUnavailableError, PaymentGatewayError, StripeGateway
+)
+
+
+@pytest.fixture
+def gateway():
+    # 失败一次即熔断，reset_timeout=0 使熔断后立即进入半开状态
+    return StripeGateway(
+        'sk_test_dummy', max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    )
+
+
+def _raise(error):
+    def operation(client, options):
+        raise error
+    return operation
+
+
+@pytest.mark.parametrize('error', [RuntimeError('bad response'), ConnectionResetError('socket closed')])
+def test_unexpected_error_during_trial_releases_breaker(gateway, error):
+    with pytest.raises(type(error)):
+        gateway._call(_raise(error))
+    assert gateway.breaker.state == 'half_open'
+
+    # 半开试探再次以非 Stripe 异常结束
+    with pytest.raises(type(error)):
+        gateway._call(_raise(error))
+
+    assert gateway._call(lambda client, options: 'ok') == 'ok'
+    assert gateway.breaker.state == 'closed'
+
+
+def test_retryable_stripe_error_opens_breaker():
+    gateway = StripeGateway(
+        'sk_test_dummy', max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    )
+    with pytest.raises(PaymentGatewayError) as excinfo:
+        gateway._call(_raise(stripe.error.APIConnectionError('timeout')))
+    assert excinfo.value.status_code == 502
+
+    with pytest.raises(GatewayUnavailableError):
+        gateway._call(lambda client, options: 'ok')
+
+
+def test_card_error_does_not_count_as_failure(gateway):
+    with pytest.raises(PaymentGatewayError) as excinfo:
+        gateway._call(_raise(stripe.error.CardError('declined', None, 'card_declined', http_status=402)))
+
+    assert excinfo.value.status_code == 402
+    assert gateway.breaker.state == 'closed'
@@ -0,0 +1,148 @@
+"""
+商品列表接口：图片按整页批量加载，SQL 条数不随每页数量增加；
+总数复用数据版本查询的行数；库存、浏览量变化后 ETag 随之改变
+"""
+
+from datetime import datetime
+
+import pytest
+
+from src.models.models_fixed import db, Product, ProductImage
+from src.routes.product import product_bp
+from src.services.inventory import decrement_stock, increment_stock
+from src.services.view_counter import ViewCounterBuffer
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(product_bp, url_prefix='/api')
+    products = [Product(name=f'青花瓷碗 {n}', price=100 + n, stock=10) for n in range(60)]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all(
+        ProductImage(product_id=product.id, image_url=f'/img/{product.id}-{n}.jpg', sort_order=n, is_primary=n == 0)
+        for product in products for n in range(2)
+    )
+    db.session.commit()
+    return app.test_client()
+
+
+def _list_products(client, statements, **params):
+    statements.reset()
+    response = client.get('/api/products', query_string=params)
+    assert response.status_code == 200
+    return response.get_json(), statements.count
+
+
+@pytest.mark.parametrize('params', [{}, {'view': 'card'}, {'with_total': 'false'}])
+def test_query_count_does_not_grow_with_page_size(client, statements, params):
+    small, small_count = _list_products(client, statements, per_page=20, **params)
+    large, large_count = _list_products(client, statements, per_page=50, **params)
+
+    assert len(small['products']) == 20
+    assert len(large['products']) == 50
+    assert small_count == large_count
+
+
+def test_page_includes_each_products_images(client, statements):
+    body, _ = _list_products(client, statements, per_page=20)
+
+    for product in body['products']:
+        assert [image['image_url'] for image in product['images']] == [
+            f"/img/{product['id']}-0.jpg", f"/img/{product['id']}-1.jpg"
+        ]
+
+
+@pytest.mark.parametrize('with_total', ['true', 'false'])
+def test_total_reuses_version_count(client, statements, with_total):
+    body, count = _list_products(client, statements, per_page=20, with_total=with_total)
+
+    # 数据版本（含行数）、本页商品、本页图片；with_total=false 时不查询数据版本
+    assert count == (3 if with_total == 'true' else 2)
+    assert body['total'] == (60 if with_total == 'true' else None)
+    assert body['pages'] == (3 if with_total == 'true' else None)
+
+
+def _walk_cursor(client, **params):
+    ids, cursor = [], ''
+    while cursor is not None:
+        body = client.get('/api/products', query_string=dict(params, cursor=cursor, per_page=7)).get_json()
+        ids.extend(product['id'] for product in body['products'])
+        cursor = body['next_cursor']
+    return ids
+
+
+@pytest.mark.parametrize('sort_by', ['default', 'newest', 'price-low', 'price-high'])
+def test_cursor_pages_follow_offset_order(client, sort_by):
+    # 新品标记、相同的上架时间和缺失的上架时间（NULL）混在一起
+    products = Product.__table__
+    db.session.execute(products.update().where(products.c.id % 3 == 0).values(is_new=False))
+    db.session.execute(products.update().where(products.c.id % 4 == 0).values(created_at=datetime(2026, 1, 1)))
+    db.session.execute(products.update().where(products.c.id % 5 == 0).values(created_at=None))
+    db.session.execute(products.update().where(products.c.id % 2 == 0).values(price=100))
+    db.session.commit()
+
+    offset_ids = [
+        product['id']
+        for product in client.get('/api/products', query_string={'sort_by': sort_by, 'per_page': 60}).get_json()['products']
+    ]
+    assert len(offset_ids) == 60
+    assert _walk_cursor(client, sort_by=sort_by) == offset_ids
+    assert _walk_cursor(client, sort_by=sort_by, view='card') == offset_ids
+
+
+def test_cursor_from_another_sort_is_rejected(client):
+    body = client.get('/api/products', query_string={'sort_by': 'price-low', 'cursor': '', 'per_page': 5}).get_json()
+    response = client.get('/api/products', query_string={'sort_by': 'newest', 'cursor': body['next_cursor']})
+    assert response.status_code == 400
+
+
+def _assert_etag_changed(client, path, etag):
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    return response.headers['ETag']
+
+
+@pytest.mark.parametrize('path', ['/api/products', '/api/products/1'])
+def test_stock_changes_invalidate_etag(client, path):
+    etag = client.get(path).headers['ETag']
+
+    decrement_stock({1: 2})
+    db.session.commit()
+    etag = _assert_etag_changed(client, path, etag)
+    assert client.get('/api/products/1').get_json()['stock'] == 8
+
+    increment_stock({1: 2})
+    db.session.commit()
+    _assert_etag_changed(client, path, etag)
+
+
+def test_view_count_flush_invalidates_etag(client, app):
+    etag = client.get('/api/products/1').headers['ETag']
+
+    view_counter = ViewCounterBuffer(flush_interval=3600, flush_threshold=1000)
+    view_counter.init_app(app, db)
+    view_counter.increment(Product.__table__, 1, 5)
+    assert view_counter.flush() == 5
+    view_counter.shutdown()
+
+    _assert_etag_changed(client, '/api/products/1', etag)
+    assert client.get('/api/products/1').get_json()['view_count'] == 5
+
+
+def test_detail_is_revalidated(client):
+    response = client.get('/api/products/1')
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+    assert client.get('/api/products/1', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+
+def test_product_edit_changes_list_etag(client):
+    etag = client.get('/api/products').headers['ETag']
+
+    db.session.get(Product, 1).name = '青花瓷碗（新款）'
+    db.session.commit()
+
+    response = client.get('/api/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,84 @@
+"""
+评分聚合：商品评价和汝瓷评价都按增量维护，每条评价只累加一次；
+修改已过期的评价时按原值计算增量；修复脚本重新计算两组聚合
+"""
+
+import pytest
+
+from src.models.models_fixed import db, User, Product, Review
+from src.models.ru_models import RuPorcelain, RuPorcelainReview
+from src.services import rating_aggregates
+from src.services.rating_aggregates import recompute_rating_aggregates, register_rating_aggregate
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='reviewer', email='reviewer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _aggregate(model, target_id):
+    db.session.expire_all()
+    target = db.session.get(model, target_id)
+    return target.review_count, target.rating_total, float(target.rating_avg)
+
+
+def test_review_is_counted_once(user):
+    product = Product(name='月白釉瓶', price=880)
+    db.session.add(product)
+    db.session.commit()
+
+    db.session.add_all([
+        Review(user_id=user.id, product_id=product.id, rating=5),
+        Review(user_id=user.id, product_id=product.id, rating=3)
+    ])
+    db.session.commit()
+
+    assert _aggregate(Product, product.id) == (2, 8, 4.0)
+
+
+@pytest.mark.parametrize('review_model, target_model, fk_attr, rating_attr', [
+    (Review, Product, 'product_id', 'rating'),
+    (RuPorcelainReview, RuPorcelain, 'porcelain_id', 'overall_rating'),
+])
+def test_edit_delete_and_repair(user, review_model, target_model, fk_attr, rating_attr):
+    target = target_model(name='天青釉洗', price=1280)
+    db.session.add(target)
+    db.session.commit()
+    reviews = [
+        review_model(user_id=user.id, **{fk_attr: target.id, rating_attr: rating})
+        for rating in (5, 4)
+    ]
+    db.session.add_all(reviews)
+    db.session.commit()
+    assert _aggregate(target_model, target.id) == (2, 9, 4.5)
+
+    # 提交后评价已过期，修改评分时由 active_history 加载原值
+    setattr(reviews[0], rating_attr, 1)
+    db.session.commit()
+    assert _aggregate(target_model, target.id) == (2, 5, 2.5)
+
+    db.session.delete(db.session.get(review_model, reviews[1].id))
+    db.session.commit()
+    assert _aggregate(target_model, target.id) == (1, 1, 1.0)
+
+    # 修复脚本按评价表重新计算
+    db.session.execute(target_model.__table__.update().values(review_count=7, rating_total=30))
+    db.session.commit()
+    results = recompute_rating_aggregates()
+    assert set(results) == {'products', 'ru_porcelains'}
+    assert _aggregate(target_model, target.id) == (1, 1, 1.0)
+
+
+def test_registering_same_aggregate_again_is_a_no_op():
+    before = dict(rating_aggregates._AGGREGATES)
+    register_rating_aggregate(Review, Product, 'product_id', 'rating')
+    register_rating_aggregate(RuPorcelainReview, RuPorcelain, 'porcelain_id', 'overall_rating')
+    assert rating_aggregates._AGGREGATES == before
+
+
+def test_conflicting_aggregate_is_rejected():
+    with pytest.raises(ValueError):
+        register_rating_aggregate(Review, Product, 'product_id', 'title')
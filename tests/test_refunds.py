@@ -0,0 +1,68 @@
+"""
+退款接口：没有提供幂等键时按支付记录和金额生成固定的幂等键，客户端超时重试不会重复退款
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.models_fixed import db, User, Order, Payment, Refund
+from src.routes.payment import payment_bp
+from src.services import payment_gateway
+from src.services.payment_gateway import FakeGateway
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = FakeGateway()
+    monkeypatch.setattr(payment_gateway, '_gateway', gateway)
+    return gateway
+
+
+@pytest.fixture
+def client(app, gateway):
+    app.register_blueprint(payment_bp, url_prefix='/api/payment')
+    return app.test_client()
+
+
+@pytest.fixture
+def payment(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    order = Order(user_id=user.id, subtotal='99.90', total_amount='99.90', status='confirmed')
+    db.session.add(order)
+    db.session.flush()
+    payment = Payment(order_id=order.id, amount='99.90', status='completed', gateway='stripe', transaction_id='pi_test_1')
+    db.session.add(payment)
+    db.session.commit()
+    return payment
+
+
+@pytest.mark.parametrize('amount', [None, 19.99])
+def test_retried_refund_is_not_duplicated(client, gateway, payment, amount):
+    body = {'payment_id': payment.id, 'reason': '破损'}
+    if amount:
+        body['amount'] = amount
+
+    first = client.post('/api/payment/refund', json=body)
+    # 客户端超时后重试同一请求
+    retry = client.post('/api/payment/refund', json=body)
+
+    assert first.status_code == retry.status_code == 200
+    assert first.get_json()['refund']['refund_id'] == retry.get_json()['refund']['refund_id']
+    keys = [key for kind, key in gateway.calls if kind == 'refund']
+    assert len(keys) == 2 and keys[0] == keys[1]
+    assert Refund.query.count() == 1
+
+    refund = gateway.objects[first.get_json()['refund']['refund_id']]
+    assert refund.amount == (1999 if amount else None)
+    assert db.session.get(Payment, payment.id).status == ('partially_refunded' if amount else 'refunded')
+
+
+def test_different_amounts_are_separate_refunds(client, gateway, payment):
+    client.post('/api/payment/refund', json={'payment_id': payment.id, 'amount': 10})
+    client.post('/api/payment/refund', json={'payment_id': payment.id, 'amount': 20})
+
+    assert Refund.query.count() == 2
+    assert sorted(refund.amount for refund in Refund.query.all()) == [Decimal('10.00'), Decimal('20.00')]
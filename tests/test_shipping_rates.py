@@ -0,0 +1,126 @@
+"""
+运费费率引擎：与原 calculate_shipping_cost 的计算结果对比（计费重量按 0.5kg 向上取整），
+各快递服务按费率表逐个重量段校验，以及 /api/shipping/shipping-cost 的错误响应
+"""
+
+import pytest
+
+from src.routes.shipping import shipping_bp
+from src.services.shipping_rates import (
+    CARRIER_RATES, CARRIERS, MAX_TABLE_WEIGHT, SERVICES, WEIGHT_STEP, ZONES,
+    ShippingRateError, billable_weight, rate_engine
+)
+
+# 覆盖表格之外的重量段
+BANDS = range(1, int(MAX_TABLE_WEIGHT / WEIGHT_STEP) + 21)
+
+# 每个分区一个目的地
+DESTINATIONS = {
+    'metro': '上海市浦东新区',
+    'standard': '江西省景德镇市',
+    'remote': '青海省西宁市',
+    'far': '西藏拉萨市',
+}
+
+
+def legacy_cost(weight, destination, service):
+    """原 calculate_shipping_cost 的计算逻辑（不区分快递公司，对应顺丰的费率）"""
+    base_cost = 10.0
+    if weight > 1:
+        base_cost += (weight - 1) * 5
+    if service == '次日达':
+        base_cost *= 1.5
+    elif service == '当日达' or service == '即日达':
+        base_cost *= 2.0
+    if '西藏' in destination or '新疆' in destination:
+        base_cost *= 1.8
+    elif '内蒙古' in destination or '青海' in destination:
+        base_cost *= 1.3
+    return round(base_cost, 2)
+
+
+@pytest.mark.parametrize('weight, expected', [
+    (0.01, 0.5), (0.5, 0.5), (0.51, 1.0), (1, 1.0), (1.2, 1.5), ('2.5', 2.5), (2.5000001, 3.0), (45.1, 45.5)
+])
+def test_billable_weight_rounds_up_to_half_kg(weight, expected):
+    assert billable_weight(weight) == expected
+
+
+@pytest.mark.parametrize('weight', [0, -1, 'abc', None, float('inf'), float('nan')])
+def test_invalid_weight_is_rejected(weight):
+    with pytest.raises(ShippingRateError):
+        billable_weight(weight)
+
+
+@pytest.mark.parametrize('service', list(SERVICES))
+@pytest.mark.parametrize('zone_code', list(DESTINATIONS))
+def test_sf_matches_legacy_formula_for_every_band(service, zone_code):
+    destination = DESTINATIONS[zone_code]
+    zone = rate_engine.resolve_zone(None, destination)
+    assert rate_engine.zone_codes[zone] == zone_code
+
+    for band in BANDS:
+        weight = band * WEIGHT_STEP
+        expected = round(legacy_cost(weight, destination, service) * 100)
+        # 原实现按元保留两位小数，半分时可能相差 1 分
+        assert abs(rate_engine.quote_cents('sf', service, weight, zone) - expected) <= 1, weight
+        # 不足一个重量段的部分按整段计费
+        assert rate_engine.quote_cents('sf', service, weight - 0.3, zone) == \
+            rate_engine.quote_cents('sf', service, weight, zone)
+
+
+@pytest.mark.parametrize('carrier, service', [
+    (carrier['code'], service) for carrier in CARRIERS for service in carrier['services']
+])
+def test_every_carrier_service_matches_rate_table(carrier, service):
+    first_price, extra_price = CARRIER_RATES[carrier]
+    for zone, (_, zone_multiplier, _, _) in enumerate(ZONES):
+        factor = SERVICES[service][0] * zone_multiplier
+        for band in BANDS:
+            weight = band * WEIGHT_STEP
+            expected = (first_price + max(0, weight - 1) * extra_price) * factor
+            assert abs(rate_engine.quote_cents(carrier, service, weight, zone) - expected) <= 1, (zone, weight)
+
+
+def test_quote_all_covers_every_listed_service():
+    zone = rate_engine.resolve_zone('36')
+    quotes = rate_engine.quote_all(1.2, zone)
+
+    assert {(quote['carrier'], quote['service']) for quote in quotes} == {
+        (carrier['code'], service) for carrier in CARRIERS for service in carrier['services']
+    }
+    assert [quote['shipping_cost'] for quote in quotes] == sorted(quote['shipping_cost'] for quote in quotes)
+    for quote in quotes:
+        assert round(quote['shipping_cost'] * 100) == rate_engine.quote_cents(quote['carrier'], quote['service'], 1.5, zone)
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(shipping_bp, url_prefix='/api/shipping')
+    return app.test_client()
+
+
+def test_shipping_cost_for_unlisted_service_keeps_legacy_price(client):
+    # 顺丰不在 /carriers 中提供当日达，原实现仍按当日达系数报价
+    response = client.post('/api/shipping/shipping-cost', json={
+        'weight': 1.2, 'destination': '新疆乌鲁木齐', 'carrier': 'sf', 'service': '当日达'
+    })
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['billable_weight'] == 1.5
+    assert body['shipping_cost'] == legacy_cost(1.5, '新疆乌鲁木齐', '当日达')
+    assert body['zone'] == 'far'
+
+
+@pytest.mark.parametrize('payload', [
+    {'carrier': 'dhl'},
+    {'service': '隔日达'},
+    {'weight': 0},
+    {'region_code': '99'},
+])
+def test_shipping_cost_rejects_unknown_input(client, payload):
+    response = client.post('/api/shipping/shipping-cost', json=dict({'weight': 1.0}, **payload))
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
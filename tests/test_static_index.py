@@ -0,0 +1,101 @@
+"""
+静态文件索引的自动重新加载：未命中的路径不会每次都重新扫描目录；
+重新加载信号只设置标记，由下一个请求扫描
+"""
+
+import os
+import signal
+import time
+
+import pytest
+from flask import Flask
+
+from src.utils.static_index import StaticIndex
+
+
+@pytest.fixture
+def static_app(tmp_path):
+    folder = tmp_path / 'static'
+    (folder / 'assets').mkdir(parents=True)
+    (folder / 'index.html').write_text('<html><body>' + 'app ' * 200 + '</body></html>')
+    (folder / 'assets' / 'index-4f3a9c1b.js').write_text('console.log(1);' * 100)
+
+    app = Flask(__name__, static_folder=str(folder))
+    app.config.update(STATIC_INDEX_AUTO_RELOAD=True, STATIC_RELOAD_SIGNAL='', STATIC_INDEX_RESCAN_INTERVAL=60)
+    return app, folder
+
+
+@pytest.fixture
+def index(static_app, monkeypatch):
+    app, _ = static_app
+    index = StaticIndex()
+    index.init_app(app)
+    index.reloads = 0
+    reload = index.reload
+
+    def counting_reload():
+        index.reloads += 1
+        return reload()
+
+    monkeypatch.setattr(index, 'reload', counting_reload)
+    return index
+
+
+def test_misses_do_not_rescan_within_interval(index):
+    for n in range(50):
+        assert index.lookup(f'orders/{n}') is None
+        assert index.spa_index() is not None
+
+    assert index.reloads == 0
+    assert index.lookup('assets/index-4f3a9c1b.js') is not None
+    assert index.reloads == 0
+
+
+def test_miss_rescans_after_interval(index, static_app):
+    _, folder = static_app
+    (folder / 'robots.txt').write_text('User-agent: *')
+    assert index.lookup('robots.txt') is None
+
+    # 上次扫描已是 61 秒前
+    index._last_scan -= 61
+
+    assert index.lookup('robots.txt') is not None
+    assert index.lookup('still-missing') is None
+    assert index.reloads == 1
+
+
+def test_modified_file_reloads_immediately(index, static_app):
+    _, folder = static_app
+    path = folder / 'index.html'
+    old = index.spa_index()
+    path.write_text('<html>new</html>')
+    os.utime(path, (old.mtime + 10, old.mtime + 10))
+
+    assert index.spa_index().body == b'<html>new</html>'
+    assert index.reloads == 1
+
+
+@pytest.fixture
+def signal_index(static_app):
+    app, folder = static_app
+    app.config.update(STATIC_INDEX_AUTO_RELOAD=False, STATIC_RELOAD_SIGNAL='SIGUSR1')
+    previous = signal.getsignal(signal.SIGUSR1)
+    index = StaticIndex()
+    index.init_app(app)
+    yield index, folder
+    signal.signal(signal.SIGUSR1, previous)
+
+
+def test_reload_signal_during_locked_section_is_deferred(signal_index):
+    index, folder = signal_index
+    (folder / 'robots.txt').write_text('User-agent: *')
+
+    # 信号在请求持有索引锁时到达：处理函数只设置标记，不会死锁
+    with index._lock:
+        os.kill(os.getpid(), signal.SIGUSR1)
+        time.sleep(0.01)
+    assert index.files.get('robots.txt') is None
+
+    # 下一个请求执行重新扫描
+    assert index.lookup('robots.txt') is not None
+    assert index.lookup('assets/index-4f3a9c1b.js') is not None
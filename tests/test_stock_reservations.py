@@ -0,0 +1,99 @@
+"""
+库存预留：会话 / 预留过期时间，过期释放只处理本次认领的预留
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.models.models_fixed import db, User, Product, Order, StockReservation
+from src.services.stock_reservations import (
+    RESERVATION_GRACE_SECONDS, hold_stock, release_expired, reservation_expiry, session_expires_at
+)
+
+
+def test_session_expiry_leaves_margin_over_stripe_minimum():
+    now = datetime(2026, 10, 17, 8, 0, 0, 999999)
+    expires_at = session_expires_at(now)
+
+    assert isinstance(expires_at, int)
+    assert expires_at - (now - datetime(1970, 1, 1)).total_seconds() >= 31 * 60
+
+
+def test_reservation_outlives_session_created_after_hold():
+    held_at = datetime(2026, 10, 17, 8, 0, 0)
+    hold_until = reservation_expiry(held_at)
+    # 提交订单和预留后再计算会话过期时间
+    session_until = datetime(1970, 1, 1) + timedelta(seconds=session_expires_at(held_at + timedelta(seconds=5)))
+
+    assert hold_until - session_until >= timedelta(seconds=RESERVATION_GRACE_SECONDS - 10)
+
+
+@pytest.fixture
+def product(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    product = Product(name='汝窑洗', price=500, stock=10)
+    db.session.add_all([user, product])
+    db.session.commit()
+    return product
+
+
+def _order_with_hold(product, quantity, expires_at):
+    order = Order(user_id=1, subtotal=500, total_amount=500, status='pending')
+    db.session.add(order)
+    db.session.flush()
+    hold_stock(order.id, {product.id: quantity}, expires_at)
+    db.session.commit()
+    return order
+
+
+def test_release_only_touches_claimed_rows(product):
+    expired = datetime.utcnow() - timedelta(minutes=1)
+    mine = _order_with_hold(product, 2, expired)
+    other = _order_with_hold(product, 3, expired)
+    # 另一个 worker 已认领但尚未处理完的预留
+    StockReservation.query.filter_by(order_id=other.id).update({'status': 'releasing'})
+    db.session.commit()
+
+    assert release_expired() == 1
+
+    statuses = dict(db.session.query(StockReservation.order_id, StockReservation.status).all())
+    assert statuses == {mine.id: 'released', other.id: 'releasing'}
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).stock == 10 - 3
+    assert db.session.get(Order, mine.id).status == 'cancelled'
+    assert db.session.get(Order, other.id).status == 'pending'
+
+
+def test_unexpired_holds_are_kept(product):
+    order = _order_with_hold(product, 4, reservation_expiry())
+
+    assert release_expired() == 0
+    assert StockReservation.query.filter_by(order_id=order.id).one().status == 'held'
+    assert db.session.get(Product, product.id).stock == 6
+
+
+def test_release_continues_after_batch_loses_rows_to_concurrent_commit(product):
+    expired = datetime.utcnow() - timedelta(minutes=1)
+    orders = [_order_with_hold(product, 1, expired) for _ in range(3)]
+    engine = db.session.get_bind()
+    state = {'raced': False}
+
+    # 第一批选中之后、认领之前，webhook 确认了其中一条预留
+    @event.listens_for(engine, 'before_cursor_execute')
+    def commit_first_hold(conn, cursor, statement, parameters, context, executemany):
+        if not state['raced'] and statement.startswith('UPDATE stock_reservations') and 'releasing' in str(parameters):
+            state['raced'] = True
+            cursor.execute("UPDATE stock_reservations SET status = 'committed' WHERE order_id = ?", (orders[0].id,))
+
+    try:
+        assert release_expired(batch_size=2) == 2
+    finally:
+        event.remove(engine, 'before_cursor_execute', commit_first_hold)
+
+    assert state['raced']
+    statuses = dict(db.session.query(StockReservation.order_id, StockReservation.status).all())
+    assert statuses == {orders[0].id: 'committed', orders[1].id: 'released', orders[2].id: 'released'}
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).stock == 10 - 1
@@ -0,0 +1,100 @@
+"""
+快递扫描记录导入：块内与已有记录去重，重复导入不产生新记录；
+物流单状态只被更新的扫描覆盖，送达时订单批量更新为 delivered 并发送送达通知
+"""
+
+import json
+
+import pytest
+
+from src.models.models_fixed import db, User, Order, Shipment, ShipmentTracking, Notification
+from src.routes.shipping import shipping_bp
+from src.services.tracking_ingest import ingest_tracking_events, iter_records
+
+SCANS = [
+    {'tracking_number': 'SF000000000001', 'status': 'in_transit', 'timestamp': '2026-10-01T08:00:00Z', 'location': '景德镇'},
+    {'tracking_number': 'SF000000000001', 'status': 'in_transit', 'timestamp': '2026-10-01T08:00:00Z', 'location': '景德镇'},
+    {'tracking_number': 'SF000000000001', 'status': 'delivered', 'timestamp': '2026-10-02T16:30:00+08:00', 'location': '上海'},
+    {'tracking_number': 'SF000000000002', 'status': 'in_transit', 'timestamp': 1790000000, 'location': '南昌'},
+    {'tracking_number': 'SF999999999999', 'status': 'in_transit', 'timestamp': '2026-10-01T09:00:00Z'},
+]
+
+
+@pytest.fixture
+def shipments(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    orders = [Order(user_id=user.id, subtotal='99.00', total_amount='99.00', status='shipped') for _ in range(2)]
+    db.session.add_all(orders)
+    db.session.flush()
+    db.session.add_all(
+        Shipment(order_id=order.id, tracking_number=f'SF{n:012d}', status='shipped')
+        for n, order in enumerate(orders, start=1)
+    )
+    db.session.commit()
+    return orders
+
+
+def _ndjson(records):
+    return [json.dumps(record) + '\n' for record in records] + ['not json\n']
+
+
+def test_ingest_dedupes_and_updates_shipments(shipments, assert_matches_rebuild):
+    result = ingest_tracking_events(iter_records(_ndjson(SCANS), 'ndjson'), chunk_size=3).to_dict()
+
+    assert result['received'] == 6
+    assert result['inserted'] == 3
+    assert result['duplicates'] == 1
+    assert result['unknown_tracking_numbers'] == 1
+    assert result['invalid'] == 1 and result['errors'][0]['line'] == 6
+    assert result['orders_delivered'] == 1
+
+    delivered = Shipment.query.filter_by(tracking_number='SF000000000001').one()
+    assert delivered.status == 'delivered'
+    assert delivered.delivered_at.isoformat() == '2026-10-02T08:30:00'
+    assert [record.status for record in delivered.tracking_records] == ['in_transit', 'delivered']
+    assert Shipment.query.filter_by(tracking_number='SF000000000002').one().status == 'in_transit'
+
+    assert [order.status for order in Order.query.order_by(Order.id)] == ['delivered', 'shipped']
+    notification = Notification.query.one()
+    assert notification.type == 'order_delivered'
+    assert notification.data == {'order_id': shipments[0].id, 'tracking_number': 'SF000000000001'}
+    assert_matches_rebuild()
+
+
+def test_replaying_feed_is_a_no_op(shipments):
+    ingest_tracking_events(iter_records(_ndjson(SCANS), 'ndjson'))
+    result = ingest_tracking_events(iter_records(_ndjson(SCANS), 'ndjson')).to_dict()
+
+    assert result['inserted'] == 0
+    assert result['duplicates'] == 4
+    assert result['shipments_updated'] == 0
+    assert ShipmentTracking.query.count() == 3
+    assert Notification.query.count() == 1
+
+
+def test_older_scan_does_not_override_status(shipments):
+    ingest_tracking_events(iter_records(_ndjson(SCANS[:3]), 'ndjson'))
+    late = {'tracking_number': 'SF000000000001', 'status': 'out_for_delivery', 'timestamp': '2026-10-02T06:00:00Z'}
+    result = ingest_tracking_events(iter_records(_ndjson([late]), 'ndjson')).to_dict()
+
+    assert result['inserted'] == 1
+    assert result['shipments_updated'] == 0
+    assert Shipment.query.filter_by(tracking_number='SF000000000001').one().status == 'delivered'
+
+
+def test_ingest_endpoint_accepts_csv(app, shipments):
+    app.register_blueprint(shipping_bp, url_prefix='/api/shipping')
+    body = (
+        'tracking_number,status,timestamp,location\n'
+        'SF000000000002,delivered,2026-10-03T10:00:00Z,南昌\n'
+        'SF000000000002,delivered,2026-10-03T10:00:00Z,南昌\n'
+    )
+
+    response = app.test_client().post('/api/shipping/tracking/ingest', data=body, content_type='text/csv')
+
+    assert response.status_code == 200
+    assert response.get_json()['inserted'] == 1
+    assert response.get_json()['duplicates'] == 1
+    assert db.session.get(Order, shipments[1].id).status == 'delivered'
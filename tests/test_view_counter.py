@@ -0,0 +1,36 @@
+"""
+浏览量写回缓冲
+"""
+
+import logging
+
+from src.models.models_fixed import db, Product
+from src.services.view_counter import ViewCounterBuffer
+
+
+def test_flush_counts_null_view_count_as_zero(app):
+    product = Product(name='天青釉盘', price=300, view_count=None)
+    db.session.add(product)
+    db.session.commit()
+
+    buffer = ViewCounterBuffer(flush_interval=3600, flush_threshold=1000)
+    buffer.init_app(app, db)
+    for _ in range(3):
+        buffer.increment(Product.__table__, product.id)
+
+    assert buffer.flush() == 3
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).view_count == 3
+    buffer.shutdown()
+
+
+def test_flush_without_init_app_is_logged(caplog):
+    buffer = ViewCounterBuffer(flush_interval=3600, flush_threshold=1000)
+    buffer._pending[(Product.__table__, 1)] += 2
+    buffer._pending_total += 2
+
+    with caplog.at_level(logging.ERROR, logger='src.services.view_counter'):
+        assert buffer.flush() == 0
+
+    assert 'View count flush failed' in caplog.text
+    assert buffer.pending_count(Product.__table__, 1) == 2
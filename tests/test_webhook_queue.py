@@ -0,0 +1,166 @@
+"""
+Webhook 事件队列：用本地测试密钥签名的事件经 webhook 接口入队，
+重复投递的事件只保存一次；worker 独占认领事件，失败后按指数退避重试，超过次数标记为 failed
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.models_fixed import db, User, Order, Payment, WebhookEvent
+from src.routes.payment import payment_bp
+from src.services import webhook_queue
+from src.services.webhook_queue import (
+    EVENT_HANDLERS, WebhookWorkerPool, claim_next, enqueue_event, process_event, process_pending, retry_delay
+)
+
+WEBHOOK_SECRET = 'whsec_test_local'
+
+
+def sign(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """生成与 Stripe 相同格式的 Stripe-Signature 头"""
+    timestamp = int(timestamp or time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def stripe_event(event_id, event_type, obj):
+    return json.dumps({'id': event_id, 'object': 'event', 'type': event_type, 'data': {'object': obj}})
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setenv('STRIPE_WEBHOOK_SECRET', WEBHOOK_SECRET)
+    app.register_blueprint(payment_bp, url_prefix='/api/payment')
+    return app.test_client()
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """登记 test.event 的处理函数，记录每次调用的事件对象"""
+    calls = []
+    lock = threading.Lock()
+
+    def handler(obj):
+        with lock:
+            calls.append(obj['n'])
+    monkeypatch.setitem(EVENT_HANDLERS, 'test.event', handler)
+    return calls
+
+
+def _post(client, payload, signature=None):
+    return client.post(
+        '/api/payment/webhook', data=payload,
+        headers={'Stripe-Signature': signature or sign(payload), 'Content-Type': 'application/json'}
+    )
+
+
+@pytest.fixture
+def pending_payment(app):
+    user = User(username='buyer', email='buyer@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    order = Order(user_id=user.id, subtotal='99.00', total_amount='99.00', status='pending')
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(Payment(order_id=order.id, amount='99.00', status='pending', gateway='stripe', transaction_id='cs_test_1'))
+    db.session.commit()
+    return order
+
+
+def test_signed_event_is_queued_once_and_processed(client, pending_payment):
+    payload = stripe_event(
+        'evt_test_expired', 'checkout.session.expired',
+        {'id': 'cs_test_1', 'metadata': {'order_id': str(pending_payment.id)}}
+    )
+
+    assert _post(client, payload).get_json() == {'status': 'queued'}
+    # Stripe 重复投递（重新签名）的同一事件
+    assert _post(client, payload, sign(payload, timestamp=time.time() + 1)).get_json() == {'status': 'duplicate'}
+    assert WebhookEvent.query.count() == 1
+
+    assert process_pending() == 1
+    db.session.expire_all()
+    assert WebhookEvent.query.one().status == 'processed'
+    assert Payment.query.one().status == 'failed'
+    assert process_pending() == 0
+
+
+def test_invalid_signature_and_unhandled_events(client):
+    payload = stripe_event('evt_test_bad', 'checkout.session.expired', {'id': 'cs_test_1'})
+    response = _post(client, payload, sign(payload, secret='whsec_other'))
+    assert response.status_code == 400
+
+    payload = stripe_event('evt_test_other', 'customer.created', {'id': 'cus_1'})
+    assert _post(client, payload).get_json() == {'status': 'ignored'}
+    assert WebhookEvent.query.count() == 0
+
+
+def test_enqueue_dedupes_event_id(app):
+    assert enqueue_event('evt_dup', 'test.event', '{}') is True
+    assert enqueue_event('evt_dup', 'test.event', '{}') is False
+    assert WebhookEvent.query.count() == 1
+
+
+def test_claim_is_exclusive_until_lock_expires(app):
+    enqueue_event('evt_claim', 'test.event', stripe_event('evt_claim', 'test.event', {'n': 1}))
+
+    assert claim_next(lock_timeout=300) == 'evt_claim'
+    assert claim_next(lock_timeout=300) is None
+    # worker 崩溃遗留的 processing 事件超过锁定时间后重新认领
+    assert claim_next(lock_timeout=300, now=datetime.utcnow() + timedelta(seconds=301)) == 'evt_claim'
+    assert db.session.get(WebhookEvent, 'evt_claim').attempts == 2
+
+
+def test_failures_back_off_then_fail(app, monkeypatch):
+    def broken(obj):
+        raise RuntimeError('downstream unavailable')
+    monkeypatch.setitem(EVENT_HANDLERS, 'test.event', broken)
+    enqueue_event('evt_fail', 'test.event', stripe_event('evt_fail', 'test.event', {'n': 1}))
+
+    statuses = []
+    now = datetime.utcnow()
+    for attempt in range(1, 4):
+        assert claim_next(now=now) == 'evt_fail'
+        statuses.append(process_event('evt_fail', max_attempts=3))
+        event = db.session.get(WebhookEvent, 'evt_fail')
+        assert event.attempts == attempt
+        assert event.last_error == 'RuntimeError: downstream unavailable'
+        if event.status == 'pending':
+            # 退避期间不会被认领
+            delay = (event.available_at - datetime.utcnow()).total_seconds()
+            assert retry_delay(attempt) - 5 < delay <= retry_delay(attempt)
+            assert claim_next(now=event.available_at - timedelta(seconds=1)) is None
+            now = event.available_at
+
+    assert statuses == ['pending', 'pending', 'failed']
+    assert claim_next(now=now + timedelta(days=1)) is None
+
+
+def test_worker_pool_handles_each_event_once(app, recorded, monkeypatch):
+    pool = WebhookWorkerPool(workers=4, poll_interval=0.05)
+    pool.app = app
+    monkeypatch.setattr(webhook_queue, 'webhook_workers', pool)
+
+    for n in range(40):
+        event_id = f'evt_pool_{n}'
+        assert enqueue_event(event_id, 'test.event', stripe_event(event_id, 'test.event', {'n': n}))
+    db.session.remove()
+
+    pool.ensure_running()
+    try:
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline and len(recorded) < 40:
+            time.sleep(0.05)
+    finally:
+        pool.shutdown()
+        for thread in pool._threads:
+            thread.join(timeout=5)
+
+    assert sorted(recorded) == list(range(40))
+    assert {event.status for event in WebhookEvent.query.all()} == {'processed'}